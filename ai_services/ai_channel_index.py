@@ -0,0 +1,117 @@
+# Noelle_Bot/ai_services/ai_channel_index.py
+import discord
+from discord.ext import commands
+import logging
+
+from core import database
+from . import gemini_client as gemini_services
+
+_logger = logging.getLogger("noelle_bot.ai.channel_index")
+
+
+class AIChannelIndex:
+    """
+    Indeks guild_id -> ID channel AI. Nama channel AI diambil dari config server
+    (`ai_channel_name`), jadi pengecekan di hot path cukup satu lookup set tanpa
+    membandingkan nama channel. Guild yang belum terindeks diindeks saat pertama dicek
+    memakai config yang sudah ada di cache (atau nama default).
+    """
+    def __init__(self):
+        self._channel_ids: dict[int, set[int]] = {}
+        self._channel_names: dict[int, str] = {}
+
+    @staticmethod
+    def _configured_name(guild_id: int, config: dict | None = None) -> str:
+        config = config or database.get_cached_server_config(guild_id) or {}
+        return (config.get('ai_channel_name') or gemini_services.get_designated_ai_channel_name()).lower()
+
+    def index_guild(self, guild: discord.Guild, config: dict | None = None):
+        name = self._configured_name(guild.id, config)
+        self._channel_names[guild.id] = name
+        self._channel_ids[guild.id] = {channel.id for channel in guild.text_channels if channel.name.lower() == name}
+
+    def remove_guild(self, guild_id: int):
+        self._channel_ids.pop(guild_id, None)
+        self._channel_names.pop(guild_id, None)
+
+    def _ensure_guild(self, guild: discord.Guild) -> set[int]:
+        channel_ids = self._channel_ids.get(guild.id)
+        if channel_ids is None:
+            self.index_guild(guild)
+            channel_ids = self._channel_ids[guild.id]
+        return channel_ids
+
+    def is_ai_channel(self, channel) -> bool:
+        guild = getattr(channel, 'guild', None)
+        if guild is None or not isinstance(channel, discord.TextChannel): return False
+        return channel.id in self._ensure_guild(guild)
+
+    def channel_name(self, guild_id: int | None) -> str:
+        """Nama channel AI untuk pesan ke pengguna."""
+        if guild_id is None: return gemini_services.get_designated_ai_channel_name()
+        return self._channel_names.get(guild_id) or self._configured_name(guild_id)
+
+    def update_channel(self, channel: discord.abc.GuildChannel):
+        if not isinstance(channel, discord.TextChannel): return
+        channel_ids = self._ensure_guild(channel.guild)
+        if channel.name.lower() == self._channel_names[channel.guild.id]:
+            channel_ids.add(channel.id)
+        else:
+            channel_ids.discard(channel.id)
+
+    def remove_channel(self, channel: discord.abc.GuildChannel):
+        channel_ids = self._channel_ids.get(channel.guild.id)
+        if channel_ids is not None:
+            channel_ids.discard(channel.id)
+
+    def stats(self) -> dict:
+        return {"guilds": len(self._channel_ids), "channels": sum(len(ids) for ids in self._channel_ids.values())}
+
+
+ai_channels = AIChannelIndex()
+
+
+class AIChannelIndexCog(commands.Cog, name="AI Channel Index"):
+    """Menjaga `ai_channels` tetap sinkron dengan channel guild dan config server."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        database.add_server_config_listener(self._on_server_config_updated)
+        for guild in self.bot.guilds:
+            ai_channels.index_guild(guild, await database.get_server_config(guild.id))
+        _logger.info(f"Indeks channel AI dibangun: {ai_channels.stats()}")
+
+    async def cog_unload(self):
+        database.remove_server_config_listener(self._on_server_config_updated)
+
+    def _on_server_config_updated(self, guild_id: int, config: dict):
+        guild = self.bot.get_guild(guild_id)
+        if guild is not None:
+            ai_channels.index_guild(guild, config)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        ai_channels.index_guild(guild, await database.get_server_config(guild.id))
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        ai_channels.remove_guild(guild.id)
+        database.invalidate_server_config(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        ai_channels.update_channel(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        ai_channels.update_channel(after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        ai_channels.remove_channel(channel)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AIChannelIndexCog(bot))
+    _logger.info("AIChannelIndexCog berhasil dimuat.")
@@ -9,14 +9,14 @@ import asyncio
 
 from . import gemini_client as gemini_services
 from . import deep_search_service
-from utils import ai_utils 
+from . import gemini_resilience
+from .ai_channel_index import ai_channels
+from .message_handler import MAX_CONTEXT_TOKENS, SESSION_TIMEOUT_MINUTES
 from utils import web_utils
+from utils import response_pager
 
 _logger = logging.getLogger("noelle_bot.ai.commands_cog")
 
-SESSION_TIMEOUT_MINUTES = 30 
-MAX_CONTEXT_TOKENS = 120000
-
 class AICommandsCog(commands.Cog, name="AI Commands"):
     """Cog ini menangani pendaftaran grup /ai dan subcommand manajemennya."""
     def __init__(self, bot: commands.Bot):
@@ -24,12 +24,11 @@ class AICommandsCog(commands.Cog, name="AI Commands"):
         _logger.info("AICommandsCog (Grup /ai) instance dibuat.")
 
     async def _ensure_ai_channel(self, interaction: discord.Interaction) -> bool:
-        designated_name = gemini_services.get_designated_ai_channel_name().lower()
         send_method = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
-        if not isinstance(interaction.channel, discord.TextChannel) or interaction.channel.name.lower() != designated_name:
+        if not ai_channels.is_ai_channel(interaction.channel):
             try:
                 if not interaction.response.is_done(): await interaction.response.defer(ephemeral=True)
-                await interaction.followup.send(f"Perintah ini hanya bisa digunakan di channel `{gemini_services.get_designated_ai_channel_name()}`.", ephemeral=True)
+                await interaction.followup.send(f"Perintah ini hanya bisa digunakan di channel `{ai_channels.channel_name(interaction.guild_id)}`.", ephemeral=True)
             except discord.errors.HTTPException as e: _logger.warning(f"Gagal mengirim pesan _ensure_ai_channel: {e}")
             return False
         return True
@@ -53,12 +52,12 @@ class AICommandsCog(commands.Cog, name="AI Commands"):
         await interaction.response.defer(ephemeral=True)
         if not await self._ensure_ai_channel(interaction): return
         message_handler_cog = self.bot.get_cog("AI Message Handler")
-        if message_handler_cog and hasattr(message_handler_cog, 'active_chat_sessions'):
-            channel_id = interaction.channel_id
-            if channel_id in message_handler_cog.active_chat_sessions:
-                last_active_dt = message_handler_cog.chat_session_last_active.get(channel_id)
+        if message_handler_cog and hasattr(message_handler_cog, 'sessions'):
+            session_entry = message_handler_cog.sessions.get(interaction.channel_id)
+            if session_entry:
+                last_active_dt = session_entry.last_active
                 last_active_str = discord.utils.format_dt(last_active_dt, "R") if last_active_dt else "Baru saja"
-                token_count = message_handler_cog.chat_context_token_counts.get(channel_id, 0)
+                token_count = session_entry.token_count
                 timeout_dt = last_active_dt + datetime.timedelta(minutes=SESSION_TIMEOUT_MINUTES) if last_active_dt else None
                 timeout_str = discord.utils.format_dt(timeout_dt, "R") if timeout_dt else "N/A"
                 embed = discord.Embed(title=f"Status Sesi AI - #{interaction.channel.name}", color=discord.Color.blue())
@@ -70,6 +69,55 @@ class AICommandsCog(commands.Cog, name="AI Commands"):
             else: await interaction.followup.send("Tidak ada sesi chat aktif di channel ini.")
         else: await interaction.followup.send("Gagal mendapatkan status sesi (internal error: handler tidak ditemukan).")
 
+    @ai_commands_group.command(name="queue_status", description="Menampilkan beban antrean panggilan AI Noelle.")
+    async def ai_queue_status_cmd(self, interaction: discord.Interaction):
+        stats = gemini_services.governor.stats()
+        embed = discord.Embed(title="Status Antrean AI", color=discord.Color.blue())
+        for model_name, model_stats in stats["models"].items():
+            queued = model_stats["queued"]
+            queued_str = ", ".join(f"{name}: {count}" for name, count in queued.items())
+            embed.add_field(
+                name=f"`{model_name.replace('models/', '')}`",
+                value=f"Aktif: **{model_stats['active']} / {model_stats['limit']}**\nAntre: {queued_str}\nGuild mengantre: {model_stats['queued_guilds']}",
+                inline=False
+            )
+        wait_lines = [
+            f"**{name}**: rata-rata {w['avg']:.2f}s • p95 {w['p95']:.2f}s • maks {w['max']:.2f}s ({w['admitted']} panggilan)"
+            for name, w in stats["wait_seconds"].items()
+        ]
+        embed.add_field(name="Waktu Tunggu per Prioritas", value="\n".join(wait_lines), inline=False)
+        breaker_lines = [
+            f"`{name.replace('models/', '')}`: **{b['state']}** • gagal beruntun {b['consecutive_failures']} • dibuka {b['times_opened']}x"
+            for name, b in gemini_resilience.breaker_stats().items()
+        ]
+        if breaker_lines:
+            embed.add_field(name="Circuit Breaker", value="\n".join(breaker_lines)[:1024], inline=False)
+        message_handler_cog = self.bot.get_cog("AI Message Handler")
+        if message_handler_cog and hasattr(message_handler_cog, 'sessions'):
+            store_stats = message_handler_cog.sessions.stats()
+            embed.add_field(
+                name="Sesi Chat di Memori",
+                value=f"{store_stats['sessions']} / {store_stats['max_sessions']} sesi • ~{store_stats['approx_bytes'] / (1024 * 1024):.1f} / {store_stats['max_bytes'] / (1024 * 1024):.0f} MB\n"
+                      f"Kedaluwarsa: {store_stats['expired']} • Dikeluarkan (LRU): {store_stats['evicted']}",
+                inline=False
+            )
+        pager_stats = response_pager.page_store_stats()
+        embed.add_field(
+            name="Paginator Respons Panjang",
+            value=f"{pager_stats['responses']} respons • {pager_stats['chars'] / 1_000_000:.1f} / {pager_stats['max_chars'] / 1_000_000:.0f} juta karakter",
+            inline=False
+        )
+        image_cog = self.bot.get_cog("AI Image Generator")
+        if image_cog and hasattr(image_cog, 'job_scheduler'):
+            job_stats = image_cog.job_scheduler.stats()
+            embed.add_field(
+                name="Antrean /generate_image",
+                value=f"Berjalan: **{job_stats['running']} / {job_stats['concurrency']}** • Antre: {job_stats['queued']} • Selesai: {job_stats['completed']}",
+                inline=False
+            )
+        if not stats["models"]: embed.description = "Belum ada panggilan AI sejak bot dinyalakan."
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @ai_commands_group.command(name="deep_search", description="Lakukan riset mendalam tentang sebuah topik menggunakan beberapa agen AI.")
     @app_commands.describe(
         topic="Topik yang ingin Anda teliti secara mendalam.",
@@ -99,7 +147,7 @@ class AICommandsCog(commands.Cog, name="AI Commands"):
             message_handler_cog.deep_search_active_channels.add(interaction.channel_id)
             _logger.info(f"Deep Search dimulai, channel {interaction.channel_id} DIKUNCI.")
             
-            clarification_questions = await deep_search_service.generate_questions(topic)
+            clarification_questions = await deep_search_service.generate_questions(topic, guild_id=interaction.guild_id)
             user_context = "Pengguna tidak memberikan konteks tambahan."
 
             if clarification_questions:
@@ -165,12 +213,15 @@ class AICommandsCog(commands.Cog, name="AI Commands"):
                 button = discord.ui.Button(label="Buka Laporan Lengkap", style=discord.ButtonStyle.link, url=report_url, emoji="📄")
                 view.add_item(button)
             else:
-                embed.add_field(name="Laporan Lengkap Gagal Diunggah", value="Laporan lengkap akan dikirim sebagai file.", inline=False)
+                embed.add_field(name="Laporan Lengkap Gagal Diunggah", value="Laporan lengkap ditampilkan per halaman di pesan berikutnya.", inline=False)
             
             await interaction.edit_original_response(content=f"✅ Riset mendalam untuk topik **\"{topic[:100]}\"** telah selesai.", embed=embed, view=view)
             
             if not report_url:
-                await ai_utils.send_long_text_as_file(interaction.channel, full_report, "laporan_lengkap.md", "Berikut adalah laporan lengkapnya:")
+                key, paged = response_pager.paginate_text(full_report, f"Laporan Riset: {topic[:150]}", f"Riset mendalam diminta oleh: {interaction.user.display_name}")
+                page_view = response_pager.build_page_view(key, 0, len(paged.pages))
+                await interaction.followup.send(embed=response_pager.render_page(paged, 0), **({'view': page_view} if page_view else {}))
+                await response_pager.persist_paged_response(key, paged)
 
         finally:
             if interaction.channel_id in message_handler_cog.deep_search_active_channels:
@@ -0,0 +1,118 @@
+# Noelle_Bot/ai_services/channel_dispatcher.py
+
+import os
+import re
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, TypeVar
+
+_logger = logging.getLogger("noelle_bot.ai.channel_dispatcher")
+
+# Jendela penggabungan (detik) untuk pesan yang datang hampir bersamaan di satu channel.
+COALESCE_WINDOW_SECONDS = float(os.getenv('AI_CHANNEL_COALESCE_WINDOW', '1.5'))
+MAX_REQUESTS_PER_BURST = 5
+WORKER_IDLE_TIMEOUT_SECONDS = 60.0
+
+BURST_INSTRUCTION = (
+    "[Catatan sistem: {count} pesan dari pengguna berbeda masuk hampir bersamaan. "
+    "Jawab setiap pesan secara terpisah dan awali setiap jawaban dengan penandanya, "
+    "misalnya [#1] untuk pesan pertama, [#2] untuk pesan kedua, dan seterusnya.]"
+)
+_REPLY_MARKER_PATTERN = re.compile(r'^\s*\[#(\d+)\]\s*', re.MULTILINE)
+
+T = TypeVar("T")
+
+
+def split_reply_by_request(text: str, count: int) -> list[str] | None:
+    """
+    Memecah jawaban gabungan berdasarkan penanda [#n].
+    Mengembalikan list sepanjang `count`, atau None jika ada pesan yang tidak mendapat
+    jawaban sehingga respons tidak bisa dipetakan ke masing-masing pesan.
+    """
+    markers = list(_REPLY_MARKER_PATTERN.finditer(text))
+    if not markers:
+        return None
+    sections = [""] * count
+    for idx, marker in enumerate(markers):
+        number = int(marker.group(1))
+        if not 1 <= number <= count:
+            return None
+        end = markers[idx + 1].start() if idx + 1 < len(markers) else len(text)
+        section = text[marker.end():end].strip()
+        sections[number - 1] = f"{sections[number - 1]}\n\n{section}".strip() if sections[number - 1] else section
+    if not all(sections):
+        return None
+    return sections
+
+
+class ChannelDispatcher(Generic[T]):
+    """
+    Mengantrekan permintaan per channel dan memprosesnya berurutan dengan satu worker per channel.
+    Permintaan yang datang dalam jendela `window_seconds` (atau yang menumpuk selama batch
+    sebelumnya diproses) digabung menjadi satu batch untuk `handler`.
+    """
+    def __init__(self, handler: Callable[[int, list[T]], Awaitable[None]], *,
+                 window_seconds: float = COALESCE_WINDOW_SECONDS,
+                 max_batch_size: int = MAX_REQUESTS_PER_BURST):
+        self._handler = handler
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._queues: dict[int, asyncio.Queue[T]] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+
+    def submit(self, channel_id: int, request: T):
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = asyncio.Queue()
+        queue.put_nowait(request)
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.create_task(self._run_worker(channel_id, queue), name=f"ai-channel-worker-{channel_id}")
+
+    def pending_count(self, channel_id: int) -> int:
+        queue = self._queues.get(channel_id)
+        return queue.qsize() if queue else 0
+
+    def cancel_all(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._queues.clear()
+
+    async def _collect_batch(self, queue: asyncio.Queue[T], first: T) -> list[T]:
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_worker(self, channel_id: int, queue: asyncio.Queue[T]):
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), timeout=WORKER_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    break
+                continue
+            batch = await self._collect_batch(queue, first)
+            if len(batch) > 1:
+                _logger.info(f"Channel {channel_id}: {len(batch)} permintaan digabung menjadi satu giliran.")
+            try:
+                await self._handler(channel_id, batch)
+            except Exception as e:
+                _logger.error(f"Handler dispatcher untuk channel {channel_id} gagal: {e}", exc_info=True)
+        # Worker idle: lepaskan antrean agar channel yang sepi tidak menahan memori.
+        if self._workers.get(channel_id) is asyncio.current_task():
+            del self._workers[channel_id]
+        if self._queues.get(channel_id) is queue:
+            del self._queues[channel_id]
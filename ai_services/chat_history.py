@@ -0,0 +1,152 @@
+# Noelle_Bot/ai_services/chat_history.py
+
+import logging
+from google.genai import types as genai_types
+
+_logger = logging.getLogger("noelle_bot.ai.chat_history")
+
+# Perkiraan biaya token untuk part non-teks (gambar, dll.) saat menghitung proporsi.
+NON_TEXT_PART_CHAR_EQUIVALENT = 1000
+
+
+def estimate_content_size(content: genai_types.Content) -> int:
+    """Perkiraan ukuran relatif satu Content (dalam karakter) untuk membagi jumlah token."""
+    size = 0
+    for part in content.parts or []:
+        if part.text:
+            size += len(part.text)
+        else:
+            size += NON_TEXT_PART_CHAR_EQUIVALENT
+    return max(size, 1)
+
+
+def estimate_content_bytes(content: genai_types.Content) -> int:
+    """Perkiraan memori satu Content: panjang teks ditambah ukuran data biner (gambar inline)."""
+    size = 0
+    for part in content.parts or []:
+        if part.text:
+            size += len(part.text)
+        if part.inline_data and part.inline_data.data:
+            size += len(part.inline_data.data)
+    return size
+
+
+def split_into_turns(history: list[genai_types.Content]) -> list[list[genai_types.Content]]:
+    """Mengelompokkan histori menjadi giliran: satu Content 'user' diikuti semua balasan 'model'-nya."""
+    turns: list[list[genai_types.Content]] = []
+    for content in history:
+        if content.role == "user" or not turns:
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+def trim_history_to_budget(history: list[genai_types.Content], current_tokens: int,
+                           target_tokens: int, min_turns_to_keep: int = 2) -> tuple[list[genai_types.Content], int, int]:
+    """
+    Membuang giliran tertua sampai perkiraan ukuran konteks <= `target_tokens`.
+    Token per giliran diperkirakan secara proporsional terhadap `current_tokens` (dari usage_metadata).
+    Mengembalikan (histori_baru, jumlah_giliran_dibuang, perkiraan_token_baru).
+    """
+    turns = split_into_turns(history)
+    if current_tokens <= target_tokens or len(turns) <= min_turns_to_keep:
+        return history, 0, current_tokens
+
+    turn_sizes = [sum(estimate_content_size(c) for c in turn) for turn in turns]
+    total_size = sum(turn_sizes)
+    tokens_per_unit = current_tokens / total_size if total_size else 0
+
+    dropped = 0
+    estimated_tokens = current_tokens
+    while len(turns) - dropped > min_turns_to_keep and estimated_tokens > target_tokens:
+        estimated_tokens -= int(turn_sizes[dropped] * tokens_per_unit)
+        dropped += 1
+
+    kept_history = [content for turn in turns[dropped:] for content in turn]
+    return kept_history, dropped, max(estimated_tokens, 0)
+
+
+# --- Kompaksi dengan Ringkasan ---
+
+SUMMARY_PREFIX = "[Ringkasan percakapan sebelumnya]"
+SUMMARY_ACK_TEXT = "Baik, saya akan melanjutkan percakapan berdasarkan ringkasan tersebut."
+SUMMARY_PROMPT_TEMPLATE = """
+Anda meringkas percakapan Discord antara beberapa pengguna dan asisten AI bernama Noelle.
+Tulis ringkasan padat (maksimal {max_words} kata) yang mempertahankan: fakta penting, keputusan,
+preferensi pengguna, nama pengguna yang terlibat, dan pertanyaan yang belum terjawab.
+Jangan menambahkan informasi baru. Tulis dalam bahasa yang sama dengan percakapan.
+
+Percakapan:
+---
+{transcript}
+---
+"""
+
+
+def render_transcript(turns: list[list[genai_types.Content]]) -> str:
+    """Mengubah giliran menjadi transkrip teks polos untuk diringkas (part non-teks ditandai saja)."""
+    lines = []
+    for turn in turns:
+        for content in turn:
+            speaker = "Noelle" if content.role == "model" else "Pengguna"
+            texts = [part.text if part.text else "[lampiran]" for part in content.parts or []]
+            if texts:
+                lines.append(f"{speaker}: {' '.join(texts).strip()}")
+    return "\n".join(lines)
+
+
+def build_summary_prompt(turns: list[list[genai_types.Content]], max_words: int = 300) -> str:
+    return SUMMARY_PROMPT_TEMPLATE.format(max_words=max_words, transcript=render_transcript(turns))
+
+
+def build_summary_contents(summary_text: str) -> list[genai_types.Content]:
+    """Pasangan giliran user/model yang menggantikan histori lama dengan ringkasannya."""
+    return [
+        genai_types.Content(role="user", parts=[genai_types.Part(text=f"{SUMMARY_PREFIX}\n{summary_text.strip()}")]),
+        genai_types.Content(role="model", parts=[genai_types.Part(text=SUMMARY_ACK_TEXT)]),
+    ]
+
+
+def estimate_tokens_for(contents: list[genai_types.Content], reference_contents: list[genai_types.Content],
+                        reference_tokens: int) -> int:
+    """Perkiraan token `contents` secara proporsional terhadap `reference_contents` yang jumlah tokennya diketahui."""
+    reference_size = sum(estimate_content_size(c) for c in reference_contents)
+    if not reference_size or not reference_tokens:
+        return 0
+    return int(sum(estimate_content_size(c) for c in contents) * reference_tokens / reference_size)
+
+
+# --- Serialisasi untuk Penyimpanan ---
+# Bentuk ringkas: [{"r": "user"|"model", "t": ["teks", ...]}, ...]. Hanya teks yang disimpan;
+# part non-teks (gambar, dll.) diganti penanda agar urutan giliran tetap utuh.
+
+ATTACHMENT_PLACEHOLDER_TEXT = "[lampiran]"
+
+
+def serialize_history(history: list[genai_types.Content]) -> list[dict]:
+    serialized = []
+    for content in history:
+        texts = []
+        for part in content.parts or []:
+            if part.thought:
+                continue
+            if part.text:
+                texts.append(part.text)
+            elif not texts or texts[-1] != ATTACHMENT_PLACEHOLDER_TEXT:
+                texts.append(ATTACHMENT_PLACEHOLDER_TEXT)
+        if texts:
+            serialized.append({"r": content.role or "user", "t": texts})
+    return serialized
+
+
+def deserialize_history(serialized: list[dict]) -> list[genai_types.Content]:
+    history = []
+    for entry in serialized or []:
+        texts = [text for text in entry.get("t") or [] if isinstance(text, str) and text]
+        if texts:
+            history.append(genai_types.Content(role=entry.get("r", "user"), parts=[genai_types.Part(text=text) for text in texts]))
+    # Histori harus dimulai dengan giliran user agar valid untuk sesi chat.
+    while history and history[0].role != "user":
+        history.pop(0)
+    return history
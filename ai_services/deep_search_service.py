@@ -4,11 +4,15 @@ import os
 import google.genai as genai
 from google.genai import types as genai_types
 from google.api_core import exceptions as google_exceptions
+from google.genai import errors as genai_errors
 import logging
 import asyncio
 import discord
 from typing import List, Optional, Tuple, Dict
 
+from . import gemini_client as gemini_services
+from utils.rate_limit import TokenBucket
+
 # --- Konfigurasi Model dan API ---
 _logger = logging.getLogger("noelle_bot.ai.deep_search")
 DEEP_RESEARCH_API_KEY = os.getenv('DEEP_RESEARCH_API_KEY')
@@ -16,7 +20,10 @@ DEEP_RESEARCH_API_KEY = os.getenv('DEEP_RESEARCH_API_KEY')
 # --- PERUBAHAN: Menggunakan model stabil ---
 PLANNER_REPORTER_MODEL = "models/gemini-2.5-flash" 
 SEARCHER_MODEL = "models/gemini-2.0-flash"
-RATE_LIMIT_DELAY_SECONDS = 4.1
+# Kuota per menit milik DEEP_RESEARCH_API_KEY. Semua agen Deep Search berbagi satu token bucket.
+DEEP_RESEARCH_REQUESTS_PER_MINUTE = float(os.getenv('DEEP_RESEARCH_RPM', '15'))
+DEEP_RESEARCH_BURST = float(os.getenv('DEEP_RESEARCH_BURST', '8'))
+DEEP_SEARCH_REQUEST_TIMEOUT_SECONDS = 180.0
 
 # --- Prompt Templates (tetap sama) ---
 PLANNER_CLARIFICATION_PROMPT_TEMPLATE = """
@@ -98,9 +105,21 @@ def initialize_deep_search_client():
         _deep_search_client = None
 initialize_deep_search_client()
 
+_deep_search_rate_limiter = TokenBucket.per_minute(DEEP_RESEARCH_REQUESTS_PER_MINUTE, burst=DEEP_RESEARCH_BURST)
+
+async def _generate(*, model: str, contents, config: Optional[genai_types.GenerateContentConfig] = None,
+                    guild_id: Optional[int] = None) -> genai_types.GenerateContentResponse:
+    """Memanggil Gemini dengan klien Deep Search (prioritas BULK di governor). Setiap percobaan, termasuk retry, memakai satu token rate limiter."""
+    return await gemini_services.generate_content(
+        model=model, contents=contents, config=config,
+        client=_deep_search_client, timeout=DEEP_SEARCH_REQUEST_TIMEOUT_SECONDS,
+        priority=gemini_services.Priority.BULK, guild_id=guild_id,
+        rate_limiter=_deep_search_rate_limiter
+    )
+
 # --- Fungsi-fungsi Agen ---
 
-async def generate_questions(topic: str) -> Optional[str]:
+async def generate_questions(topic: str, guild_id: Optional[int] = None) -> Optional[str]:
     """Menghasilkan pertanyaan klarifikasi, dengan kemampuan grounding."""
     if not _deep_search_client: return None
     prompt = PLANNER_CLARIFICATION_PROMPT_TEMPLATE.format(topic=topic)
@@ -112,18 +131,18 @@ async def generate_questions(topic: str) -> Optional[str]:
     # ----------------------------------------------------
 
     try:
-        response = await asyncio.to_thread(
-            _deep_search_client.models.generate_content,
+        response = await _generate(
             model=PLANNER_REPORTER_MODEL,
             contents=prompt,
-            config=config # Gunakan config baru
+            config=config, # Gunakan config baru
+            guild_id=guild_id
         )
         return response.text
     except Exception as e:
         _logger.error(f"Gagal generate pertanyaan klarifikasi: {e}")
         return None
 
-async def _run_planner(topic: str, mode: str, user_context: str) -> List[str]:
+async def _run_planner(topic: str, mode: str, user_context: str, guild_id: Optional[int] = None) -> List[str]:
     """Menjalankan agen Perencana dengan konteks dan kemampuan grounding."""
     num_queries = 4 if mode == "fast" else 6
     prompt = PLANNER_PROMPT_TEMPLATE.format(topic=topic, num_queries=num_queries, user_context=user_context)
@@ -134,18 +153,18 @@ async def _run_planner(topic: str, mode: str, user_context: str) -> List[str]:
     )
     # ----------------------------------------------------
 
-    response = await asyncio.to_thread(
-        _deep_search_client.models.generate_content,
+    response = await _generate(
         model=PLANNER_REPORTER_MODEL,
         contents=prompt,
-        config=config # Gunakan config baru
+        config=config, # Gunakan config baru
+        guild_id=guild_id
     )
     
     sub_topics = [line.strip() for line in response.text.split('\n') if line.strip() and line.startswith(tuple(f"{i}." for i in range(10)))]
     _logger.info(f"Planner menghasilkan {len(sub_topics)} sub-topik untuk '{topic}' dengan konteks.")
     return sub_topics
 
-async def _run_searcher_for_sub_topic(sub_topic: str) -> Tuple[str, Dict[str, str]]:
+async def _run_searcher_for_sub_topic(sub_topic: str, guild_id: Optional[int] = None) -> Tuple[str, Dict[str, str]]:
     """
     Menjalankan agen Peneliti dan mengembalikan teks beserta dictionary sumber {uri: title}.
     """
@@ -154,9 +173,7 @@ async def _run_searcher_for_sub_topic(sub_topic: str) -> Tuple[str, Dict[str, st
         tools=[genai_types.Tool(google_search=genai_types.GoogleSearch())]
     )
     
-    response = await asyncio.to_thread(
-        _deep_search_client.models.generate_content, model=SEARCHER_MODEL, contents=prompt, config=config
-    )
+    response = await _generate(model=SEARCHER_MODEL, contents=prompt, config=config, guild_id=guild_id)
     
     result_text = ""
     sources = {} # Gunakan dictionary untuk menyimpan URI -> Judul
@@ -181,15 +198,13 @@ async def _run_searcher_for_sub_topic(sub_topic: str) -> Tuple[str, Dict[str, st
     return f"### Riset untuk: {sub_topic}\n\n{result_text}\n\n---\n\n", sources
 
 
-async def _run_reporter(original_topic: str, research_data: str, follow_up: Optional[str]) -> str:
+async def _run_reporter(original_topic: str, research_data: str, follow_up: Optional[str], guild_id: Optional[int] = None) -> str:
     # ... fungsi ini tetap sama ...
     follow_up_instructions = ""
     if follow_up:
         follow_up_instructions = f"PENTING: Setelah menyusun laporan utama, jawab juga pertanyaan spesifik berikut di bagian akhir:\n- {follow_up}"
     prompt = REPORTER_PROMPT_TEMPLATE.format(research_data=research_data, follow_up_instructions=follow_up_instructions)
-    response = await asyncio.to_thread(
-        _deep_search_client.models.generate_content, model=PLANNER_REPORTER_MODEL, contents=prompt
-    )
+    response = await _generate(model=PLANNER_REPORTER_MODEL, contents=prompt, guild_id=guild_id)
     return f"## Laporan Riset Mendalam: {original_topic}\n\n{response.text}"
 
 
@@ -203,35 +218,50 @@ async def run_deep_search(interaction: discord.Interaction, topic: str, mode: st
 
     try:
         await interaction.edit_original_response(content="`Tahap 1/3` 🧠 **Merencanakan riset berdasarkan jawaban Anda...**", view=None)
-        sub_topics = await _run_planner(topic, mode, user_context)
+        guild_id = interaction.guild_id
+        sub_topics = await _run_planner(topic, mode, user_context, guild_id=guild_id)
         if not sub_topics: return "Maaf, saya gagal merencanakan riset untuk topik ini.", {}
 
-        research_results = []
-        all_sources = {} # Gunakan dictionary untuk menggabungkan semua sumber
+        # Semua sub-topik diteliti bersamaan; laju panggilan diatur oleh _deep_search_rate_limiter.
         total_sub_topics = len(sub_topics)
-        for i, sub_topic in enumerate(sub_topics):
-            status_msg = f"`Tahap 2/3` ⏳ **Meneliti sub-topik ({i+1}/{total_sub_topics}):**\n> {sub_topic[:100]}"
-            await interaction.edit_original_response(content=status_msg, view=None)
-            
+        completed_count = 0
+        progress_lock = asyncio.Lock()
+
+        async def research_sub_topic(sub_topic: str) -> Tuple[str, Dict[str, str]]:
+            nonlocal completed_count
             try:
-                result_text, sources = await _run_searcher_for_sub_topic(sub_topic)
-                research_results.append(result_text)
-                all_sources.update(sources) # .update() akan menambahkan item baru tanpa duplikasi kunci (URI)
+                result_text, sources = await _run_searcher_for_sub_topic(sub_topic, guild_id=guild_id)
                 _logger.info(f"Penelitian untuk '{sub_topic}' selesai, {len(sources)} sumber ditemukan.")
             except Exception as search_err:
                 _logger.error(f"Gagal meneliti sub-topik '{sub_topic}': {search_err}", exc_info=True)
-                research_results.append(f"### Riset untuk: {sub_topic}\n\n**[GAGAL]** Terjadi kesalahan saat meneliti sub-topik ini.\n\n---\n\n")
-
-            if i < total_sub_topics - 1: await asyncio.sleep(RATE_LIMIT_DELAY_SECONDS)
+                result_text, sources = f"### Riset untuk: {sub_topic}\n\n**[GAGAL]** Terjadi kesalahan saat meneliti sub-topik ini.\n\n---\n\n", {}
+            async with progress_lock:
+                completed_count += 1
+                status_msg = f"`Tahap 2/3` ⏳ **Meneliti {total_sub_topics} sub-topik secara paralel ({completed_count}/{total_sub_topics} selesai).**\n> Terakhir selesai: {sub_topic[:100]}"
+                try:
+                    await interaction.edit_original_response(content=status_msg, view=None)
+                except discord.HTTPException as e:
+                    _logger.warning(f"Gagal memperbarui progres Deep Search: {e}")
+            return result_text, sources
+
+        await interaction.edit_original_response(content=f"`Tahap 2/3` ⏳ **Meneliti {total_sub_topics} sub-topik secara paralel...**", view=None)
+        results = await asyncio.gather(*(research_sub_topic(sub_topic) for sub_topic in sub_topics))
+
+        research_results = [result_text for result_text, _ in results]
+        all_sources = {} # Gunakan dictionary untuk menggabungkan semua sumber
+        for _, sources in results:
+            all_sources.update(sources) # .update() akan menambahkan item baru tanpa duplikasi kunci (URI)
 
         await interaction.edit_original_response(content="`Tahap 3/3` ✍️ **Menyusun laporan akhir...**", view=None)
         combined_research = "".join(research_results)
         
-        final_report = await _run_reporter(topic, combined_research, follow_up)
+        final_report = await _run_reporter(topic, combined_research, follow_up, guild_id=guild_id)
         
         _logger.info(f"Deep Search untuk topik '{topic}' selesai.")
         return final_report, all_sources
 
+    except (gemini_services.CircuitOpenError, genai_errors.APIError) as e:
+        return f"Maaf, riset gagal. {gemini_services.describe_error(e)}", {}
     except google_exceptions.GoogleAPIError as e:
         return f"Terjadi kesalahan pada API Google: {e.message}", {}
     except Exception as e:
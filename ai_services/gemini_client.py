@@ -1,15 +1,30 @@
 # Noelle_AI_Bot/ai_services/gemini_client.py
 
 import os
+import asyncio
+import contextlib
+from typing import AsyncIterator, Awaitable, Callable
 import google.genai as genai
+from google.genai import types as genai_types
 import logging
 from google.api_core import exceptions as google_exceptions
 
+from .gemini_governor import governor, Priority
+from . import gemini_resilience
+from .gemini_resilience import CircuitOpenError, describe_error
+from utils.rate_limit import TokenBucket
+
 _logger = logging.getLogger("noelle_bot.ai.gemini_client") # Nama logger yang lebih spesifik
 
 GEMINI_TEXT_MODEL_NAME = "models/gemini-2.0-flash"
 GEMINI_IMAGE_GEN_MODEL_NAME = "models/gemini-2.0-flash-preview-image-generation" 
 DESIGNATED_AI_CHANNEL_NAME = "ai-channel"
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 90.0
+# Batas waktu menunggu chunk berikutnya pada mode streaming.
+STREAM_CHUNK_TIMEOUT_SECONDS = 60.0
+STREAM_RESPONSES_ENABLED = os.getenv('AI_STREAM_RESPONSES', 'true').lower() not in ('0', 'false', 'no')
+# Model gambar jauh lebih lambat dan kuotanya kecil, jadi dibatasi lebih ketat.
+IMAGE_MODEL_MAX_CONCURRENCY = int(os.getenv('GEMINI_IMAGE_MAX_CONCURRENCY', '2'))
 
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
@@ -81,5 +96,173 @@ def is_image_service_enabled() -> bool:
 def get_designated_ai_channel_name() -> str:
     return DESIGNATED_AI_CHANNEL_NAME
 
+# --- Lapisan Panggilan Async (client.aio) ---
+# Semua pemanggilan Gemini di bot melewati fungsi-fungsi ini agar tidak
+# memakai thread pool default (asyncio.to_thread) dan mendukung timeout/pembatalan.
+# Setiap percobaan harus mendapat slot dari governor (prioritas + keadilan per guild),
+# dan dibungkus gemini_resilience (retry dengan backoff, circuit breaker per model, hedging opsional).
+# Jeda backoff terjadi di luar slot governor agar tidak menahan kuota pemanggil lain.
+
+def _chat_model(chat_session: genai.chats.AsyncChat) -> str:
+    return getattr(chat_session, '_model', None) or GEMINI_TEXT_MODEL_NAME
+
+def _breaker_name(model: str, client: genai.Client | None) -> str:
+    """Klien lain (mis. Deep Search) memakai API key sendiri, jadi breaker-nya dipisah."""
+    if client is None or client is _gemini_client:
+        return model
+    return f"{model}@{id(client):x}"
+
+def _hedge_delay(hedge: bool) -> float | None:
+    return gemini_resilience.HEDGE_AFTER_SECONDS if hedge and gemini_resilience.HEDGE_AFTER_SECONDS > 0 else None
+
+async def generate_content(*, model: str, contents, config: genai_types.GenerateContentConfig | None = None,
+                           client: genai.Client | None = None,
+                           timeout: float | None = DEFAULT_REQUEST_TIMEOUT_SECONDS,
+                           priority: Priority = Priority.INTERACTIVE,
+                           guild_id: int | None = None,
+                           hedge: bool = False,
+                           rate_limiter: TokenBucket | None = None) -> genai_types.GenerateContentResponse:
+    """
+    Memanggil models.generate_content lewat permukaan async SDK.
+    Melempar RuntimeError jika klien tidak tersedia, CircuitOpenError jika model sedang dianggap down,
+    dan TimeoutError jika satu percobaan melewati `timeout` (waktu antre di governor tidak dihitung).
+    Error transien dicoba ulang; `hedge=True` mengirim request cadangan bila yang pertama lambat.
+    Pembatalan task pemanggil ikut membatalkan request HTTP yang sedang berjalan.
+    Dengan `rate_limiter`, setiap percobaan (termasuk retry dan hedge) mengambil satu token
+    sebelum meminta slot governor, karena masing-masing adalah request terpisah ke API.
+    """
+    active_client = client or _gemini_client
+    if active_client is None:
+        raise RuntimeError("Klien Google GenAI tidak tersedia.")
+
+    async def attempt() -> genai_types.GenerateContentResponse:
+        if rate_limiter is not None:
+            waited = await rate_limiter.acquire()
+            if waited > 0.5:
+                _logger.info(f"Panggilan '{model}' menunggu rate limiter {waited:.1f} detik.")
+        async with governor.slot(model, priority, guild_id):
+            return await asyncio.wait_for(
+                active_client.aio.models.generate_content(model=model, contents=contents, config=config),
+                timeout=timeout
+            )
+
+    return await gemini_resilience.call_with_retry(_breaker_name(model, active_client), attempt, hedge_after=_hedge_delay(hedge))
+
+def create_chat_session(*, model: str = GEMINI_TEXT_MODEL_NAME, history: list | None = None,
+                        config: genai_types.GenerateContentConfig | None = None,
+                        client: genai.Client | None = None) -> genai.chats.AsyncChat:
+    """Membuat sesi chat async (client.aio.chats) baru."""
+    active_client = client or _gemini_client
+    if active_client is None:
+        raise RuntimeError("Klien Google GenAI tidak tersedia.")
+    return active_client.aio.chats.create(model=model, history=history or [], config=config)
+
+async def _iterate_with_timeout(stream: AsyncIterator[genai_types.GenerateContentResponse],
+                                chunk_timeout: float | None) -> AsyncIterator[genai_types.GenerateContentResponse]:
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), timeout=chunk_timeout)
+        except StopAsyncIteration:
+            return
+        yield chunk
+
+class _OpenedStream:
+    """Stream yang chunk pertamanya sudah diterima, beserta slot governor yang masih ditahan."""
+    def __init__(self, first_chunk, iterator, exit_stack: contextlib.AsyncExitStack):
+        self.first_chunk = first_chunk
+        self.iterator = iterator
+        self._exit_stack = exit_stack
+
+    async def aclose(self):
+        await self._exit_stack.aclose()
+
+async def _open_stream(model: str, priority: Priority, guild_id: int | None,
+                       start_stream: Callable[[], Awaitable[AsyncIterator[genai_types.GenerateContentResponse]]],
+                       chunk_timeout: float | None) -> _OpenedStream:
+    """Mengambil slot governor, memulai stream, dan menunggu chunk pertama (titik terakhir yang aman untuk retry)."""
+    exit_stack = contextlib.AsyncExitStack()
+    try:
+        await exit_stack.enter_async_context(governor.slot(model, priority, guild_id))
+        stream = await asyncio.wait_for(start_stream(), timeout=chunk_timeout)
+        iterator = _iterate_with_timeout(stream, chunk_timeout)
+        exit_stack.push_async_callback(iterator.aclose)
+        first_chunk = await anext(iterator, None)
+    except BaseException:
+        await exit_stack.aclose()
+        raise
+    return _OpenedStream(first_chunk, iterator, exit_stack)
+
+async def _resilient_stream(breaker_name: str, model: str, priority: Priority, guild_id: int | None,
+                            start_stream: Callable[[], Awaitable[AsyncIterator[genai_types.GenerateContentResponse]]],
+                            chunk_timeout: float | None, hedge: bool) -> AsyncIterator[genai_types.GenerateContentResponse]:
+    """Retry/hedging hanya sampai chunk pertama; setelah itu error diteruskan apa adanya ke pemanggil."""
+    opened = await gemini_resilience.call_with_retry(
+        breaker_name,
+        lambda: _open_stream(model, priority, guild_id, start_stream, chunk_timeout),
+        hedge_after=_hedge_delay(hedge),
+        discard=lambda loser: loser.aclose()
+    )
+    try:
+        if opened.first_chunk is None:
+            return
+        yield opened.first_chunk
+        async for chunk in opened.iterator:
+            yield chunk
+    finally:
+        await opened.aclose()
+
+def stream_content(*, model: str, contents, config: genai_types.GenerateContentConfig | None = None,
+                   client: genai.Client | None = None,
+                   chunk_timeout: float | None = STREAM_CHUNK_TIMEOUT_SECONDS,
+                   priority: Priority = Priority.INTERACTIVE,
+                   guild_id: int | None = None,
+                   hedge: bool = False) -> AsyncIterator[genai_types.GenerateContentResponse]:
+    """Versi streaming dari generate_content. Setiap chunk harus tiba dalam `chunk_timeout` detik; slot governor ditahan selama stream berjalan."""
+    active_client = client or _gemini_client
+    if active_client is None:
+        raise RuntimeError("Klien Google GenAI tidak tersedia.")
+    return _resilient_stream(
+        _breaker_name(model, active_client), model, priority, guild_id,
+        lambda: active_client.aio.models.generate_content_stream(model=model, contents=contents, config=config),
+        chunk_timeout, hedge
+    )
+
+def stream_chat_message(chat_session: genai.chats.AsyncChat, message, *,
+                        config: genai_types.GenerateContentConfig | None = None,
+                        chunk_timeout: float | None = STREAM_CHUNK_TIMEOUT_SECONDS,
+                        priority: Priority = Priority.INTERACTIVE,
+                        guild_id: int | None = None,
+                        hedge: bool = False) -> AsyncIterator[genai_types.GenerateContentResponse]:
+    """
+    Versi streaming dari send_chat_message. Histori sesi baru dicatat oleh SDK
+    setelah stream dikonsumsi sampai habis, sehingga stream yang gagal sebelum chunk
+    pertama atau kalah hedging tidak mengubah histori dan aman diulang.
+    """
+    model = _chat_model(chat_session)
+    return _resilient_stream(
+        model, model, priority, guild_id,
+        lambda: chat_session.send_message_stream(message=message, config=config),
+        chunk_timeout, hedge
+    )
+
+async def send_chat_message(chat_session: genai.chats.AsyncChat, message, *,
+                            config: genai_types.GenerateContentConfig | None = None,
+                            timeout: float | None = DEFAULT_REQUEST_TIMEOUT_SECONDS,
+                            priority: Priority = Priority.INTERACTIVE,
+                            guild_id: int | None = None) -> genai_types.GenerateContentResponse:
+    """
+    Mengirim pesan ke sesi chat async dengan batas waktu dan retry untuk error transien.
+    Tidak mendukung hedging: dua request yang sama-sama selesai akan mencatat giliran dua kali di histori.
+    """
+    model = _chat_model(chat_session)
+
+    async def attempt() -> genai_types.GenerateContentResponse:
+        async with governor.slot(model, priority, guild_id):
+            return await asyncio.wait_for(chat_session.send_message(message=message, config=config), timeout=timeout)
+
+    return await gemini_resilience.call_with_retry(model, attempt)
+
 # Panggil inisialisasi saat modul diimpor
+governor.set_model_limit(GEMINI_IMAGE_GEN_MODEL_NAME, IMAGE_MODEL_MAX_CONCURRENCY)
 initialize_client()
\ No newline at end of file
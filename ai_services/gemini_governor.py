@@ -0,0 +1,156 @@
+# Noelle_Bot/ai_services/gemini_governor.py
+
+import os
+import enum
+import time
+import asyncio
+import logging
+import contextlib
+from collections import OrderedDict, deque
+from typing import AsyncIterator
+
+_logger = logging.getLogger("noelle_bot.ai.gemini_governor")
+
+DEFAULT_MODEL_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY_PER_MODEL', '8'))
+WAIT_SAMPLE_SIZE = 500 # Jumlah sampel waktu tunggu terakhir per prioritas untuk statistik
+GLOBAL_GUILD_KEY = 0 # Kunci antrean untuk panggilan tanpa guild (DM, tugas latar belakang)
+
+
+class Priority(enum.IntEnum):
+    """Kelas prioritas; nilai lebih kecil dilayani lebih dulu."""
+    INTERACTIVE = 0 # Chat AI channel dan mention
+    PATTERN = 1 # $pattern
+    BULK = 2 # Deep search, generasi gambar, ringkasan latar belakang
+
+
+class _ModelState:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        # prioritas -> (guild_id -> antrean waiter). Guild digilir round-robin agar adil.
+        self.queues: dict[Priority, OrderedDict[int, deque[asyncio.Future]]] = {p: OrderedDict() for p in Priority}
+
+    def queued_count(self, priority: Priority | None = None) -> int:
+        priorities = [priority] if priority is not None else list(Priority)
+        return sum(len(waiters) for p in priorities for waiters in self.queues[p].values())
+
+
+class GeminiGovernor:
+    """
+    Admission controller bersama untuk semua panggilan Gemini.
+    - Batas jumlah panggilan bersamaan per model.
+    - Antrean berprioritas (Priority); di dalam satu prioritas, guild dilayani bergiliran
+      sehingga satu guild yang ramai tidak bisa memonopoli kuota.
+    - Statistik kedalaman antrean dan waktu tunggu.
+    """
+    def __init__(self, default_limit: int = DEFAULT_MODEL_CONCURRENCY):
+        self.default_limit = default_limit
+        self._model_limits: dict[str, int] = {}
+        self._models: dict[str, _ModelState] = {}
+        self._wait_samples: dict[Priority, deque[float]] = {p: deque(maxlen=WAIT_SAMPLE_SIZE) for p in Priority}
+        self._admitted: dict[Priority, int] = {p: 0 for p in Priority}
+
+    def set_model_limit(self, model: str, limit: int):
+        self._model_limits[model] = max(1, limit)
+        if model in self._models:
+            self._models[model].limit = self._model_limits[model]
+            self._grant_waiters(self._models[model])
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = _ModelState(self._model_limits.get(model, self.default_limit))
+        return state
+
+    def _grant_waiters(self, state: _ModelState):
+        while state.active < state.limit:
+            waiter = self._pop_next_waiter(state)
+            if waiter is None:
+                return
+            state.active += 1
+            waiter.set_result(None)
+
+    @staticmethod
+    def _pop_next_waiter(state: _ModelState) -> asyncio.Future | None:
+        for priority in Priority:
+            guild_queues = state.queues[priority]
+            while guild_queues:
+                guild_id, waiters = next(iter(guild_queues.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    guild_queues.move_to_end(guild_id)
+                else:
+                    del guild_queues[guild_id]
+                if not waiter.done():
+                    return waiter
+        return None
+
+    def _release(self, state: _ModelState):
+        state.active -= 1
+        self._grant_waiters(state)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model: str, priority: Priority = Priority.INTERACTIVE, guild_id: int | None = None) -> AsyncIterator[float]:
+        """Menunggu giliran untuk `model`; menghasilkan lama menunggu (detik)."""
+        state = self._state(model)
+        started_at = time.monotonic()
+        if state.active < state.limit and state.queued_count() == 0:
+            state.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            guild_key = guild_id if guild_id is not None else GLOBAL_GUILD_KEY
+            state.queues[priority].setdefault(guild_key, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(state) # Slot sudah diberikan tepat sebelum pembatalan
+                else:
+                    self._discard_waiter(state, priority, guild_key, waiter)
+                raise
+        waited = time.monotonic() - started_at
+        self._wait_samples[priority].append(waited)
+        self._admitted[priority] += 1
+        if waited > 1.0:
+            _logger.info(f"Panggilan {model} (prioritas {priority.name}, guild {guild_id}) menunggu {waited:.1f} detik di antrean.")
+        try:
+            yield waited
+        finally:
+            self._release(state)
+
+    @staticmethod
+    def _discard_waiter(state: _ModelState, priority: Priority, guild_key: int, waiter: asyncio.Future):
+        waiters = state.queues[priority].get(guild_key)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del state.queues[priority][guild_key]
+
+    def stats(self) -> dict:
+        """Ringkasan per model (aktif/batas/antrean per prioritas) dan waktu tunggu per prioritas."""
+        models = {
+            model: {
+                "active": state.active,
+                "limit": state.limit,
+                "queued": {p.name: state.queued_count(p) for p in Priority},
+                "queued_guilds": sum(len(state.queues[p]) for p in Priority),
+            }
+            for model, state in self._models.items()
+        }
+        waits = {}
+        for priority, samples in self._wait_samples.items():
+            ordered = sorted(samples)
+            waits[priority.name] = {
+                "admitted": self._admitted[priority],
+                "avg": sum(ordered) / len(ordered) if ordered else 0.0,
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0,
+                "max": ordered[-1] if ordered else 0.0,
+            }
+        return {"models": models, "wait_seconds": waits}
+
+
+governor = GeminiGovernor()
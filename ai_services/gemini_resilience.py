@@ -0,0 +1,249 @@
+# Noelle_Bot/ai_services/gemini_resilience.py
+
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+from google.api_core import exceptions as google_exceptions
+
+_logger = logging.getLogger("noelle_bot.ai.gemini_resilience")
+
+T = TypeVar("T")
+
+MAX_ATTEMPTS = int(os.getenv('GEMINI_MAX_ATTEMPTS', '3'))
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 20.0
+# Jika server meminta menunggu lebih lama dari ini, jangan dicoba ulang (langsung gagal).
+MAX_RETRY_AFTER_SECONDS = 30.0
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('GEMINI_BREAKER_FAILURES', '5'))
+BREAKER_RECOVERY_SECONDS = float(os.getenv('GEMINI_BREAKER_RECOVERY_SECONDS', '30'))
+# Jeda sebelum request cadangan (hedge) dikirim pada jalur interaktif. 0 = nonaktif.
+HEDGE_AFTER_SECONDS = float(os.getenv('GEMINI_HEDGE_AFTER_SECONDS', '6'))
+
+_RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_RETRY_DELAY_PATTERN = re.compile(r"^\s*([\d.]+)s\s*$")
+
+
+class CircuitOpenError(RuntimeError):
+    """Dilempar tanpa memanggil API ketika circuit breaker sebuah model sedang terbuka."""
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"Circuit breaker '{name}' terbuka; coba lagi dalam {retry_in:.0f} detik.")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker sederhana per model.
+    - CLOSED: semua panggilan lewat; `failure_threshold` kegagalan transien berturut-turut membukanya.
+    - OPEN: semua panggilan langsung gagal (CircuitOpenError) selama `recovery_seconds`.
+    - HALF_OPEN: satu panggilan uji dibiarkan lewat; sukses menutup, gagal membuka lagi.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_seconds: float = BREAKER_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Melempar CircuitOpenError jika panggilan tidak boleh dilakukan sekarang."""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.recovery_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            raise CircuitOpenError(self.name, self.recovery_seconds)
+        self._probe_in_flight = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            _logger.info(f"Circuit breaker '{self.name}' ditutup kembali.")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                _logger.warning(f"Circuit breaker '{self.name}' DIBUKA setelah {self.consecutive_failures} kegagalan berturut-turut.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Dipanggil jika panggilan uji berakhir tanpa balasan dari layanan (mis. dibatalkan atau error lokal)."""
+        self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures, "times_opened": self.times_opened}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+def breaker_stats() -> dict[str, dict]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+# --- Klasifikasi Error ---
+
+def _status_code(exc: BaseException) -> int | None:
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code
+    if isinstance(exc, google_exceptions.GoogleAPICallError):
+        return exc.code
+    return None
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True untuk error yang layak dicoba ulang: 5xx, 429, timeout server, dan gangguan jaringan."""
+    if isinstance(exc, (genai_errors.ServerError, httpx.TransportError)):
+        return True
+    if isinstance(exc, (google_exceptions.ServerError, google_exceptions.TooManyRequests,
+                        google_exceptions.DeadlineExceeded, google_exceptions.ServiceUnavailable)):
+        return True
+    return _status_code(exc) in _RETRYABLE_STATUS_CODES
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """Membaca petunjuk jeda dari header Retry-After atau detail RetryInfo ('retryDelay': '12s')."""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        header_value = headers.get('retry-after')
+        if header_value:
+            try:
+                return max(0.0, float(header_value))
+            except ValueError:
+                pass
+    details = getattr(exc, 'details', None)
+    if isinstance(details, dict):
+        for detail in (details.get('error') or {}).get('details') or []:
+            if isinstance(detail, dict) and 'retryDelay' in detail:
+                match = _RETRY_DELAY_PATTERN.match(str(detail['retryDelay']))
+                if match:
+                    return float(match.group(1))
+    return None
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """Exponential backoff dengan full jitter; petunjuk server dipakai sebagai batas bawah."""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def describe_error(exc: BaseException) -> str:
+    """Pesan yang aman ditampilkan ke pengguna untuk error dari lapisan Gemini."""
+    if isinstance(exc, CircuitOpenError):
+        return f"Layanan AI sedang bermasalah, jadi permintaan ditahan sementara. Coba lagi dalam ±{max(1, round(exc.retry_in))} detik."
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return "AI terlalu lama merespons. Silakan coba lagi."
+    if _status_code(exc) == 429 or isinstance(exc, google_exceptions.TooManyRequests):
+        return "Kuota AI sedang penuh. Silakan coba lagi sebentar lagi."
+    if is_transient_error(exc):
+        return "Layanan AI sedang sibuk atau bermasalah. Silakan coba lagi sebentar lagi."
+    return f"Terjadi error: {exc}"
+
+
+# --- Eksekusi dengan Retry, Breaker, dan Hedging ---
+
+async def _hedged(attempt: Callable[[], Awaitable[T]], hedge_after: float,
+                  discard: Callable[[T], Awaitable[Any]] | None = None) -> T:
+    """
+    Menjalankan `attempt`; jika belum selesai setelah `hedge_after` detik, satu salinan cadangan
+    dijalankan. Hasil sukses pertama dipakai, salinan lain dibatalkan (hasilnya diserahkan ke `discard`).
+    """
+    tasks = [asyncio.create_task(attempt())]
+    winner: asyncio.Task | None = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            _logger.info(f"Request belum selesai setelah {hedge_after:.1f} detik, mengirim request cadangan.")
+            tasks.append(asyncio.create_task(attempt()))
+        pending = set(tasks)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    return task.result()
+                first_error = first_error or task.exception()
+        raise first_error
+    finally:
+        losers = [task for task in tasks if task is not winner]
+        for task in losers:
+            task.cancel()
+        if losers:
+            await asyncio.gather(*losers, return_exceptions=True)
+        for task in losers:
+            if discard and not task.cancelled() and task.exception() is None:
+                await discard(task.result())
+
+async def call_with_retry(breaker_name: str, attempt: Callable[[], Awaitable[T]], *,
+                          max_attempts: int = MAX_ATTEMPTS, hedge_after: float | None = None,
+                          discard: Callable[[T], Awaitable[Any]] | None = None) -> T:
+    """
+    Menjalankan `attempt` dengan circuit breaker `breaker_name`, retry untuk error transien
+    (exponential backoff + jitter, menghormati Retry-After), dan hedging opsional.
+    Timeout lokal (asyncio.TimeoutError) dihitung sebagai kegagalan tetapi tidak dicoba ulang.
+    """
+    breaker = get_breaker(breaker_name)
+    for attempt_index in range(max_attempts):
+        breaker.before_call()
+        try:
+            if hedge_after:
+                result = await _hedged(attempt, hedge_after, discard)
+            else:
+                result = await attempt()
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except (asyncio.TimeoutError, TimeoutError):
+            breaker.record_failure()
+            raise
+        except Exception as e:
+            if not is_transient_error(e):
+                if _status_code(e) is not None:
+                    # Balasan API non-transien (mis. 400 karena prompt) membuktikan layanan menjawab.
+                    breaker.record_success()
+                else:
+                    breaker.release_probe() # Error lokal: tidak menilai kondisi layanan
+                raise
+            breaker.record_failure()
+            hint = retry_after_seconds(e)
+            if (attempt_index + 1 >= max_attempts or breaker.state == CircuitBreaker.OPEN
+                    or (hint is not None and hint > MAX_RETRY_AFTER_SECONDS)):
+                raise
+            delay = backoff_delay(attempt_index, hint)
+            _logger.warning(f"Panggilan '{breaker_name}' gagal sementara ({type(e).__name__}: {_status_code(e)}), "
+                            f"percobaan {attempt_index + 1}/{max_attempts}. Mencoba lagi dalam {delay:.1f} detik.")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+    raise RuntimeError("call_with_retry: max_attempts harus lebih besar dari 0.")
@@ -8,37 +8,117 @@ from google.genai import types as genai_types
 from google.api_core import exceptions as google_exceptions
 import asyncio
 import io
+import os
 import logging
+import tempfile
 
 from . import gemini_client as gemini_services
-from utils import ai_utils
+from . import gemini_resilience
+from .ai_channel_index import ai_channels
+from . import image_jobs
+from utils import ai_utils, cache_utils, image_ingest
 
 _logger = logging.getLogger("noelle_bot.ai.image_generator")
 
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'noelle_image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(float(os.getenv('IMAGE_CACHE_MAX_MB', '512')) * 1024 * 1024)
+MAX_VARIANTS = 4
+VARIANT_CONCURRENCY = 2
+GALLERY_EMBED_URL = "https://discord.com" # URL embed bersama agar beberapa gambar tampil sebagai galeri
+_image_cache = cache_utils.DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, name="generated_images", suffix=".png")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt yang hanya berbeda huruf besar/kecil atau spasi dianggap sama untuk cache."""
+    return " ".join(prompt.split()).casefold()
+
 class ImageGeneratorCog(commands.Cog, name="AI Image Generator"):
     """Cog ini menangani command /generate_image secara mandiri."""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.job_scheduler = image_jobs.ImageJobScheduler()
         _logger.info("ImageGeneratorCog (Mandiri) instance dibuat.")
     
     async def _ensure_ai_channel(self, interaction: discord.Interaction) -> bool:
-        designated_name = gemini_services.get_designated_ai_channel_name().lower()
-        
         # Cek jika interaksi sudah di-defer/direspons
         send_method = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
 
-        if not isinstance(interaction.channel, discord.TextChannel) or interaction.channel.name.lower() != designated_name:
+        if not ai_channels.is_ai_channel(interaction.channel):
             if not interaction.response.is_done():
                 await interaction.response.defer(ephemeral=True)
             
-            await interaction.followup.send(f"Perintah ini hanya bisa digunakan di channel `{gemini_services.get_designated_ai_channel_name()}`.", ephemeral=True)
+            await interaction.followup.send(f"Perintah ini hanya bisa digunakan di channel `{ai_channels.channel_name(interaction.guild_id)}`.", ephemeral=True)
             return False
         return True
 
+    async def _generate_image(self, prompt: str, guild_id: int | None) -> tuple[bytes | None, str | None]:
+        """Memanggil model gambar. Mengembalikan (bytes gambar, teks pendamping dari model)."""
+        model_name = gemini_services.GEMINI_IMAGE_GEN_MODEL_NAME
+        _logger.info(f"IMAGE_GEN: Memanggil model '{model_name}' dengan prompt: '{prompt}'.")
+        
+        # --- PERBAIKAN FINAL DAN KRITIS ---
+        # Kita harus meminta KOMBINASI [TEXT, IMAGE] seperti yang diminta oleh pesan error.
+        config = genai_types.GenerateContentConfig(
+            response_modalities=[genai_types.Modality.IMAGE, genai_types.Modality.TEXT]
+        )
+        # ------------------------------------
+
+        response = await gemini_services.generate_content(
+            model=model_name,
+            contents=prompt,
+            config=config,
+            priority=gemini_services.Priority.BULK,
+            guild_id=guild_id
+        )
+        
+        _logger.info("IMAGE_GEN: Menerima respons dari API.")
+
+        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
+            for part in response.candidates[0].content.parts:
+                if part.inline_data and 'image' in part.inline_data.mime_type:
+                    return part.inline_data.data, None
+        return None, response.text if hasattr(response, 'text') else None
+
+    async def _generate_variant(self, prompt: str, variant_index: int, force_fresh: bool, guild_id: int | None) -> tuple[bytes | None, str, str | None]:
+        """Satu variasi gambar lewat cache disk. Mengembalikan (bytes PNG, sumber cache, teks pendamping)."""
+        text_response = None
+
+        async def generate() -> bytes | None:
+            nonlocal text_response
+            img_bytes, text_response = await self._generate_image(prompt, guild_id)
+            return await image_ingest.recompress_png(img_bytes) if img_bytes else None
+
+        # Variasi pertama memakai kunci dasar; variasi berikutnya punya entri cache sendiri.
+        key_parts = [gemini_services.GEMINI_IMAGE_GEN_MODEL_NAME, normalize_prompt(prompt)]
+        if variant_index: key_parts.append(f"variasi-{variant_index}")
+        img_bytes, cache_source = await _image_cache.get_or_compute(_image_cache.make_key(*key_parts), generate, force_refresh=force_fresh)
+        return img_bytes, cache_source, text_response
+
+    async def _run_image_job(self, prompt: str, variants: int, force_fresh: bool, guild_id: int | None) -> list[tuple[bytes | None, str, str | None]]:
+        """Menjalankan semua variasi bersamaan (dibatasi VARIANT_CONCURRENCY; governor tetap membatasi model gambar)."""
+        semaphore = asyncio.Semaphore(VARIANT_CONCURRENCY)
+
+        async def run_variant(index: int):
+            async with semaphore:
+                return await self._generate_variant(prompt, index, force_fresh, guild_id)
+
+        results = await asyncio.gather(*(run_variant(i) for i in range(variants)), return_exceptions=True)
+        successful = [r for r in results if not isinstance(r, BaseException)]
+        if not successful:
+            raise results[0] # Semua variasi gagal: teruskan error pertama
+        for r in results:
+            if isinstance(r, BaseException): _logger.warning(f"IMAGE_GEN: Satu variasi gagal: {r}")
+        return successful
+
     @app_commands.command(name='generate_image', description='Membuat gambar dari teks di channel AI.')
-    @app_commands.describe(prompt='Deskripsikan gambar yang ingin Anda buat.')
+    @app_commands.describe(
+        prompt='Deskripsikan gambar yang ingin Anda buat.',
+        variasi=f'Jumlah variasi gambar yang dibuat sekaligus (1-{MAX_VARIANTS}).',
+        baru='Buat variasi baru walaupun prompt yang sama pernah dibuat (abaikan cache).'
+    )
     @app_commands.guild_only()
-    async def generate_image_command(self, interaction: discord.Interaction, prompt: str):
+    async def generate_image_command(self, interaction: discord.Interaction, prompt: str,
+                                     variasi: app_commands.Range[int, 1, MAX_VARIANTS] = 1, baru: bool = False):
         if not await self._ensure_ai_channel(interaction):
             return
             
@@ -49,49 +129,50 @@ class ImageGeneratorCog(commands.Cog, name="AI Image Generator"):
         if not interaction.response.is_done():
             await interaction.response.defer(ephemeral=False)
 
-        try:
-            client = gemini_services.get_gemini_client()
-            model_name = gemini_services.GEMINI_IMAGE_GEN_MODEL_NAME
-            _logger.info(f"IMAGE_GEN: Memanggil model '{model_name}' dengan prompt: '{prompt}'.")
-            
-            # --- PERBAIKAN FINAL DAN KRITIS ---
-            # Kita harus meminta KOMBINASI [TEXT, IMAGE] seperti yang diminta oleh pesan error.
-            config = genai_types.GenerateContentConfig(
-                response_modalities=[genai_types.Modality.IMAGE, genai_types.Modality.TEXT]
-            )
-            # ------------------------------------
+        async def show_position(position: int):
+            await interaction.edit_original_response(content=f"⏳ Permintaan gambar Anda berada di antrean ke-**{position}**...")
 
-            response = await asyncio.to_thread(
-                client.models.generate_content,
-                model=model_name,
-                contents=prompt,
-                config=config 
+        try:
+            job = image_jobs.ImageJob(
+                interaction.user.id, interaction.guild_id, variasi,
+                lambda: self._run_image_job(prompt, variasi, baru, interaction.guild_id),
+                on_position=show_position
             )
-            
-            _logger.info("IMAGE_GEN: Menerima respons dari API.")
+            try:
+                position = self.job_scheduler.submit(job)
+            except image_jobs.ImageQuotaError as e:
+                # Respons sudah di-defer publik: pesan ephemeral tidak bisa menggantikannya, jadi edit respons awal.
+                await interaction.edit_original_response(content=str(e))
+                return
+            if position:
+                await show_position(position)
 
-            img_bytes = None
-            if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
-                for part in response.candidates[0].content.parts:
-                    if part.inline_data and 'image' in part.inline_data.mime_type:
-                        img_bytes = part.inline_data.data
-                        break
+            results = await job.result
+            images = [(img_bytes, cache_source) for img_bytes, cache_source, _ in results if img_bytes]
 
-            if img_bytes:
-                img_file = discord.File(io.BytesIO(img_bytes), filename="noelle_art.png")
+            if images:
                 description_content = f"**Prompt:** \"{discord.utils.escape_markdown(prompt[:1500])}{'...' if len(prompt)>1500 else ''}\""
-                
-                img_embed = discord.Embed(
-                    title="Gambar Dihasilkan oleh Noelle ✨",
-                    description=description_content,
-                    color=discord.Color.random()
-                )
-                img_embed.set_image(url=f"attachment://{img_file.filename}")
-                img_embed.set_footer(text=f"Diminta oleh: {interaction.user.display_name}")
-
-                await interaction.followup.send(embed=img_embed, file=img_file)
+                footer_text = f"Diminta oleh: {interaction.user.display_name}"
+                if any(cache_source != cache_utils.CACHE_MISS for _, cache_source in images):
+                    footer_text += " • dari cache (gunakan baru:True untuk variasi baru)"
+                files, embeds = [], []
+                for idx, (img_bytes, _) in enumerate(images, start=1):
+                    img_file = discord.File(io.BytesIO(img_bytes), filename=f"noelle_art_{idx}.png")
+                    files.append(img_file)
+                    # Embed dengan URL yang sama digabung Discord menjadi satu galeri.
+                    img_embed = discord.Embed(url=GALLERY_EMBED_URL, color=discord.Color.random())
+                    img_embed.set_image(url=f"attachment://{img_file.filename}")
+                    embeds.append(img_embed)
+                embeds[0].title = "Gambar Dihasilkan oleh Noelle ✨"
+                embeds[0].description = description_content
+                embeds[0].set_footer(text=footer_text)
+                if len(images) < variasi:
+                    embeds[0].add_field(name="Catatan", value=f"{variasi - len(images)} variasi gagal dibuat.", inline=False)
+
+                # Galeri menggantikan respons awal (termasuk pesan antrean jika sempat ditampilkan).
+                await interaction.edit_original_response(content=None, embeds=embeds, attachments=files)
             else:
-                text_response = response.text if hasattr(response, 'text') else "Tidak ada gambar yang dihasilkan."
+                text_response = next((text for _, _, text in results if text), None) or "Tidak ada gambar yang dihasilkan."
                 _logger.warning(f"Tidak ada gambar di respons. Respons teks: {text_response}")
                 await interaction.followup.send(f"Maaf, saya tidak dapat menghasilkan gambar dari prompt tersebut. Mungkin coba deskripsi yang berbeda?\n\n*Respons Teks dari AI: \"{text_response[:1500]}\"*", ephemeral=True)
 
@@ -99,10 +180,14 @@ class ImageGeneratorCog(commands.Cog, name="AI Image Generator"):
             _logger.error(f"Error tak terduga dalam /generate_image: {e}", exc_info=True)
             if not interaction.is_expired():
                 try:
-                    await interaction.followup.send("Terjadi kesalahan internal saat membuat gambar.", ephemeral=True)
+                    error_text = gemini_services.describe_error(e) if isinstance(e, gemini_services.CircuitOpenError) or gemini_resilience.is_transient_error(e) else "Terjadi kesalahan internal saat membuat gambar."
+                    await interaction.followup.send(error_text, ephemeral=True)
                 except discord.errors.HTTPException:
                     pass
 
+    def cog_unload(self):
+        self.job_scheduler.cancel_all()
+
 async def setup(bot: commands.Bot):
     if gemini_services.is_image_service_enabled():
         await bot.add_cog(ImageGeneratorCog(bot))
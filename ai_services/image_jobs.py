@@ -0,0 +1,146 @@
+# Noelle_Bot/ai_services/image_jobs.py
+
+import os
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable
+
+from cachetools import TTLCache
+
+from utils.rate_limit import TokenBucket
+
+_logger = logging.getLogger("noelle_bot.ai.image_jobs")
+
+# Jumlah job /generate_image yang dijalankan bersamaan; job lain menunggu di antrean FIFO.
+IMAGE_JOB_CONCURRENCY = int(os.getenv('IMAGE_JOB_CONCURRENCY', '2'))
+MAX_QUEUED_JOBS = 50
+# Job yang sedang antre/berjalan per pengguna dan per guild.
+USER_MAX_ACTIVE_JOBS = 1
+GUILD_MAX_ACTIVE_JOBS = 4
+# Kuota gambar per jam (setiap variasi dihitung satu gambar).
+USER_IMAGES_PER_HOUR = int(os.getenv('IMAGE_USER_PER_HOUR', '20'))
+GUILD_IMAGES_PER_HOUR = int(os.getenv('IMAGE_GUILD_PER_HOUR', '100'))
+
+
+class ImageQuotaError(Exception):
+    """Permintaan ditolak karena kuota; pesannya aman ditampilkan ke pengguna."""
+
+
+class ImageJob:
+    def __init__(self, user_id: int, guild_id: int, images: int, run: Callable[[], Awaitable[Any]],
+                 on_position: Callable[[int], Awaitable[None]] | None = None):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.images = images
+        self.run = run
+        self.on_position = on_position
+        self.position = 0 # 0 = sedang berjalan
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ImageJobScheduler:
+    """
+    Antrean job generasi gambar dengan kuota per pengguna dan per guild.
+    Kuota dicek saat submit (jumlah job aktif + token bucket per jam), lalu job dijalankan
+    FIFO dengan paling banyak `concurrency` job bersamaan. Posisi antrean dilaporkan lewat
+    `ImageJob.on_position` setiap kali berubah.
+    """
+    def __init__(self, concurrency: int = IMAGE_JOB_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        self._pending: deque[ImageJob] = deque()
+        self._running: set[asyncio.Task] = set()
+        self._user_active: Counter[int] = Counter()
+        self._guild_active: Counter[int] = Counter()
+        self._user_buckets: TTLCache = TTLCache(maxsize=10000, ttl=3600)
+        self._guild_buckets: TTLCache = TTLCache(maxsize=2000, ttl=3600)
+        self.completed_count = 0
+
+    @staticmethod
+    def _bucket(buckets: TTLCache, key: int, per_hour: int) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate=per_hour / 3600.0, capacity=per_hour)
+        return bucket
+
+    def submit(self, job: ImageJob) -> int:
+        """Mendaftarkan job. Mengembalikan posisi antrean (0 = langsung berjalan) atau melempar ImageQuotaError."""
+        if len(self._pending) >= MAX_QUEUED_JOBS:
+            raise ImageQuotaError("Antrean gambar sedang penuh. Silakan coba lagi beberapa saat lagi.")
+        if self._user_active[job.user_id] >= USER_MAX_ACTIVE_JOBS:
+            raise ImageQuotaError("Anda masih punya permintaan gambar yang sedang diproses. Tunggu sampai selesai, ya.")
+        if self._guild_active[job.guild_id] >= GUILD_MAX_ACTIVE_JOBS:
+            raise ImageQuotaError("Server ini sudah mencapai batas permintaan gambar bersamaan. Silakan coba lagi sebentar lagi.")
+        user_bucket = self._bucket(self._user_buckets, job.user_id, USER_IMAGES_PER_HOUR)
+        guild_bucket = self._bucket(self._guild_buckets, job.guild_id, GUILD_IMAGES_PER_HOUR)
+        if job.images > user_bucket.available_tokens:
+            raise ImageQuotaError(f"Kuota gambar Anda ({USER_IMAGES_PER_HOUR} per jam) sudah habis. Silakan coba lagi nanti.")
+        if job.images > guild_bucket.available_tokens:
+            raise ImageQuotaError(f"Kuota gambar server ini ({GUILD_IMAGES_PER_HOUR} per jam) sudah habis. Silakan coba lagi nanti.")
+        user_bucket.try_acquire(job.images)
+        guild_bucket.try_acquire(job.images)
+
+        self._user_active[job.user_id] += 1
+        self._guild_active[job.guild_id] += 1
+        self._pending.append(job)
+        job.position = len(self._pending)
+        self._dispatch()
+        return job.position
+
+    def _dispatch(self):
+        started = False
+        while self._pending and len(self._running) < self.concurrency:
+            job = self._pending.popleft()
+            job.position = 0
+            task = asyncio.create_task(self._run_job(job), name=f"image-job-{job.user_id}")
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            started = True
+        if started:
+            self._report_positions()
+
+    def _report_positions(self):
+        for position, job in enumerate(self._pending, start=1):
+            if job.position != position:
+                job.position = position
+                if job.on_position:
+                    asyncio.create_task(self._notify_position(job, position))
+
+    @staticmethod
+    async def _notify_position(job: ImageJob, position: int):
+        try:
+            await job.on_position(position)
+        except Exception as e:
+            _logger.debug(f"Gagal memperbarui posisi antrean job gambar: {e}")
+
+    async def _run_job(self, job: ImageJob):
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            job.result.cancel()
+            raise
+        except Exception as e:
+            if not job.result.done(): job.result.set_exception(e)
+        else:
+            if not job.result.done(): job.result.set_result(result)
+        finally:
+            self.completed_count += 1
+            self._running.discard(asyncio.current_task()) # Bebaskan slot sebelum job berikutnya dimulai
+            self._release(job)
+            self._dispatch()
+
+    def _release(self, job: ImageJob):
+        for counter, key in ((self._user_active, job.user_id), (self._guild_active, job.guild_id)):
+            counter[key] -= 1
+            if counter[key] <= 0: del counter[key]
+
+    def cancel_all(self):
+        for job in self._pending:
+            job.result.cancel()
+            self._release(job)
+        self._pending.clear()
+        for task in list(self._running):
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {"queued": len(self._pending), "running": len(self._running), "concurrency": self.concurrency, "completed": self.completed_count}
@@ -9,8 +9,9 @@ import asyncio
 import logging
 
 from . import gemini_client as gemini_services
-from utils import ai_utils 
+from utils import ai_utils, image_ingest
 from .message_handler import DEFAULT_SYSTEM_INSTRUCTION
+from .message_router import MessageRoute, RoutedMessage, register_route_handler, unregister_route_handler
 
 _logger = logging.getLogger("noelle_bot.ai.mention_handler")
 
@@ -19,23 +20,16 @@ class MentionHandlerCog(commands.Cog, name="AI Mention Handler"):
         self.bot = bot
         _logger.info("MentionHandlerCog instance dibuat.")
 
-    @commands.Cog.listener("on_message")
-    async def ai_mention_listener(self, message: discord.Message):
-        if not gemini_services.is_text_service_enabled() or \
-           message.author.bot or message.guild is None or \
-           gemini_services.get_gemini_client() is None: return
-        bot_user = self.bot.user
-        if not (bot_user and bot_user.mention in message.content): return 
-        
-        is_in_designated_ai_channel = message.channel.name.lower() == gemini_services.get_designated_ai_channel_name().lower()
-        
-        # --- LOGIKA DISEDERHANAKAN KEMBALI ---
-        clean_content = message.content.replace(bot_user.mention, '').strip()
+    async def cog_load(self):
+        register_route_handler(MessageRoute.MENTION, self.handle_mention)
+
+    async def cog_unload(self):
+        unregister_route_handler(MessageRoute.MENTION, self.handle_mention)
 
-        # Jika di channel AI, dan ada teks, biarkan message_handler yang urus
-        if is_in_designated_ai_channel and clean_content:
-            return
-            
+    async def handle_mention(self, routed: RoutedMessage):
+        """Handler rute MENTION dari MessageRouterCog."""
+        message = routed.message
+        clean_content = routed.clean_content
         context_log_prefix = "Bot Mention"
         _logger.info(f"({context_log_prefix}) Memproses mention dari {message.author.name}.")
         
@@ -44,8 +38,6 @@ class MentionHandlerCog(commands.Cog, name="AI Mention Handler"):
                 if not clean_content and not message.attachments:
                     await message.reply("Halo! Ada yang bisa saya bantu?"); return
                 
-                client = gemini_services.get_gemini_client()
-                
                 google_search_tool = genai_types.Tool(google_search=genai_types.GoogleSearch())
                 mention_config = genai_types.GenerateContentConfig(
                     system_instruction=DEFAULT_SYSTEM_INSTRUCTION,
@@ -54,16 +46,35 @@ class MentionHandlerCog(commands.Cog, name="AI Mention Handler"):
                 
                 # Tambahkan gambar jika ada
                 user_input_parts = [clean_content] if clean_content else []
-                if message.attachments:
-                    for attachment in message.attachments:
-                        if 'image' in attachment.content_type:
-                             user_input_parts.append(Image.open(io.BytesIO(await attachment.read())))
+                image_attachments = [att for att in message.attachments if image_ingest.is_image_attachment(att)]
+                try:
+                    user_input_parts.extend(await asyncio.gather(*(image_ingest.ingest_attachment(att) for att in image_attachments)))
+                except image_ingest.ImageIngestError as e:
+                    await message.reply(str(e)); return
+
+                if gemini_services.STREAM_RESPONSES_ENABLED:
+                    stream = gemini_services.stream_content(
+                        model=gemini_services.GEMINI_TEXT_MODEL_NAME,
+                        contents=user_input_parts,
+                        config=mention_config,
+                        priority=gemini_services.Priority.INTERACTIVE,
+                        guild_id=message.guild.id,
+                        hedge=True
+                    )
+                    streamed_reply = await ai_utils.stream_text_in_embeds(
+                        stream, message.channel, f"Untuk: {message.author.display_name}", reply_to_message=message
+                    )
+                    if not streamed_reply.has_output:
+                        await message.reply("Maaf, saya tidak bisa memberikan respons saat ini.")
+                    return
 
-                api_response = await asyncio.to_thread(
-                    client.models.generate_content,
+                api_response = await gemini_services.generate_content(
                     model=gemini_services.GEMINI_TEXT_MODEL_NAME,
                     contents=user_input_parts,
-                    config=mention_config
+                    config=mention_config,
+                    priority=gemini_services.Priority.INTERACTIVE,
+                    guild_id=message.guild.id,
+                    hedge=True
                 )
                 
                 response_text_for_utils = api_response.text or ""
@@ -80,7 +91,7 @@ class MentionHandlerCog(commands.Cog, name="AI Mention Handler"):
                 )
             except Exception as e_general:
                 _logger.error(f"({context_log_prefix}) Error tak terduga: {e_general}", exc_info=True)
-                await message.reply(f"Error: {e_general}")
+                await message.reply(gemini_services.describe_error(e_general))
 
 async def setup(bot: commands.Bot):
     if not gemini_services.is_text_service_enabled():
@@ -1,23 +1,36 @@
 # Noelle_Bot/ai_services/message_handler.py
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import google.genai as genai
 from google.genai import types as genai_types
 from google.api_core.exceptions import InvalidArgument, FailedPrecondition, GoogleAPIError, DeadlineExceeded
 from google.genai.errors import ServerError
-import datetime
 import asyncio
-from PIL import Image
-import io
 import logging
 
 from . import gemini_client as gemini_services
-from utils import ai_utils 
+from . import channel_dispatcher
+from . import chat_history
+from . import session_persistence
+from . import session_store
+from .ai_channel_index import ai_channels
+from .message_router import MessageRoute, RoutedMessage, register_route_handler, strip_bot_mention, unregister_route_handler
+from core import database
+from utils import ai_utils, image_ingest
 
 _logger = logging.getLogger("noelle_bot.ai.message_handler")
 
 MAX_CONTEXT_TOKENS = 120000 
-SESSION_TIMEOUT_MINUTES = 30
+# Jika konteks melewati THRESHOLD * MAX, giliran tertua dipangkas sampai sekitar TARGET * MAX.
+CONTEXT_TRIM_THRESHOLD = 0.8
+CONTEXT_TRIM_TARGET = 0.5
+# Kompaksi latar belakang: giliran lama diganti ringkasan, COMPACTION_KEEP_RECENT_TURNS terakhir dipertahankan utuh.
+COMPACTION_TRIGGER_TURNS = 20
+COMPACTION_TOKEN_THRESHOLD = 0.4
+COMPACTION_KEEP_RECENT_TURNS = 6
+SESSION_TIMEOUT_MINUTES = database.CHAT_SESSION_TIMEOUT_MINUTES
+# Jumlah maksimum notifikasi reset sesi yang dikirim bersamaan.
+EXPIRY_NOTICE_CONCURRENCY = 5
 DEFAULT_SYSTEM_INSTRUCTION = """
 Anda adalah Noelle, seorang asisten AI yang berdedikasi untuk melayani anggota di server Discord ini. Kepribadian Anda didasarkan pada sifat-sifat berikut:
 1.  **Sangat Membantu dan Sopan:** Selalu siap membantu dengan antusias. Gunakan bahasa yang formal, sopan, dan jelas. Sapa pengguna dengan hormat. **Prioritaskan kejelasan dan berikan jawaban yang ringkas jika memungkinkan, namun jangan ragu untuk memberikan penjelasan yang lebih detail jika topik tersebut memang kompleks.**
@@ -30,39 +43,176 @@ Selalu akhiri respons Anda dengan cara yang positif dan suportif.
 
 class MessageHandlerCog(commands.Cog, name="AI Message Handler"):
     def __init__(self, bot: commands.Bot):
-        # ... (init tidak berubah dari versi sebelumnya)
         self.bot = bot
-        self.active_chat_sessions: dict[int, genai.chats.Chat] = {} 
-        self.chat_session_last_active: dict[int, datetime.datetime] = {}
-        self.chat_context_token_counts: dict[int, int] = {} 
+        # Sesi per channel dibatasi jumlah & memorinya; sesi idle dikeluarkan tepat saat tenggatnya lewat.
+        self.sessions = session_store.SessionStore(
+            SESSION_TIMEOUT_MINUTES * 60, on_expire=self._on_sessions_expired, on_evict=self._on_session_evicted
+        )
         self.deep_search_active_channels: set[int] = set()
-        self.session_cleanup_loop.start()
+        self._compaction_tasks: dict[int, asyncio.Task] = {}
+        self._notice_tasks: set[asyncio.Task] = set() # Referensi task notifikasi agar tidak dibuang GC di tengah jalan
+        self._pending_compactions: dict[int, tuple[genai.chats.AsyncChat, int, list[genai_types.Content]]] = {}
+        self.chat_dispatcher: channel_dispatcher.ChannelDispatcher[discord.Message] = channel_dispatcher.ChannelDispatcher(self._process_chat_batch)
+        # Sesi disimpan ke MongoDB setelah balasan terkirim dan dipulihkan saat channel pertama kali dipakai setelah restart.
+        self.session_persister = session_persistence.SessionPersister(self._snapshot_session)
+        self._rehydration_checked: set[int] = set()
+        self._expiry_notice_semaphore = asyncio.Semaphore(EXPIRY_NOTICE_CONCURRENCY)
         _logger.info("MessageHandlerCog (AI Channel) instance dibuat.")
 
-    # ... (cog_unload, _clear_session_data, session_cleanup_loop, _handle_gemini_response tidak berubah)
-    def cog_unload(self): self.session_cleanup_loop.cancel()
+    async def cog_load(self):
+        register_route_handler(MessageRoute.AI_CHAT, self.handle_ai_chat)
+
+    async def cog_unload(self):
+        unregister_route_handler(MessageRoute.AI_CHAT, self.handle_ai_chat)
+        self.sessions.close()
+        self.chat_dispatcher.cancel_all()
+        for task in self._compaction_tasks.values(): task.cancel()
+        for task in self._notice_tasks: task.cancel()
+        await self.session_persister.close()
+
+    def _discard_session_state(self, channel_id: int):
+        compaction_task = self._compaction_tasks.pop(channel_id, None)
+        if compaction_task: compaction_task.cancel()
+        self._pending_compactions.pop(channel_id, None)
+
     def _clear_session_data(self, channel_id: int):
-        if channel_id in self.active_chat_sessions: del self.active_chat_sessions[channel_id]
-        if channel_id in self.chat_session_last_active: del self.chat_session_last_active[channel_id]
-        if channel_id in self.chat_context_token_counts: del self.chat_context_token_counts[channel_id]
+        self.sessions.pop(channel_id)
+        self._discard_session_state(channel_id)
+        self.session_persister.mark_deleted(channel_id)
         _logger.info(f"AI_MSG_HANDLER: Data sesi untuk channel {channel_id} dibersihkan.")
 
-    @tasks.loop(minutes=5)
-    async def session_cleanup_loop(self):
-        now = datetime.datetime.now(datetime.timezone.utc)
-        timed_out_ids = [ch_id for ch_id, la_time in list(self.chat_session_last_active.items()) if (now - la_time).total_seconds() > SESSION_TIMEOUT_MINUTES * 60]
-        for channel_id in timed_out_ids:
-            self._clear_session_data(channel_id)
-            _logger.info(f"Sesi AI Channel {channel_id} timeout & dibersihkan.")
+    def _on_session_evicted(self, channel_id: int, entry: session_store.SessionEntry):
+        """Sesi dilepas dari memori karena batas; snapshot-nya dititipkan agar bisa dipulihkan saat channel aktif lagi."""
+        self._discard_session_state(channel_id)
+        session_doc = self._build_session_doc(channel_id, entry)
+        if session_doc: self.session_persister.stash(channel_id, session_doc)
+        self._rehydration_checked.discard(channel_id)
+
+    def _on_sessions_expired(self, expired: list[tuple[int, session_store.SessionEntry]]):
+        for channel_id, _ in expired:
+            self._discard_session_state(channel_id)
+            self.session_persister.mark_deleted(channel_id)
+        _logger.info(f"AI_MSG_HANDLER: {len(expired)} sesi AI Channel timeout & dibersihkan.")
+        task = asyncio.create_task(self._send_expiry_notices([channel_id for channel_id, _ in expired]), name="ai-session-expiry-notices")
+        self._notice_tasks.add(task)
+        task.add_done_callback(self._notice_tasks.discard)
+
+    async def _send_expiry_notices(self, channel_ids: list[int]):
+        """Mengirim notifikasi reset sesi secara bersamaan, dibatasi EXPIRY_NOTICE_CONCURRENCY."""
+        async def notify(channel_id: int):
             channel = self.bot.get_channel(channel_id)
-            if channel and isinstance(channel, discord.TextChannel):
-                try:
-                    if channel.name.lower() == gemini_services.get_designated_ai_channel_name().lower():
-                        await channel.send("Sesi chat dengan Noelle telah direset karena tidak aktif.",delete_after=60)
+            if not (channel and ai_channels.is_ai_channel(channel)): return
+            async with self._expiry_notice_semaphore:
+                try: await channel.send("Sesi chat dengan Noelle telah direset karena tidak aktif.", delete_after=60)
                 except Exception as e: _logger.warning(f"Gagal mengirim notifikasi timeout sesi ke channel {channel_id}: {e}")
-    
-    @session_cleanup_loop.before_loop
-    async def before_session_cleanup_loop(self): await self.bot.wait_until_ready()
+
+        await asyncio.gather(*(notify(channel_id) for channel_id in channel_ids))
+
+    def _build_session_doc(self, channel_id: int, entry: session_store.SessionEntry) -> dict:
+        """Dokumen ringkas (hanya teks) untuk koleksi sesi chat."""
+        channel = self.bot.get_channel(channel_id)
+        return {
+            'channel_id': channel_id,
+            'guild_id': channel.guild.id if channel and getattr(channel, 'guild', None) else None,
+            'model': gemini_services._chat_model(entry.chat_session),
+            'history': chat_history.serialize_history(entry.chat_session.get_history(curated=True)),
+            'token_count': entry.token_count,
+            'last_active': entry.last_active,
+        }
+
+    def _snapshot_session(self, channel_id: int) -> dict | None:
+        entry = self.sessions.get(channel_id)
+        return self._build_session_doc(channel_id, entry) if entry else None
+
+    async def _rehydrate_session(self, channel_id: int) -> session_store.SessionEntry | None:
+        """
+        Memulihkan sesi dari titipan persister (sesi yang dikeluarkan tetapi belum tertulis) atau dari
+        database, hanya sekali per channel sejak bot dinyalakan (atau sejak sesinya dikeluarkan).
+        """
+        if channel_id in self._rehydration_checked or not database.get_db_status(): return None
+        self._rehydration_checked.add(channel_id)
+        session_doc = self.session_persister.stashed_session(channel_id) or await database.get_chat_session(channel_id)
+        if not session_doc: return None
+        history = chat_history.deserialize_history(session_doc.get('history'))
+        if not history: return None
+        chat_session = gemini_services.create_chat_session(
+            model=session_doc.get('model') or gemini_services.GEMINI_TEXT_MODEL_NAME, history=history
+        )
+        entry = self.sessions.put(channel_id, chat_session, token_count=session_doc.get('token_count', 0))
+        _logger.info(f"AI_MSG_HANDLER: Sesi channel {channel_id} dipulihkan dari database ({len(history)} konten).")
+        return entry
+
+    def _record_turn_usage(self, channel_id: int, usage_metadata: genai_types.GenerateContentResponseUsageMetadata | None):
+        """Mencatat ukuran konteks sesi dari usage_metadata giliran terakhir (prompt + jawaban)."""
+        entry = self.sessions.get(channel_id)
+        if usage_metadata is None or entry is None: return
+        total_tokens = usage_metadata.total_token_count or \
+            (usage_metadata.prompt_token_count or 0) + (usage_metadata.candidates_token_count or 0)
+        if total_tokens:
+            entry.token_count = total_tokens
+
+    def _enforce_context_budget(self, channel_id: int):
+        """Memangkas giliran tertua jika konteks sesi mendekati MAX_CONTEXT_TOKENS."""
+        entry = self.sessions.get(channel_id)
+        if entry is None or entry.token_count < MAX_CONTEXT_TOKENS * CONTEXT_TRIM_THRESHOLD: return
+        token_count = entry.token_count
+        history = entry.chat_session.get_history(curated=True)
+        trimmed_history, dropped_turns, estimated_tokens = chat_history.trim_history_to_budget(
+            history, token_count, int(MAX_CONTEXT_TOKENS * CONTEXT_TRIM_TARGET)
+        )
+        if not dropped_turns: return
+        entry.chat_session = gemini_services.create_chat_session(
+            model=gemini_services.GEMINI_TEXT_MODEL_NAME, history=trimmed_history
+        )
+        entry.token_count = estimated_tokens
+        _logger.info(f"AI_MSG_HANDLER: Sesi channel {channel_id} dipangkas {dropped_turns} giliran ({token_count} -> ~{estimated_tokens} token).")
+
+    def _schedule_compaction(self, channel_id: int):
+        """Menjadwalkan ringkasan histori lama di latar belakang jika sesi sudah panjang."""
+        if channel_id in self._compaction_tasks or channel_id in self._pending_compactions: return
+        entry = self.sessions.get(channel_id)
+        if entry is None: return
+        turn_count = len(chat_history.split_into_turns(entry.chat_session.get_history(curated=True)))
+        if turn_count <= COMPACTION_KEEP_RECENT_TURNS: return
+        if turn_count <= COMPACTION_TRIGGER_TURNS and entry.token_count < MAX_CONTEXT_TOKENS * COMPACTION_TOKEN_THRESHOLD: return
+        task = asyncio.create_task(self._compact_session(channel_id, entry.chat_session), name=f"ai-compaction-{channel_id}")
+        self._compaction_tasks[channel_id] = task
+        task.add_done_callback(lambda t: self._compaction_tasks.pop(channel_id) if self._compaction_tasks.get(channel_id) is t else None)
+
+    async def _compact_session(self, channel_id: int, chat_session: genai.chats.AsyncChat):
+        """Meringkas giliran lama. Hasilnya diterapkan di awal giliran berikutnya (lihat _apply_pending_compaction)."""
+        turns = chat_history.split_into_turns(list(chat_session.get_history(curated=True)))
+        older_turns = turns[:-COMPACTION_KEEP_RECENT_TURNS]
+        if not older_turns: return
+        try:
+            response = await gemini_services.generate_content(
+                model=gemini_services.GEMINI_TEXT_MODEL_NAME,
+                contents=chat_history.build_summary_prompt(older_turns),
+                priority=gemini_services.Priority.BULK
+            )
+        except Exception as e:
+            _logger.warning(f"AI_MSG_HANDLER: Gagal meringkas sesi channel {channel_id}: {e}")
+            return
+        summary_text = response.text
+        if not summary_text or not summary_text.strip(): return
+        older_content_count = sum(len(turn) for turn in older_turns)
+        self._pending_compactions[channel_id] = (chat_session, older_content_count, chat_history.build_summary_contents(summary_text))
+        _logger.info(f"AI_MSG_HANDLER: Ringkasan {len(older_turns)} giliran lama channel {channel_id} siap diterapkan.")
+
+    def _apply_pending_compaction(self, channel_id: int):
+        """Membangun ulang sesi dari ringkasan + giliran terbaru. Dipanggil dari worker channel sehingga tidak ada giliran yang sedang berjalan."""
+        pending = self._pending_compactions.pop(channel_id, None)
+        if pending is None: return
+        compacted_session, older_content_count, summary_contents = pending
+        entry = self.sessions.get(channel_id)
+        if entry is None or entry.chat_session is not compacted_session: return # Sesi sudah direset atau dipangkas sejak ringkasan dibuat
+        history = entry.chat_session.get_history(curated=True)
+        new_history = summary_contents + history[older_content_count:]
+        entry.chat_session = gemini_services.create_chat_session(
+            model=gemini_services.GEMINI_TEXT_MODEL_NAME, history=new_history
+        )
+        entry.token_count = chat_history.estimate_tokens_for(new_history, history, entry.token_count)
+        _logger.info(f"AI_MSG_HANDLER: Sesi channel {channel_id} dikompaksi ({len(history)} -> {len(new_history)} konten).")
     
     async def _handle_gemini_response(self, target, response_obj: genai_types.GenerateContentResponse, context_prefix: str, is_interaction: bool):
         response_text = ""; api_candidate = None
@@ -97,60 +247,65 @@ class MessageHandlerCog(commands.Cog, name="AI Message Handler"):
             except Exception: _logger.error(f"Gagal kirim error akhir.", exc_info=True)
 
 
-    @commands.Cog.listener("on_message")
-    async def ai_channel_message_listener(self, message: discord.Message):
-        # Logika penyaringan pesan tidak berubah
-        if not gemini_services.is_text_service_enabled() or \
-           message.author.bot or message.guild is None or \
-           gemini_services.get_gemini_client() is None: return
-        if not (message.channel.name.lower() == gemini_services.get_designated_ai_channel_name().lower()): return
+    async def handle_ai_chat(self, routed: RoutedMessage):
+        """Handler rute AI_CHAT dari MessageRouterCog (pesan sudah disaring dan diklasifikasi)."""
+        message = routed.message
         if message.channel.id in self.deep_search_active_channels:
             _logger.debug(f"MessageHandler mengabaikan pesan di channel {message.channel.id} karena deep search aktif.")
             return
-        if message.reference and message.reference.resolved:
-            if isinstance(message.reference.resolved, discord.Message):
-                if message.reference.resolved.author.id != self.bot.user.id: return
-        content = message.content.strip()
-        if content.startswith(('$', '!', '\\')) or \
-           content.startswith(f'<@{self.bot.user.id}>') or \
-           content.startswith(f'<@!{self.bot.user.id}>'):
-            is_just_a_mention = content == f'<@{self.bot.user.id}>' or content == f'<@!{self.bot.user.id}>'
-            if not is_just_a_mention:
-                _logger.debug(f"MessageHandler mengabaikan pesan ber-prefix di channel {message.channel.id}.")
-                return
-        bot_user = self.bot.user
-        if bot_user and bot_user.mention in message.content:
-            cleaned_content = message.content.replace(bot_user.mention, '').strip()
-            if not cleaned_content and not message.attachments: return
-        
-        # --- LOGIKA KEMBALI NORMAL (TANPA PARSING PATTERN) ---
-        context_log_prefix = f"AI Channel Session ({message.channel.id})"
-        _logger.info(f"({context_log_prefix}) Pesan dari {message.author.name}.")
-        
-        async with message.channel.typing():
+        # Pesan diantrekan per channel: diproses berurutan dan digabung jika datang bersamaan.
+        _logger.info(f"(AI Channel Session ({message.channel.id})) Pesan dari {message.author.name} diantrekan.")
+        self.chat_dispatcher.submit(message.channel.id, message)
+
+    async def _build_user_parts(self, message: discord.Message, label: str | None = None) -> list:
+        """Menyusun parts (teks + gambar) dari satu pesan. `label` dipakai sebagai penanda pada giliran gabungan."""
+        parts = []
+        text_content_cleaned = strip_bot_mention(message.content, self.bot.user.id)[0] if self.bot.user else message.content
+        if label:
+            parts.append(f"{label} {message.author.display_name}: {text_content_cleaned or '(hanya gambar)'}")
+        elif text_content_cleaned:
+            parts.append(text_content_cleaned)
+
+        image_attachments = [att for att in message.attachments if image_ingest.is_image_attachment(att)]
+        results = await asyncio.gather(*(image_ingest.ingest_attachment(att) for att in image_attachments), return_exceptions=True)
+        for attachment, result in zip(image_attachments, results):
+            if isinstance(result, image_ingest.ImageIngestError):
+                await message.channel.send(str(result))
+            elif isinstance(result, BaseException):
+                _logger.warning(f"Gagal memproses gambar {attachment.filename}: {result}")
+                await message.channel.send(f"Gagal proses gambar: {attachment.filename}")
+            else:
+                parts.append(result)
+        return parts
+
+    async def _process_chat_batch(self, channel_id: int, messages: list[discord.Message]):
+        """Memproses satu giliran chat untuk satu atau beberapa pesan yang digabung."""
+        last_message = messages[-1]
+        context_log_prefix = f"AI Channel Session ({channel_id})"
+        if channel_id in self.deep_search_active_channels:
+            _logger.debug(f"({context_log_prefix}) Batch diabaikan karena deep search aktif.")
+            return
+
+        async with last_message.channel.typing():
             try:
-                client = gemini_services.get_gemini_client()
-                chat_session = self.active_chat_sessions.get(message.channel.id)
-                if chat_session is None:
-                    chat_session = client.chats.create(model=gemini_services.GEMINI_TEXT_MODEL_NAME, history=[])
-                    self.active_chat_sessions[message.channel.id] = chat_session
-                    self.chat_context_token_counts[message.channel.id] = 0 
+                self._apply_pending_compaction(channel_id)
+                session_entry = self.sessions.get(channel_id)
+                if session_entry is None:
+                    session_entry = await self._rehydrate_session(channel_id)
+                if session_entry is None:
+                    session_entry = self.sessions.put(channel_id, gemini_services.create_chat_session(model=gemini_services.GEMINI_TEXT_MODEL_NAME))
                     _logger.info(f"({context_log_prefix}) Sesi chat baru dimulai.")
                 
-                self.chat_session_last_active[message.channel.id] = datetime.datetime.now(datetime.timezone.utc)
+                self.sessions.touch(channel_id)
+                chat_session = session_entry.chat_session
                 
-                # Gunakan konten pesan asli
                 user_input_parts_for_api = []
-                text_content_cleaned = message.content
-                if bot_user and bot_user.mention in text_content_cleaned:
-                    text_content_cleaned = text_content_cleaned.replace(bot_user.mention, "").strip()
-                if text_content_cleaned: user_input_parts_for_api.append(text_content_cleaned)
-                
-                image_attachments = [att for att in message.attachments if 'image' in att.content_type]
-                if image_attachments:
-                    for attachment in image_attachments:
-                        try: user_input_parts_for_api.append(Image.open(io.BytesIO(await attachment.read())))
-                        except Exception as img_e: await message.channel.send(f"Gagal proses gambar: {attachment.filename}"); return
+                if len(messages) == 1:
+                    user_input_parts_for_api = await self._build_user_parts(last_message)
+                else:
+                    user_input_parts_for_api.append(channel_dispatcher.BURST_INSTRUCTION.format(count=len(messages)))
+                    for idx, message in enumerate(messages, start=1):
+                        user_input_parts_for_api.extend(await self._build_user_parts(message, label=f"[#{idx}]"))
                 
                 if not user_input_parts_for_api: return
                 
@@ -160,13 +315,60 @@ class MessageHandlerCog(commands.Cog, name="AI Message Handler"):
                     tools=[google_search_tool] 
                 )
                 
-                api_response = await asyncio.to_thread(chat_session.send_message, message=user_input_parts_for_api, config=chat_session_config)
-                
-                await self._handle_gemini_response(message, api_response, context_log_prefix, is_interaction=False)
+                if len(messages) == 1 and gemini_services.STREAM_RESPONSES_ENABLED:
+                    # Giliran tunggal di-stream agar pengguna segera melihat kalimat pertama.
+                    stream = gemini_services.stream_chat_message(
+                        chat_session, user_input_parts_for_api, config=chat_session_config,
+                        priority=gemini_services.Priority.INTERACTIVE, guild_id=last_message.guild.id, hedge=True
+                    )
+                    streamed_reply = await ai_utils.stream_text_in_embeds(
+                        stream, last_message.channel, f"Untuk: {last_message.author.display_name}", reply_to_message=last_message
+                    )
+                    if not streamed_reply.has_output:
+                        await last_message.reply("Maaf, saya tidak bisa memberikan respons saat ini.")
+                    usage_metadata = streamed_reply.usage_metadata
+                else:
+                    api_response = await gemini_services.send_chat_message(
+                        chat_session, user_input_parts_for_api, config=chat_session_config,
+                        priority=gemini_services.Priority.INTERACTIVE, guild_id=last_message.guild.id
+                    )
+                    
+                    if len(messages) == 1:
+                        await self._handle_gemini_response(last_message, api_response, context_log_prefix, is_interaction=False)
+                    else:
+                        await self._route_burst_response(messages, api_response, context_log_prefix)
+                    usage_metadata = api_response.usage_metadata
+
+                # Dilakukan setelah balasan terkirim agar tidak menambah latensi.
+                self._record_turn_usage(channel_id, usage_metadata)
+                self._enforce_context_budget(channel_id)
+                self._schedule_compaction(channel_id)
+                self.sessions.update_size(channel_id)
+                self.session_persister.mark_dirty(channel_id)
 
             except Exception as e_general:
                 _logger.error(f"({context_log_prefix}) Error tak terduga: {e_general}", exc_info=True)
-                await message.reply(f"Terjadi error: {e_general}")
+                await last_message.reply(gemini_services.describe_error(e_general))
+
+    async def _route_burst_response(self, messages: list[discord.Message], response_obj: genai_types.GenerateContentResponse, context_prefix: str):
+        """Membagi jawaban giliran gabungan dan membalas setiap pesan ke penulis aslinya."""
+        response_text = response_obj.text or ""
+        api_candidate = response_obj.candidates[0] if response_obj.candidates else None
+        sections = channel_dispatcher.split_reply_by_request(response_text, len(messages))
+        if not sections:
+            _logger.info(f"({context_prefix}) Penanda jawaban gabungan tidak lengkap, membalas pesan terakhir saja.")
+            await self._handle_gemini_response(messages[-1], response_obj, context_prefix, is_interaction=False)
+            return
+        for idx, (message, section_text) in enumerate(zip(messages, sections)):
+            try:
+                await ai_utils.send_text_in_embeds(
+                    target_channel=message.channel, response_text=section_text,
+                    footer_text=f"Untuk: {message.author.display_name}",
+                    api_candidate_obj=api_candidate if idx == 0 else None,
+                    reply_to_message=message, is_direct_ai_response=True
+                )
+            except Exception as e:
+                _logger.error(f"({context_prefix}) Gagal mengirim bagian jawaban untuk {message.author.name}: {e}", exc_info=True)
 
 
 async def setup(bot: commands.Bot):
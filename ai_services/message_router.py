@@ -0,0 +1,146 @@
+# Noelle_Bot/ai_services/message_router.py
+import discord
+from discord.ext import commands
+import enum
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from . import gemini_client as gemini_services
+from .ai_channel_index import ai_channels
+
+_logger = logging.getLogger("noelle_bot.ai.message_router")
+
+# Pesan berawalan ini adalah perintah (prefix command atau konvensi bot lain), bukan chat AI.
+COMMAND_PREFIXES = ('$', '!', '\\')
+
+
+class MessageRoute(enum.Enum):
+    IGNORE = "ignore"
+    COMMAND = "command"
+    AI_CHAT = "ai_chat"
+    MENTION = "mention"
+
+
+@dataclass(slots=True)
+class RoutedMessage:
+    """
+    Hasil klasifikasi satu pesan; handler memakai `clean_content` tanpa memproses ulang pesan.
+    Rute IGNORE/COMMAND tidak punya handler, jadi memakai instance bersama tanpa `message`.
+    """
+    route: MessageRoute
+    message: discord.Message | None
+    clean_content: str = ""
+    mentioned: bool = False
+
+
+# Member enum di-bind sekali; akses atribut Enum relatif mahal di jalur per pesan.
+_IGNORE, _COMMAND, _AI_CHAT, _MENTION = MessageRoute.IGNORE, MessageRoute.COMMAND, MessageRoute.AI_CHAT, MessageRoute.MENTION
+IGNORED = RoutedMessage(_IGNORE, None)
+COMMAND = RoutedMessage(_COMMAND, None)
+
+
+def strip_bot_mention(content: str, bot_user_id: int) -> tuple[str, bool]:
+    """Menghapus mention bot (`<@id>` dan `<@!id>`). Mengembalikan (teks bersih, ada mention)."""
+    return MessageClassifier(bot_user_id).strip_mention(content)
+
+
+class MessageClassifier:
+    """
+    Menentukan satu rute untuk setiap pesan, sekali saja:
+    - IGNORE: pesan bot, DM, balasan ke pengguna lain di channel AI, atau pesan kosong;
+    - COMMAND: pesan berawalan prefix perintah (diurus framework commands), kecuali mention bot
+      di luar channel AI;
+    - AI_CHAT: pesan berisi teks/lampiran di channel AI (termasuk yang diawali mention bot);
+    - MENTION: mention bot di luar channel AI (juga jika pesannya berawalan prefix, seperti
+      listener mention sebelum router), atau mention tanpa isi di channel AI (sapaan).
+    String mention bot disiapkan sekali per klasifier, bukan per pesan.
+    """
+    __slots__ = ("bot_user_id", "_mention", "_nick_mention")
+
+    def __init__(self, bot_user_id: int):
+        self.bot_user_id = bot_user_id
+        self._mention = f'<@{bot_user_id}>'
+        self._nick_mention = f'<@!{bot_user_id}>'
+
+    def strip_mention(self, content: str) -> tuple[str, bool]:
+        if self._mention not in content and self._nick_mention not in content:
+            return content.strip(), False
+        return content.replace(self._nick_mention, '').replace(self._mention, '').strip(), True
+
+    def classify(self, message: discord.Message) -> RoutedMessage:
+        if message.author.bot or message.guild is None:
+            return IGNORED
+        content = message.content
+        has_mention = self._mention in content or self._nick_mention in content
+        is_command = content.lstrip().startswith(COMMAND_PREFIXES)
+        if is_command and not has_mention:
+            return COMMAND
+
+        in_ai_channel = ai_channels.is_ai_channel(message.channel)
+        if not in_ai_channel and not has_mention:
+            return IGNORED # Jalur terbanyak: obrolan biasa di luar channel AI
+
+        clean_content, mentioned = self.strip_mention(content)
+        if not in_ai_channel:
+            return RoutedMessage(_MENTION, message, clean_content, mentioned)
+        if is_command:
+            return COMMAND
+        reference = message.reference
+        if reference is not None:
+            replied_author = getattr(reference.resolved, 'author', None)
+            if replied_author is not None and replied_author.id != self.bot_user_id:
+                return IGNORED
+        if clean_content or message.attachments:
+            return RoutedMessage(_AI_CHAT, message, clean_content, mentioned)
+        if mentioned:
+            return RoutedMessage(_MENTION, message, clean_content, mentioned)
+        return IGNORED
+
+
+RouteHandler = Callable[[RoutedMessage], Awaitable[None]]
+# Handler per rute didaftarkan oleh cog pemiliknya (cog_load) sehingga urutan pemuatan cog tidak berpengaruh.
+_route_handlers: dict[MessageRoute, RouteHandler] = {}
+
+
+def register_route_handler(route: MessageRoute, handler: RouteHandler):
+    if route in _route_handlers and _route_handlers[route] != handler:
+        _logger.warning(f"Handler rute '{route.value}' diganti.")
+    _route_handlers[route] = handler
+
+
+def unregister_route_handler(route: MessageRoute, handler: RouteHandler):
+    if _route_handlers.get(route) == handler:
+        del _route_handlers[route]
+
+
+class MessageRouterCog(commands.Cog, name="AI Message Router"):
+    """Satu-satunya listener on_message untuk fitur AI: setiap pesan diklasifikasi sekali lalu diteruskan ke satu handler."""
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.route_counts: dict[MessageRoute, int] = {route: 0 for route in MessageRoute}
+        self._classifier: MessageClassifier | None = None
+
+    @commands.Cog.listener("on_message")
+    async def route_message(self, message: discord.Message):
+        bot_user = self.bot.user
+        if bot_user is None or not gemini_services.is_text_service_enabled() or gemini_services.get_gemini_client() is None:
+            return
+        if self._classifier is None or self._classifier.bot_user_id != bot_user.id:
+            self._classifier = MessageClassifier(bot_user.id)
+        routed = self._classifier.classify(message)
+        self.route_counts[routed.route] += 1
+        handler = _route_handlers.get(routed.route)
+        if handler is None: return
+        try:
+            await handler(routed)
+        except Exception as e:
+            _logger.error(f"Handler rute '{routed.route.value}' gagal untuk pesan {message.id}: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {route.value: count for route, count in self.route_counts.items()}
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MessageRouterCog(bot))
+    _logger.info("MessageRouterCog berhasil dimuat.")
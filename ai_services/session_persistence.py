@@ -0,0 +1,116 @@
+# Noelle_Bot/ai_services/session_persistence.py
+
+import asyncio
+import logging
+from typing import Callable
+
+from core import database
+
+_logger = logging.getLogger("noelle_bot.ai.session_persistence")
+
+# Perubahan sesi dikumpulkan lalu ditulis sekaligus; flush lebih awal jika antrean mencapai MAX_BATCH_SIZE.
+FLUSH_INTERVAL_SECONDS = 5.0
+MAX_BATCH_SIZE = 50
+
+
+class SessionPersister:
+    """
+    Menulis snapshot sesi chat ke MongoDB secara batch di latar belakang.
+    Pemanggil hanya menandai channel (mark_dirty/mark_deleted) setelah balasan terkirim;
+    snapshot baru diambil saat flush, jadi beberapa giliran beruntun cukup ditulis sekali.
+    Snapshot titipan (stash) tetap disimpan sampai tertulis ke database atau digantikan
+    snapshot yang lebih baru, dan bisa dibaca lewat `stashed_session` untuk rehydration.
+    """
+    def __init__(self, snapshot: Callable[[int], dict | None], *,
+                 flush_interval: float = FLUSH_INTERVAL_SECONDS, max_batch_size: int = MAX_BATCH_SIZE):
+        self._snapshot = snapshot
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self._dirty: set[int] = set()
+        self._deleted: set[int] = set()
+        self._stashed: dict[int, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def mark_dirty(self, channel_id: int):
+        if not database.get_db_status(): return
+        self._deleted.discard(channel_id)
+        self._dirty.add(channel_id) # Titipan dipertahankan: jika sesi sudah tidak di memori, titipan itulah yang ditulis
+        self._ensure_running()
+
+    def mark_deleted(self, channel_id: int):
+        if not database.get_db_status(): return
+        self._dirty.discard(channel_id)
+        self._stashed.pop(channel_id, None)
+        self._deleted.add(channel_id)
+        self._ensure_running()
+
+    def stash(self, channel_id: int, session_doc: dict):
+        """Menitipkan snapshot yang sudah jadi, untuk sesi yang dilepas dari memori sebelum sempat di-flush."""
+        if not database.get_db_status(): return
+        self._dirty.discard(channel_id)
+        self._deleted.discard(channel_id)
+        self._stashed[channel_id] = session_doc
+        self._ensure_running()
+
+    def stashed_session(self, channel_id: int) -> dict | None:
+        """Snapshot titipan yang belum tertulis ke database (lebih baru dari isi database)."""
+        return self._stashed.get(channel_id)
+
+    def _pending_count(self) -> int:
+        return len(self._dirty) + len(self._deleted) + len(self._stashed)
+
+    def _ensure_running(self):
+        if self._pending_count() >= self.max_batch_size:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ai-session-persister")
+
+    async def _run(self):
+        while self._pending_count():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = self._deleted, set()
+        # Titipan baru dilepas setelah tersimpan, agar rehydration selama flush masih bisa membacanya.
+        stashed = dict(self._stashed)
+        if deleted:
+            await database.delete_chat_sessions(list(deleted))
+        session_docs = dict(stashed)
+        for channel_id in dirty:
+            try:
+                doc = self._snapshot(channel_id)
+            except Exception as e:
+                _logger.warning(f"Gagal membuat snapshot sesi channel {channel_id}: {e}")
+                continue
+            if doc:
+                session_docs[channel_id] = doc # Snapshot dari memori lebih baru dari titipan
+        if session_docs:
+            if await database.save_chat_sessions(list(session_docs.values())):
+                _logger.debug(f"{len(session_docs)} sesi chat disimpan ke database.")
+                for channel_id, doc in stashed.items():
+                    if self._stashed.get(channel_id) is doc: # Belum diganti titipan yang lebih baru selama flush
+                        del self._stashed[channel_id]
+            else:
+                _logger.warning(f"Gagal menyimpan {len(session_docs)} sesi chat; akan dicoba pada flush berikutnya.")
+                for channel_id in dirty:
+                    if channel_id not in self._deleted and channel_id not in self._stashed:
+                        self._dirty.add(channel_id)
+
+    async def close(self):
+        """Menghentikan worker dan menulis sisa perubahan (dipanggil saat cog dilepas)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._pending_count():
+            await self.flush()
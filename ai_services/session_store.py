@@ -0,0 +1,172 @@
+# Noelle_Bot/ai_services/session_store.py
+
+import os
+import heapq
+import asyncio
+import datetime
+import logging
+import itertools
+from collections import OrderedDict
+from typing import Callable
+
+import google.genai as genai
+
+from . import chat_history
+
+_logger = logging.getLogger("noelle_bot.ai.session_store")
+
+MAX_ACTIVE_SESSIONS = int(os.getenv('AI_MAX_ACTIVE_SESSIONS', '2000'))
+SESSION_MEMORY_BUDGET_BYTES = int(float(os.getenv('AI_SESSION_MEMORY_BUDGET_MB', '256')) * 1024 * 1024)
+
+
+class SessionEntry:
+    """Satu sesi chat channel beserta metadata yang dipakai handler."""
+    __slots__ = ("chat_session", "last_active", "token_count", "approx_bytes", "deadline")
+
+    def __init__(self, chat_session: genai.chats.AsyncChat, token_count: int = 0):
+        self.chat_session = chat_session
+        self.last_active = datetime.datetime.now(datetime.timezone.utc)
+        self.token_count = token_count
+        self.approx_bytes = 0
+        self.deadline = 0.0
+
+
+class SessionStore:
+    """
+    Penyimpanan sesi chat per channel dengan batas jumlah sesi dan perkiraan memori.
+    - Urutan LRU (OrderedDict): sesi yang paling lama tidak dipakai dikeluarkan lebih dulu
+      lewat `on_evict` saat batas terlampaui.
+    - Min-heap tenggat idle: satu task tidur sampai tenggat terdekat lalu mengeluarkan sesi
+      yang kedaluwarsa lewat `on_expire`, tanpa memindai semua sesi.
+    Entri heap lama (karena sesi disentuh ulang) dibuang secara malas saat muncul di puncak.
+    """
+    def __init__(self, idle_timeout_seconds: float, *,
+                 on_expire: Callable[[list[tuple[int, SessionEntry]]], None],
+                 on_evict: Callable[[int, SessionEntry], None],
+                 max_sessions: int = MAX_ACTIVE_SESSIONS,
+                 max_memory_bytes: int = SESSION_MEMORY_BUDGET_BYTES):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_sessions = max(1, max_sessions)
+        self.max_memory_bytes = max_memory_bytes
+        self._on_expire = on_expire
+        self._on_evict = on_evict
+        self._entries: OrderedDict[int, SessionEntry] = OrderedDict()
+        self._heap: list[tuple[float, int, int]] = []
+        self._sequence = itertools.count()
+        self._total_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._expiry_task: asyncio.Task | None = None
+        self.expired_count = 0
+        self.evicted_count = 0
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, channel_id: int) -> SessionEntry | None:
+        return self._entries.get(channel_id)
+
+    def put(self, channel_id: int, chat_session: genai.chats.AsyncChat, token_count: int = 0) -> SessionEntry:
+        """Menyimpan sesi baru (menggantikan yang lama jika ada) dan menandainya aktif."""
+        self.pop(channel_id)
+        entry = self._entries[channel_id] = SessionEntry(chat_session, token_count)
+        self.touch(channel_id)
+        return entry
+
+    def touch(self, channel_id: int):
+        """Menandai sesi baru saja dipakai: pindah ke ujung LRU dan tenggat idle diperbarui."""
+        entry = self._entries.get(channel_id)
+        if entry is None: return
+        loop = asyncio.get_running_loop()
+        entry.last_active = datetime.datetime.now(datetime.timezone.utc)
+        entry.deadline = loop.time() + self.idle_timeout_seconds
+        self._entries.move_to_end(channel_id)
+        if self._heap and entry.deadline < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (entry.deadline, next(self._sequence), channel_id))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild_heap()
+        if self._expiry_task is None or self._expiry_task.done():
+            self._expiry_task = asyncio.create_task(self._run_expiry(), name="ai-session-expiry")
+
+    def update_size(self, channel_id: int):
+        """Menghitung ulang perkiraan memori sesi (setelah giliran baru) lalu menegakkan batas."""
+        entry = self._entries.get(channel_id)
+        if entry is None: return
+        new_size = sum(chat_history.estimate_content_bytes(c) for c in entry.chat_session.get_history(curated=False))
+        self._total_bytes += new_size - entry.approx_bytes
+        entry.approx_bytes = new_size
+        self._enforce_limits(keep=channel_id)
+
+    def pop(self, channel_id: int) -> SessionEntry | None:
+        entry = self._entries.pop(channel_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.approx_bytes
+        return entry
+
+    def _enforce_limits(self, keep: int | None = None):
+        while self._entries and (len(self._entries) > self.max_sessions or self._total_bytes > self.max_memory_bytes):
+            channel_id = next(iter(self._entries))
+            if channel_id == keep:
+                if len(self._entries) == 1: return
+                self._entries.move_to_end(channel_id)
+                continue
+            entry = self.pop(channel_id)
+            self.evicted_count += 1
+            _logger.info(f"Sesi channel {channel_id} dikeluarkan (LRU) untuk menjaga batas memori/jumlah sesi.")
+            try:
+                self._on_evict(channel_id, entry)
+            except Exception as e:
+                _logger.error(f"Callback eviksi sesi channel {channel_id} gagal: {e}", exc_info=True)
+
+    def _rebuild_heap(self):
+        self._heap = [(entry.deadline, next(self._sequence), channel_id) for channel_id, entry in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_expired(self, now: float) -> list[tuple[int, SessionEntry]]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, channel_id = heapq.heappop(self._heap)
+            entry = self._entries.get(channel_id)
+            if entry is None or entry.deadline != deadline:
+                continue # Entri basi: sesi sudah dihapus atau disentuh ulang
+            self.pop(channel_id)
+            expired.append((channel_id, entry))
+        return expired
+
+    async def _run_expiry(self):
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            expired = self._pop_expired(loop.time())
+            if not expired: continue
+            self.expired_count += len(expired)
+            try:
+                self._on_expire(expired)
+            except Exception as e:
+                _logger.error(f"Callback kedaluwarsa sesi gagal: {e}", exc_info=True)
+
+    def close(self):
+        if self._expiry_task:
+            self._expiry_task.cancel()
+            self._expiry_task = None
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "approx_bytes": self._total_bytes,
+            "max_bytes": self.max_memory_bytes,
+            "heap_size": len(self._heap),
+            "expired": self.expired_count,
+            "evicted": self.evicted_count,
+        }
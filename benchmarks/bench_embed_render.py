@@ -0,0 +1,237 @@
+# Noelle_Bot/benchmarks/bench_embed_render.py
+"""
+Benchmark: render embed kustom lewat jalur lama (regex + introspeksi lambda + salin dict
+di setiap render) vs render plan yang dikompilasi sekali (general_utils.get_render_plan).
+Pengguna, server, dan channel disimulasikan, jadi benchmark ini tidak butuh koneksi Discord.
+
+Sebelum mengukur, hasil kedua jalur dibandingkan (embed.to_dict() tanpa timestamp)
+untuk memastikan render plan menghasilkan embed yang sama.
+
+Jalankan: python benchmarks/bench_embed_render.py [jumlah_render]
+"""
+import copy
+import logging
+import pathlib
+import re
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils import general_utils
+
+_legacy_logger = logging.getLogger("noelle_bot.bench.embed_render")
+
+
+# --- Implementasi lama (disalin dari general_utils sebelum render plan) sebagai pembanding ---
+
+def _legacy_replace_variables(text: str, user: discord.User = None, member: discord.Member = None, guild: discord.Guild = None, channel: discord.abc.GuildChannel | discord.Thread | discord.DMChannel | None = None) -> str:
+    if not isinstance(text, str): return text
+    pattern = re.compile(r'\{(\w+\.[\w_]+)\}')
+    effective_guild_for_lambda = guild or (member.guild if member else None) or (getattr(channel, 'guild', None) if channel else None)
+    effective_channel_for_lambda = channel
+    def replacer(match):
+        variable_name = match.group(1).lower()
+        try:
+            value_lambda = general_utils._variable_mapping.get(variable_name)
+            if value_lambda:
+                kwargs = {'user': user, 'member': member, 'guild': effective_guild_for_lambda, 'channel': effective_channel_for_lambda}
+                lambda_args = value_lambda.__code__.co_varnames
+                final_kwargs = {k: v for k, v in kwargs.items() if k in lambda_args}
+                value = str(value_lambda(**final_kwargs))
+                if variable_name.endswith('_url') and (not value or value == match.group(0) or value.startswith("{Error:")):
+                    return "" 
+                return value
+            else: _legacy_logger.warning(f"Variabel tidak dikenal saat replace: '{variable_name}'"); return "" 
+        except Exception as e: _legacy_logger.error(f"Error mengganti variabel '{variable_name}': {e}", exc_info=True); return ""
+    return pattern.sub(replacer, text)
+
+def _legacy_create_processed_embed(embed_data: dict, 
+                           user: discord.User = None, 
+                           member: discord.Member = None, 
+                           guild: discord.Guild = None, 
+                           channel: discord.abc.GuildChannel | discord.Thread | discord.DMChannel | None = None) -> discord.Embed:
+    if not embed_data:
+        return discord.Embed(title="Embed Kosong", description="Embed ini belum memiliki konten.", color=discord.Color.light_gray())
+
+    processed_data = embed_data.copy()
+
+    def process_url_field(data_dict, key, default_val=None):
+        if key in data_dict and data_dict[key]:
+            processed_url = _legacy_replace_variables(data_dict[key], user, member, guild, channel)
+            if not processed_url or processed_url.startswith("{") or "Error:" in processed_url:
+                # Jika default_val adalah None atau tidak diberikan, hapus fieldnya
+                if default_val is None and key in data_dict: 
+                    del data_dict[key]
+                else: # Jika ada default_val, set ke default_val (misal {'url': None} untuk thumbnail/image)
+                    data_dict[key] = default_val 
+            else:
+                data_dict[key] = processed_url
+        elif key in data_dict and data_dict[key] is None and default_val is not None: # Jika sudah None dan ada default
+            data_dict[key] = default_val
+
+
+    author_info = processed_data.get('author')
+    if isinstance(author_info, dict):
+        if 'name' in author_info and author_info['name']: 
+            author_info['name'] = _legacy_replace_variables(author_info['name'], user, member, guild, channel)
+        process_url_field(author_info, 'icon_url') 
+        if not author_info.get('name'): processed_data['author'] = None 
+        else: processed_data['author'] = author_info
+
+    footer_info = processed_data.get('footer')
+    if isinstance(footer_info, dict):
+        if 'text' in footer_info and footer_info['text']: 
+            footer_info['text'] = _legacy_replace_variables(footer_info['text'], user, member, guild, channel)
+        process_url_field(footer_info, 'icon_url') 
+        if not footer_info.get('text') and not footer_info.get('timestamp') and not footer_info.get('icon_url'): 
+            processed_data['footer'] = None
+        else: processed_data['footer'] = footer_info
+    
+    process_url_field(processed_data, 'url')
+
+    # Untuk thumbnail dan image, pastikan strukturnya dict jika ada 'url'
+    if 'thumbnail' in processed_data and isinstance(processed_data['thumbnail'], dict):
+        process_url_field(processed_data['thumbnail'], 'url')
+        if not processed_data['thumbnail'].get('url'): processed_data['thumbnail'] = None # Hapus jika URL jadi None
+    elif 'thumbnail' in processed_data: # Jika bukan dict (mungkin hanya string URL lama)
+        process_url_field(processed_data, 'thumbnail') # Akan menghapusnya jika jadi string kosong
+    
+    if 'image' in processed_data and isinstance(processed_data['image'], dict):
+        process_url_field(processed_data['image'], 'url')
+        if not processed_data['image'].get('url'): processed_data['image'] = None
+    elif 'image' in processed_data:
+        process_url_field(processed_data, 'image')
+
+
+    if 'title' in processed_data and processed_data['title']: processed_data['title'] = _legacy_replace_variables(processed_data['title'], user, member, guild, channel)
+    if 'description' in processed_data and processed_data['description']: processed_data['description'] = _legacy_replace_variables(processed_data['description'], user, member, guild, channel)
+    
+    if 'fields' in processed_data and isinstance(processed_data['fields'], list):
+        new_fields = []
+        for field_dict in processed_data['fields']:
+            if isinstance(field_dict, dict):
+                new_field = field_dict.copy()
+                if 'name' in new_field and new_field['name']: new_field['name'] = _legacy_replace_variables(new_field['name'], user, member, guild, channel)
+                if 'value' in new_field and new_field['value']: new_field['value'] = _legacy_replace_variables(new_field['value'], user, member, guild, channel)
+                if new_field.get('name') and new_field.get('value'):
+                    new_fields.append(new_field)
+        processed_data['fields'] = new_fields if new_fields else None
+
+    color_value_from_data = processed_data.get('color')
+    final_color_int = None
+    if isinstance(color_value_from_data, str):
+        final_color_int = general_utils.get_color_int(color_value_from_data)
+    elif isinstance(color_value_from_data, int):
+        final_color_int = color_value_from_data
+    
+    if final_color_int is not None:
+        processed_data['color'] = final_color_int
+    elif 'color' in processed_data: # Jika tidak valid dan ada di data, hapus
+        del processed_data['color']
+
+
+    should_add_timestamp = False
+    current_footer_obj = processed_data.get('footer')
+    if isinstance(current_footer_obj, dict) and current_footer_obj.get('timestamp') is True:
+        should_add_timestamp = True
+        temp_footer = current_footer_obj.copy()
+        if 'timestamp' in temp_footer: del temp_footer['timestamp']
+        # Set footer ke None jika hanya berisi timestamp boolean dan sekarang kosong
+        if not temp_footer.get('text') and not temp_footer.get('icon_url'):
+            processed_data['footer'] = None
+        else:
+            processed_data['footer'] = temp_footer
+
+    if should_add_timestamp:
+        processed_data['timestamp'] = general_utils.get_current_timestamp_for_embed().isoformat()
+    
+    # Pembersihan akhir: hapus kunci jika nilainya None
+    keys_to_clean = ['author', 'footer', 'fields', 'thumbnail', 'image', 'url', 'title', 'description']
+    for key in keys_to_clean:
+        if key in processed_data and processed_data[key] is None:
+            del processed_data[key]
+    # Khusus untuk warna, jika tidak ada, tidak perlu ada field 'color' sama sekali
+    if 'color' not in processed_data or processed_data.get('color') is None:
+        if 'color' in processed_data: del processed_data['color']
+
+    try:
+        embed = discord.Embed.from_dict(processed_data)
+        return embed
+    except Exception as e:
+        _legacy_logger.error(f"Error membuat embed dari dict: {e}\nData yang diproses untuk from_dict: {processed_data}", exc_info=True)
+        return discord.Embed(title="Error Pembuatan Embed", description=f"Tidak dapat membuat embed: {e}", color=discord.Color.red())
+
+# --- Data simulasi ---
+
+def _fake_context():
+    guild = SimpleNamespace(id=111, name="Server Noelle", member_count=1234)
+    avatar = SimpleNamespace(url="https://cdn.discordapp.com/avatars/222/abc.png")
+    member = SimpleNamespace(id=222, name="noelle", discriminator="0", mention="<@222>", nick="Noelle",
+                             global_name="Noelle Silva", display_avatar=avatar, guild=guild)
+    channel = SimpleNamespace(id=333, name="welcome", mention="<#333>", guild=guild)
+    return member, guild, channel
+
+
+TEMPLATE = {
+    "guild_id": 111,
+    "embed_name": "welcome",
+    "version": 3,
+    "title": "Selamat datang, {user.nickname}!",
+    "description": "Halo {user.mention}, selamat bergabung di **{server.name}**. Kamu anggota ke-{server.member_count}.\n"
+                   "Silakan baca aturan di {channel.mention} dan perkenalkan diri ya!",
+    "color": "#F1C40F",
+    "author": {"name": "{server.name}", "icon_url": "{user.avatar_url}"},
+    "thumbnail": {"url": "{user.avatar_url}"},
+    "fields": [
+        {"name": "Pengguna", "value": "{user.tag} ({user.id})", "inline": True},
+        {"name": "Channel", "value": "{channel.name} ({channel.id})", "inline": True},
+        {"name": "Info", "value": "Teks statis tanpa variabel.", "inline": False},
+    ],
+    "footer": {"text": "{server.name} • ID {server.id}", "timestamp": True},
+}
+
+
+def _comparable(embed: discord.Embed) -> dict:
+    data = embed.to_dict()
+    data.pop("timestamp", None)
+    return data
+
+
+def main(iterations: int):
+    member, guild, channel = _fake_context()
+
+    legacy_embed = _legacy_create_processed_embed(copy.deepcopy(TEMPLATE), member=member, guild=guild, channel=channel)
+    plan_embed = general_utils.create_processed_embed(TEMPLATE, member=member, guild=guild, channel=channel)
+    if _comparable(legacy_embed) != _comparable(plan_embed):
+        print("Hasil berbeda!")
+        print("  lama :", _comparable(legacy_embed))
+        print("  plan :", _comparable(plan_embed))
+        sys.exit(1)
+
+    # Jalur lama memodifikasi sub-dict template (author/footer), jadi diberi salinan baru per render
+    # seperti yang terjadi saat setiap render membaca dokumen segar dari database.
+    templates = [copy.deepcopy(TEMPLATE) for _ in range(iterations)]
+    start = time.perf_counter()
+    for template in templates:
+        _legacy_create_processed_embed(template, member=member, guild=guild, channel=channel)
+    legacy_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        general_utils.create_processed_embed(TEMPLATE, member=member, guild=guild, channel=channel)
+    plan_total = time.perf_counter() - start
+
+    print(f"{iterations} render embed welcome (14 variabel, 3 field)")
+    print(f"  jalur lama  : total {legacy_total * 1000:8.1f} ms | {legacy_total / iterations * 1e6:7.1f} µs/render")
+    print(f"  render plan : total {plan_total * 1000:8.1f} ms | {plan_total / iterations * 1e6:7.1f} µs/render")
+    print(f"  percepatan  : {legacy_total / plan_total:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,98 @@
+# Noelle_Bot/benchmarks/bench_gemini_transport.py
+"""
+Benchmark: jalur lama (asyncio.to_thread + SDK sinkron) vs lapisan async
+gemini_client (client.aio). Klien Gemini disimulasikan dengan latensi tetap,
+jadi benchmark ini tidak memakai kuota API.
+
+Yang diukur:
+- waktu total untuk N panggilan lambat yang berjalan bersamaan,
+- latensi "probe" to_thread (mewakili pekerjaan lain yang butuh thread,
+  misalnya I/O discord) selama burst berlangsung.
+
+Sejak governor (gemini_governor) membatasi konkurensi per model, jalur client.aio
+akan mengukur batas governor (8 per model), bukan transport. Batas untuk model
+"bench" dinaikkan ke jumlah panggilan, jadi angka client.aio setara dengan baseline
+sebelum governor ada; pembatasan governor tidak ikut diukur di sini.
+
+Jalankan: python benchmarks/bench_gemini_transport.py [jumlah_panggilan] [latensi_detik]
+"""
+import asyncio
+import pathlib
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from ai_services import gemini_client as gemini_services
+
+BENCH_MODEL = "bench"
+
+
+class _FakeSyncModels:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, *, model, contents, config=None):
+        time.sleep(self.latency)
+        return "ok"
+
+
+class _FakeAsyncModels:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content(self, *, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        return "ok"
+
+
+class _FakeAio:
+    def __init__(self, latency: float):
+        self.models = _FakeAsyncModels(latency)
+
+
+class _FakeClient:
+    def __init__(self, latency: float):
+        self.models = _FakeSyncModels(latency)
+        self.aio = _FakeAio(latency)
+
+
+async def _probe_thread_latency() -> float:
+    start = time.perf_counter()
+    await asyncio.to_thread(lambda: None)
+    return time.perf_counter() - start
+
+
+async def _run_burst(call_factory, num_calls: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(call_factory()) for _ in range(num_calls)]
+    await asyncio.sleep(0.01)
+    probe_latency = await _probe_thread_latency()
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, probe_latency
+
+
+async def main(num_calls: int, latency: float):
+    client = _FakeClient(latency)
+    gemini_services.governor.set_model_limit(BENCH_MODEL, num_calls) # Ukur transport, bukan batas governor
+
+    def thread_call():
+        return asyncio.to_thread(client.models.generate_content, model=BENCH_MODEL, contents="halo")
+
+    def async_call():
+        return gemini_services.generate_content(model=BENCH_MODEL, contents="halo", client=client)
+
+    thread_total, thread_probe = await _run_burst(thread_call, num_calls)
+    async_total, async_probe = await _run_burst(async_call, num_calls)
+
+    print(f"{num_calls} panggilan bersamaan, latensi simulasi {latency:.2f}s per panggilan")
+    print(f"  to_thread : total {thread_total:6.2f}s | probe to_thread {thread_probe * 1000:8.1f} ms | ~{num_calls / thread_total:6.1f} panggilan/s")
+    print(f"  client.aio: total {async_total:6.2f}s | probe to_thread {async_probe * 1000:8.1f} ms | ~{num_calls / async_total:6.1f} panggilan/s")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    lat = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    asyncio.run(main(calls, lat))
@@ -0,0 +1,153 @@
+# Noelle_Bot/benchmarks/bench_markdown_chunker.py
+"""
+Benchmark: memotong respons model 50-100 KB menjadi potongan field embed (1024 karakter)
+lewat jalur lama (find_sensible_split_point + `remaining_text = remaining_text[n:]` per potongan)
+vs MarkdownChunker (tokenisasi sekali, potong lewat offset).
+
+Selain waktu, dihitung jumlah potongan dengan code fence rusak: fence yang tidak ditutup,
+baris pembuka yang terpotong (bahasa tidak dikenal, mis. "```pyt"), atau blok kode kosong.
+Untuk MarkdownChunker juga diperiksa bahwa setiap potongan <= batas dan isi teks tidak hilang,
+termasuk pada kasus tepi paragraf ~1012 karakter yang diikuti blok kode panjang.
+
+Hasil: di bawah ~100 KB MarkdownChunker sedikit lebih lambat dari jalur lama (tokenisasi per
+baris di Python vs rfind di C, selisih di bawah 1 ms); keuntungannya adalah waktu linear
+(lebih cepat mulai beberapa ratus KB), fence yang selalu utuh, dan potongan yang lebih sedikit.
+
+Jalankan: python benchmarks/bench_markdown_chunker.py [ukuran_kb ...]
+"""
+import pathlib
+import random
+import re
+import sys
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.markdown_chunker import chunk_markdown
+
+CHUNK_LIMIT = 1024
+_FENCE_LINE = re.compile(r' {0,3}(`{3,}|~{3,})(.*)$')
+REPEATS = 5
+_WORDS = ["model", "bahasa", "respons", "data", "server", "fungsi", "nilai", "contoh", "karena", "sehingga", "dengan", "untuk"]
+
+
+# --- Implementasi lama (disalin dari ai_utils sebelum MarkdownChunker) sebagai pembanding ---
+
+def _legacy_find_sensible_split_point(text: str, max_len: int) -> int:
+    if len(text) <= max_len: return len(text)
+    slice_to_check = text[:max_len]
+    split_point_newline_para = slice_to_check.rfind('\n\n')
+    if split_point_newline_para != -1: return split_point_newline_para + 2
+    sentence_enders = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
+    best_split_point = -1
+    for ender in sentence_enders:
+        point = slice_to_check.rfind(ender)
+        if point != -1 and point + len(ender) > best_split_point: best_split_point = point + len(ender)
+    if best_split_point != -1: return best_split_point
+    split_point_single_newline = slice_to_check.rfind('\n')
+    if split_point_single_newline != -1: return split_point_single_newline + 1
+    last_space = slice_to_check.rfind(' ')
+    if last_space != -1: return last_space + 1
+    return max_len
+
+
+def _legacy_chunks(text: str, max_len: int) -> list[str]:
+    chunks = []
+    remaining_text = text.strip()
+    while remaining_text:
+        split_len = _legacy_find_sensible_split_point(remaining_text, max_len)
+        chunks.append(remaining_text[:split_len])
+        remaining_text = remaining_text[split_len:].lstrip()
+    return chunks
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", "!", "?"])
+
+
+def _model_output(size_bytes: int, seed: int = 7) -> str:
+    """Teks mirip jawaban model: heading, paragraf, list, dan blok kode panjang."""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        kind = rng.random()
+        if kind < 0.1:
+            part = f"## Bagian {len(parts)}"
+        elif kind < 0.45:
+            part = " ".join(_sentence(rng) for _ in range(rng.randint(2, 8)))
+        elif kind < 0.7:
+            part = "\n".join(f"{i + 1}. {_sentence(rng)}" for i in range(rng.randint(3, 8)))
+        else:
+            lines = [f"    hasil_{i} = proses(data[{i}], batas={rng.randint(1, 99)})  # {rng.choice(_WORDS)}" for i in range(rng.randint(10, 80))]
+            part = "```python\ndef contoh():\n" + "\n".join(lines) + "\n    return hasil\n```"
+        parts.append(part)
+        total += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def _fence_problems(chunk: str, languages: set[str]) -> int:
+    """Jumlah masalah fence dalam satu potongan: pembuka rusak, blok kode kosong, atau fence tak ditutup."""
+    problems = 0
+    open_marker = None
+    content_lines = 0
+    for line in chunk.split("\n"):
+        match = _FENCE_LINE.match(line)
+        if open_marker is None:
+            if match:
+                if match.group(2).strip() not in languages: problems += 1
+                open_marker, content_lines = match.group(1), 0
+        elif match and line.strip().startswith(open_marker) and not line.strip().strip(open_marker[0]):
+            if content_lines == 0: problems += 1
+            open_marker = None
+        else:
+            content_lines += 1
+    return problems + (open_marker is not None)
+
+
+def _broken_fences(chunks: list[str], languages: set[str]) -> int:
+    return sum(1 for chunk in chunks if _fence_problems(chunk, languages))
+
+
+def _without_fences(text: str) -> str:
+    return "".join("".join(line.split()) for line in text.split("\n") if not _FENCE_LINE.match(line))
+
+
+def _check_edge_case():
+    """Paragraf yang hampir memenuhi batas, lalu blok kode panjang: pembuka tidak boleh terpotong."""
+    text = "a " * 506 + "\n\n```python\n" + "\n".join(f"    baris_{i} = {i}" for i in range(200)) + "\n```"
+    chunks = list(chunk_markdown(text, CHUNK_LIMIT))
+    assert not _broken_fences(chunks, {"python"}), "Fence rusak pada kasus tepi."
+    assert _without_fences("\n".join(chunks)) == _without_fences(text), "Isi teks berubah pada kasus tepi."
+
+
+def _measure(func, text: str) -> tuple[float, list[str]]:
+    best = float("inf")
+    result = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes_kb: list[int]):
+    _check_edge_case()
+    for size_kb in sizes_kb:
+        text = _model_output(size_kb * 1024)
+        legacy_time, legacy = _measure(lambda t: _legacy_chunks(t, CHUNK_LIMIT), text)
+        chunker_time, chunks = _measure(lambda t: list(chunk_markdown(t, CHUNK_LIMIT)), text)
+
+        assert all(len(chunk) <= CHUNK_LIMIT for chunk in chunks), "Potongan melebihi batas."
+        assert _without_fences("\n".join(chunks)) == _without_fences(text), "Isi teks berubah."
+
+        print(f"{len(text) / 1024:6.1f} KB")
+        print(f"  lama           : {legacy_time * 1000:7.2f} ms | {len(legacy):4d} potongan | fence rusak: {_broken_fences(legacy, {'python'})}")
+        print(f"  MarkdownChunker: {chunker_time * 1000:7.2f} ms | {len(chunks):4d} potongan | fence rusak: {_broken_fences(chunks, {'python'})}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50, 75, 100])
@@ -0,0 +1,172 @@
+# Noelle_Bot/benchmarks/bench_message_router.py
+"""
+Benchmark: biaya klasifikasi per pesan di MessageRouterCog (MessageClassifier.classify, sekali per pesan)
+vs dua rantai filter lama (listener on_message di message_handler dan mention_handler yang
+masing-masing menyaring setiap pesan). Pesan, channel, dan guild disimulasikan.
+
+Bagian kedua mengukur jalur lengkap seperti di discord.py: setiap listener on_message
+dijadwalkan sebagai task tersendiri per pesan, jadi dua listener berarti dua task per pesan.
+
+Campuran pesan mewakili server ramai: sebagian besar obrolan biasa di luar channel AI,
+sisanya chat di channel AI, perintah, mention, dan pesan bot. Juga diperiksa bahwa setiap pesan
+yang dijawab listener mention lama (termasuk mention berawalan prefix, mis. "$help @Noelle")
+tetap mendapat rute MENTION.
+
+Hasil: klasifikasi saja di router LEBIH LAMBAT dari dua filter lama (~2.0 vs ~1.2-1.6 us
+per pesan), karena router langsung menyiapkan RoutedMessage dan teks tanpa mention untuk handler.
+Yang lebih cepat adalah jalur lengkap (klasifikasi + dispatch task, ~10-12 vs ~15-16 us per pesan),
+karena discord.py hanya membuat satu task per pesan, bukan dua.
+
+Jalankan: python benchmarks/bench_message_router.py [jumlah_pesan]
+"""
+import asyncio
+import pathlib
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from ai_services.ai_channel_index import ai_channels
+from ai_services.message_router import MessageClassifier, MessageRoute
+
+BOT_ID = 999
+BOT_MENTION = f"<@{BOT_ID}>"
+
+
+def _text_channel(channel_id: int, name: str, guild) -> discord.TextChannel:
+    channel = discord.TextChannel.__new__(discord.TextChannel)
+    channel.id = channel_id
+    channel.name = name
+    channel.guild = guild
+    return channel
+
+
+def _build_messages(count: int) -> list:
+    guild = SimpleNamespace(id=1)
+    ai_channel = _text_channel(10, "ai-channel", guild)
+    general = _text_channel(11, "general", guild)
+    guild.text_channels = [ai_channel, general]
+    ai_channels.index_guild(guild, {"ai_channel_name": "ai-channel"})
+
+    human = SimpleNamespace(id=1, bot=False, name="user")
+    other_bot = SimpleNamespace(id=2, bot=True, name="bot")
+    kinds = [
+        (general, human, "halo semua, ada yang main malam ini?"),
+        (general, human, "halo semua, ada yang main malam ini?"),
+        (general, human, "lol"),
+        (general, other_bot, "pesan otomatis"),
+        (general, human, "$help"),
+        (general, human, f"$help {BOT_MENTION}"),
+        (general, human, f"{BOT_MENTION} tolong jelaskan ini"),
+        (ai_channel, human, "jelaskan relativitas umum secara singkat"),
+        (ai_channel, human, f"{BOT_MENTION} lanjutkan"),
+    ]
+    rng = random.Random(42)
+    messages = []
+    for _ in range(count):
+        channel, author, content = rng.choice(kinds)
+        messages.append(SimpleNamespace(author=author, guild=guild, channel=channel, content=content, attachments=[], reference=None))
+    return messages
+
+
+# --- Rantai filter lama (disalin dari kedua listener sebelum router) sebagai pembanding ---
+
+def _legacy_message_handler_filter(message) -> bool:
+    if message.author.bot or message.guild is None: return False
+    if not ai_channels.is_ai_channel(message.channel): return False
+    if message.reference and message.reference.resolved:
+        if isinstance(message.reference.resolved, discord.Message):
+            if message.reference.resolved.author.id != BOT_ID: return False
+    content = message.content.strip()
+    if content.startswith(('$', '!', '\\')) or content.startswith(f'<@{BOT_ID}>') or content.startswith(f'<@!{BOT_ID}>'):
+        is_just_a_mention = content == f'<@{BOT_ID}>' or content == f'<@!{BOT_ID}>'
+        if not is_just_a_mention: return False
+    if BOT_MENTION in message.content:
+        cleaned_content = message.content.replace(BOT_MENTION, '').strip()
+        if not cleaned_content and not message.attachments: return False
+    return True
+
+
+def _legacy_mention_handler_filter(message) -> bool:
+    if message.author.bot or message.guild is None: return False
+    if BOT_MENTION not in message.content: return False
+    is_in_designated_ai_channel = ai_channels.is_ai_channel(message.channel)
+    clean_content = message.content.replace(BOT_MENTION, '').strip()
+    if is_in_designated_ai_channel and clean_content: return False
+    return True
+
+
+async def _dispatch_legacy(messages: list) -> float:
+    async def message_listener(message):
+        _legacy_message_handler_filter(message)
+
+    async def mention_listener(message):
+        _legacy_mention_handler_filter(message)
+
+    start = time.perf_counter()
+    for message in messages:
+        asyncio.create_task(message_listener(message))
+        asyncio.create_task(mention_listener(message))
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def _dispatch_router(messages: list) -> float:
+    classifier = MessageClassifier(BOT_ID)
+
+    async def route_listener(message):
+        classifier.classify(message)
+
+    start = time.perf_counter()
+    for message in messages:
+        asyncio.create_task(route_listener(message))
+        await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+def _check_mention_precedence(messages: list):
+    """Pesan yang dijawab listener mention lama harus tetap berute MENTION (mention menang atas prefix)."""
+    classifier = MessageClassifier(BOT_ID)
+    for message in messages:
+        if _legacy_mention_handler_filter(message):
+            assert classifier.classify(message).route is MessageRoute.MENTION, f"Rute mention berubah: {message.content!r}"
+
+
+def main(count: int):
+    messages = _build_messages(count)
+    _check_mention_precedence(messages)
+
+    start = time.perf_counter()
+    for message in messages:
+        _legacy_message_handler_filter(message)
+        _legacy_mention_handler_filter(message)
+    legacy_total = time.perf_counter() - start
+
+    classifier = MessageClassifier(BOT_ID)
+    routes = {route: 0 for route in MessageRoute}
+    start = time.perf_counter()
+    for message in messages:
+        routes[classifier.classify(message).route] += 1
+    router_total = time.perf_counter() - start
+
+    legacy_dispatch = asyncio.run(_dispatch_legacy(messages))
+    router_dispatch = asyncio.run(_dispatch_router(messages))
+
+    print(f"{count} pesan simulasi")
+    print("  klasifikasi saja:")
+    print(f"    dua filter lama    : {legacy_total / count * 1e9:7.0f} ns/pesan")
+    print(f"    router (sekali)    : {router_total / count * 1e9:7.0f} ns/pesan ({router_total / legacy_total:.2f}x waktu lama)")
+    print("  klasifikasi + dispatch task:")
+    print(f"    lama (2 listener)  : {legacy_dispatch / count * 1e9:7.0f} ns/pesan")
+    print(f"    router (1 listener): {router_dispatch / count * 1e9:7.0f} ns/pesan ({router_dispatch / legacy_dispatch:.2f}x waktu lama)")
+    print("  rute: " + ", ".join(f"{route.value}={n}" for route, n in routes.items()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
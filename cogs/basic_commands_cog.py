@@ -3,13 +3,18 @@
 import discord
 from discord.ext import commands
 import logging
-from utils import general_utils, pattern_manager, ai_utils
+from utils import general_utils, pattern_manager, ai_utils, cache_utils
 from ai_services import gemini_client as gemini_services
+from ai_services.ai_channel_index import ai_channels
 import asyncio
 import argparse
 
 _logger = logging.getLogger("noelle_bot.basic")
 
+PATTERN_CACHE_MAXSIZE = 256
+PATTERN_CACHE_TTL_SECONDS = 60 * 60
+_pattern_response_cache = cache_utils.AsyncTTLCache(maxsize=PATTERN_CACHE_MAXSIZE, ttl=PATTERN_CACHE_TTL_SECONDS, name="pattern")
+
 class SafeArgumentParser(argparse.ArgumentParser):
     def error(self, message):
         raise commands.BadArgument(message)
@@ -91,14 +96,15 @@ class BasicCommandsCog(commands.Cog, name="Perintah Dasar"):
             await ctx.send_help(ctx.command)
             return
             
-        designated_channel_name = gemini_services.get_designated_ai_channel_name().lower()
-        if ctx.channel.name.lower() != designated_channel_name:
-            return await ctx.send(f"Perintah ini hanya bisa digunakan di channel `{designated_channel_name}`.")
+        if not ai_channels.is_ai_channel(ctx.channel):
+            return await ctx.send(f"Perintah ini hanya bisa digunakan di channel `{ai_channels.channel_name(ctx.guild.id if ctx.guild else None)}`.")
             
         pattern_prompt_template = pattern_manager.get_pattern(pattern_name)
         
         if not pattern_prompt_template:
-            return await ctx.send(f"Pattern `{pattern_name}` tidak ditemukan. Gunakan `$pattern list` untuk melihat daftar yang tersedia.")
+            suggestions = pattern_manager.suggest_patterns(pattern_name)
+            hint = f" Mungkin maksud Anda: {', '.join(f'`{name}`' for name in suggestions)}." if suggestions else ""
+            return await ctx.send(f"Pattern `{pattern_name}` tidak ditemukan.{hint} Gunakan `$pattern list` untuk melihat daftar yang tersedia.")
             
         if not user_input.strip():
             return await ctx.send(f"Mohon berikan input untuk pattern `{pattern_name}`.")
@@ -113,24 +119,58 @@ class BasicCommandsCog(commands.Cog, name="Perintah Dasar"):
                 # Gabungkan template pattern dengan input dari pengguna
                 final_prompt = pattern_prompt_template.replace("{{input}}", user_input)
                 
-                api_response = await asyncio.to_thread(
-                    client.models.generate_content,
-                    model=gemini_services.GEMINI_TEXT_MODEL_NAME,
-                    contents=final_prompt # Seluruh prompt yang sudah diformat menjadi konten
-                )
-                
-                context_log_prefix = f"Pattern Command [Name: {pattern_name}]"
+                footer_text = f"Pattern '{pattern_name}' digunakan oleh: {ctx.author.display_name}"
+                streamed_here = False
+
+                async def run_pattern() -> str | None:
+                    nonlocal streamed_here
+                    if gemini_services.STREAM_RESPONSES_ENABLED:
+                        stream = gemini_services.stream_content(
+                            model=gemini_services.GEMINI_TEXT_MODEL_NAME,
+                            contents=final_prompt,
+                            client=client,
+                            priority=gemini_services.Priority.PATTERN,
+                            guild_id=ctx.guild.id if ctx.guild else None
+                        )
+                        streamed_reply = await ai_utils.stream_text_in_embeds(stream, ctx.channel, footer_text, reply_to_message=ctx.message)
+                        streamed_here = True
+                        return streamed_reply.text if streamed_reply.has_output else None
+                    api_response = await gemini_services.generate_content(
+                        model=gemini_services.GEMINI_TEXT_MODEL_NAME,
+                        contents=final_prompt, # Seluruh prompt yang sudah diformat menjadi konten
+                        client=client,
+                        priority=gemini_services.Priority.PATTERN,
+                        guild_id=ctx.guild.id if ctx.guild else None
+                    )
+                    return api_response.text
+
+                # Respons di-cache per (pattern, hash konten, input); permintaan identik yang bersamaan digabung.
+                cache_key = pattern_manager.build_response_cache_key(pattern_name, user_input)
+                if cache_key is None:
+                    response_text, cache_source = await run_pattern(), cache_utils.CACHE_MISS
+                else:
+                    response_text, cache_source = await _pattern_response_cache.get_or_compute(cache_key, run_pattern)
+                _logger.info(f"Pattern Command [Name: {pattern_name}] cache: {cache_source}.")
+
+                if not response_text or not response_text.strip():
+                    await ctx.send("Maaf, pattern tidak menghasilkan respons.")
+                    return
+                if streamed_here:
+                    return
+
+                if cache_source != cache_utils.CACHE_MISS:
+                    footer_text += " • dari cache"
                 await ai_utils.send_text_in_embeds(
                     target_channel=ctx.channel,
-                    response_text=api_response.text,
-                    footer_text=f"Pattern '{pattern_name}' digunakan oleh: {ctx.author.display_name}",
+                    response_text=response_text,
+                    footer_text=footer_text,
                     reply_to_message=ctx.message,
                     is_direct_ai_response=True
                 )
 
             except Exception as e:
                 _logger.error(f"Error saat menjalankan pattern '{pattern_name}': {e}", exc_info=True)
-                await ctx.send(f"Terjadi kesalahan saat menjalankan pattern: `{e}`")
+                await ctx.send(f"Gagal menjalankan pattern: {gemini_services.describe_error(e)}")
 
     @pattern_prefix.command(name="list")
     async def pattern_list_subcommand(self, ctx: commands.Context):
@@ -152,6 +192,20 @@ class BasicCommandsCog(commands.Cog, name="Perintah Dasar"):
         embed.set_footer(text=f"Total {len(available_patterns)} pattern ditemukan.")
         await ctx.send(embed=embed)
 
+    @pattern_prefix.command(name="stats", hidden=True)
+    @commands.is_owner()
+    async def pattern_stats_subcommand(self, ctx: commands.Context):
+        """Menampilkan statistik cache respons pattern."""
+        stats = _pattern_response_cache.stats()
+        embed = discord.Embed(title="Statistik Cache Pattern", color=discord.Color.teal())
+        embed.add_field(name="Entri", value=f"{stats['entries']} / {stats['maxsize']}", inline=True)
+        embed.add_field(name="Hit", value=str(stats['hits']), inline=True)
+        embed.add_field(name="Miss", value=str(stats['misses']), inline=True)
+        embed.add_field(name="Digabung (in-flight)", value=str(stats['coalesced']), inline=True)
+        embed.add_field(name="Hit Rate", value=f"{stats['hit_rate']:.0%}", inline=True)
+        embed.set_footer(text=f"TTL {PATTERN_CACHE_TTL_SECONDS // 60} menit")
+        await ctx.send(embed=embed)
+
     async def cog_command_error(self, ctx: commands.Context, error: commands.CommandError):
         # ... (Error handler tidak berubah) ...
         if isinstance(error, commands.NotOwner): return
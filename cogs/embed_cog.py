@@ -2,15 +2,155 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, ui
+import io
+import json
 import logging
 from core import database
 from utils import general_utils
+from utils.welcome_aggregator import WelcomeAggregator
 
 _logger = logging.getLogger("noelle_bot.embed")
 
-# --- Kelas Modal dan View TIDAK BERUBAH ---
-# Salin kelas BasicEmbedModal, AuthorEmbedModal, FooterEmbedModal, dan EmbedEditView
-# dari file aslimu ke sini. Logikanya sudah benar.
+# Jumlah nama per halaman /embed list.
+EMBED_LIST_PAGE_SIZE = 50
+
+# Format file /embed export dan /embed import.
+EMBED_EXPORT_FORMAT = "noelle-embeds"
+EMBED_EXPORT_VERSION = 1
+MAX_IMPORT_FILE_BYTES = 1024 * 1024
+MAX_IMPORT_EMBEDS = 500
+MAX_EMBED_NAME_LENGTH = 100
+# Batas panjang teks sesuai batas embed Discord.
+_TEXT_LIMITS = {'title': 256, 'description': 4096, 'url': 2048}
+_NESTED_SCHEMAS = {
+    'author': {'name': (str, 256), 'icon_url': (str, 2048), 'url': (str, 2048)},
+    'footer': {'text': (str, 2048), 'icon_url': (str, 2048), 'timestamp': (bool, None)},
+    'thumbnail': {'url': (str, 2048)},
+    'image': {'url': (str, 2048)},
+}
+_FIELD_SCHEMA = {'name': (str, 256), 'value': (str, 1024), 'inline': (bool, None)}
+_IGNORED_IMPORT_KEYS = ('_id', 'guild_id', 'version')
+
+EMBED_CONFLICT_MESSAGE = "Embed ini sudah diubah atau dihapus di tempat lain. Buka lagi `/embed edit` untuk memuat versi terbaru."
+
+def normalize_embed_name(nama: str) -> str:
+    return nama.lower().strip().replace(" ", "-")
+
+async def embed_name_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    """Saran nama embed dari indeks awalan di memori (tanpa query database setelah indeks dimuat)."""
+    if not interaction.guild_id: return []
+    name_index = await database.get_embed_name_index(interaction.guild_id)
+    if name_index is None: return []
+    return [app_commands.Choice(name=name, value=name) for name in name_index.complete(normalize_embed_name(current))]
+
+def _check_object(value, schema: dict, label: str) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"`{label}` harus berupa objek.")
+    for key, item in value.items():
+        if key not in schema:
+            raise ValueError(f"`{label}.{key}` tidak dikenal.")
+        expected_type, max_length = schema[key]
+        if not isinstance(item, expected_type):
+            raise ValueError(f"`{label}.{key}` harus bertipe {expected_type.__name__}.")
+        if max_length and len(item) > max_length:
+            raise ValueError(f"`{label}.{key}` melebihi {max_length} karakter.")
+    return dict(value)
+
+def validate_embed_import_entry(entry) -> tuple[str, dict]:
+    """Memvalidasi satu embed dari file impor. Mengembalikan (nama, data) atau melempar ValueError berisi alasan."""
+    if not isinstance(entry, dict):
+        raise ValueError("entri bukan objek.")
+    raw_name = entry.get('embed_name')
+    if not isinstance(raw_name, str) or not normalize_embed_name(raw_name):
+        raise ValueError("`embed_name` kosong atau bukan teks.")
+    name = normalize_embed_name(raw_name)
+    if len(name) > MAX_EMBED_NAME_LENGTH:
+        raise ValueError(f"`embed_name` melebihi {MAX_EMBED_NAME_LENGTH} karakter.")
+
+    data = {}
+    for key, value in entry.items():
+        if key == 'embed_name' or key in _IGNORED_IMPORT_KEYS or value is None: continue
+        if key in _TEXT_LIMITS:
+            if not isinstance(value, str) or len(value) > _TEXT_LIMITS[key]:
+                raise ValueError(f"`{key}` harus teks maksimal {_TEXT_LIMITS[key]} karakter.")
+            data[key] = value
+        elif key == 'color':
+            color = general_utils.get_color_int(value) if isinstance(value, str) else value
+            if isinstance(color, bool) or not isinstance(color, int) or not 0 <= color <= 0xFFFFFF:
+                raise ValueError("`color` harus hex #RRGGBB atau angka 0-16777215.")
+            data[key] = color
+        elif key in ('thumbnail', 'image') and isinstance(value, str):
+            data[key] = _check_object({'url': value}, _NESTED_SCHEMAS[key], key)
+        elif key in _NESTED_SCHEMAS:
+            data[key] = _check_object(value, _NESTED_SCHEMAS[key], key)
+        elif key == 'fields':
+            if not isinstance(value, list) or len(value) > 25:
+                raise ValueError("`fields` harus berupa daftar berisi maksimal 25 field.")
+            data[key] = [_check_object(field, _FIELD_SCHEMA, f"fields[{i}]") for i, field in enumerate(value)]
+        else:
+            raise ValueError(f"field `{key}` tidak dikenal.")
+    if not any(data.get(key) for key in ('title', 'description', 'author', 'fields', 'image', 'thumbnail', 'footer')):
+        raise ValueError("embed tidak punya konten.")
+    return name, data
+
+def parse_embed_import(raw: bytes) -> tuple[dict[str, dict], list[str]]:
+    """Membaca file impor. Mengembalikan ({nama: data} yang valid, daftar alasan penolakan per entri)."""
+    try:
+        payload = json.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"File bukan JSON yang valid: {e}") from e
+    entries = payload.get('embeds') if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        raise ValueError("File harus berisi daftar `embeds` (gunakan file hasil `/embed export`).")
+    if len(entries) > MAX_IMPORT_EMBEDS:
+        raise ValueError(f"Maksimal {MAX_IMPORT_EMBEDS} embed per impor (file berisi {len(entries)}).")
+
+    valid: dict[str, dict] = {}
+    rejected: list[str] = []
+    for position, entry in enumerate(entries, start=1):
+        try:
+            name, data = validate_embed_import_entry(entry)
+        except ValueError as e:
+            label = entry.get('embed_name') if isinstance(entry, dict) and isinstance(entry.get('embed_name'), str) else f"#{position}"
+            rejected.append(f"`{label}`: {e}")
+            continue
+        if name in valid:
+            rejected.append(f"`{name}`: nama duplikat di dalam file.")
+            continue
+        valid[name] = data
+    return valid, rejected
+
+async def embed_not_found_message(guild_id: int, nama: str) -> str:
+    message = f"Embed dengan nama `{nama}` tidak ditemukan."
+    name_index = await database.get_embed_name_index(guild_id)
+    suggestions = name_index.complete(nama[:3], limit=5) if name_index is not None else []
+    if suggestions:
+        message += " Mungkin maksud Anda: " + ", ".join(f"`{name}`" for name in suggestions)
+    return message
+
+async def _apply_embed_changes(interaction: discord.Interaction, guild_id: int, embed_name: str,
+                              initial_data: dict, new_values: dict, success_message: str):
+    """
+    Menyimpan field yang berubah dibanding `initial_data` (nilai None = hapus field) dalam satu
+    round trip, lalu memperbarui pratinjau. Jika embed sudah berubah sejak modal dibuka, pengguna diberi tahu.
+    """
+    set_fields = {key: value for key, value in new_values.items() if value is not None and initial_data.get(key) != value}
+    unset_fields = [key for key, value in new_values.items() if value is None and key in initial_data]
+    if set_fields or unset_fields:
+        updated_data = await database.update_custom_embed(guild_id, embed_name, set_fields, unset_fields, initial_data.get('version'))
+        if updated_data is None:
+            return await interaction.response.send_message(EMBED_CONFLICT_MESSAGE, ephemeral=True)
+    else:
+        updated_data = initial_data
+    processed_embed = general_utils.create_processed_embed(
+        updated_data,
+        user=interaction.user,
+        member=interaction.user if isinstance(interaction.user, discord.Member) else None,
+        guild=interaction.guild,
+        channel=interaction.channel
+    )
+    await interaction.response.edit_message(content=success_message, embed=processed_embed)
+
 class BasicEmbedModal(ui.Modal, title='Edit Info Dasar Embed'):
     embed_title = ui.TextInput(label='Judul', style=discord.TextStyle.short, required=False, max_length=256)
     embed_description = ui.TextInput(label='Deskripsi', style=discord.TextStyle.long, required=False, max_length=4000)
@@ -28,32 +168,14 @@ class BasicEmbedModal(ui.Modal, title='Edit Info Dasar Embed'):
         elif isinstance(color_val, str): self.embed_color.default = color_val
 
     async def on_submit(self, interaction: discord.Interaction):
-        current_data = await database.get_custom_embed(self.guild_id, self.embed_name) or {}
-        
         title = self.embed_title.value.strip()
         description = self.embed_description.value.strip()
-        color_str = self.embed_color.value.strip()
-
-        current_data['title'] = title if title else None
-        current_data['description'] = description if description else None
-        color_int = general_utils.get_color_int(color_str)
-        current_data['color'] = color_int
-
-        if not title and 'title' in current_data: del current_data['title']
-        if not description and 'description' in current_data: del current_data['description']
-        if color_int is None and 'color' in current_data: del current_data['color']
-            
-        await database.save_custom_embed(self.guild_id, self.embed_name, current_data)
-        updated_data = await database.get_custom_embed(self.guild_id, self.embed_name)
-        
-        processed_embed = general_utils.create_processed_embed(
-            updated_data, 
-            user=interaction.user, 
-            member=interaction.user if isinstance(interaction.user, discord.Member) else None,
-            guild=interaction.guild, 
-            channel=interaction.channel
-        )
-        await interaction.response.edit_message(content="Info dasar embed berhasil diperbarui!", embed=processed_embed)
+        new_values = {
+            'title': title or None,
+            'description': description or None,
+            'color': general_utils.get_color_int(self.embed_color.value.strip()),
+        }
+        await _apply_embed_changes(interaction, self.guild_id, self.embed_name, self.initial_data, new_values, "Info dasar embed berhasil diperbarui!")
 
 class AuthorEmbedModal(ui.Modal, title='Edit Author Embed'):
     author_name = ui.TextInput(label='Nama Author', style=discord.TextStyle.short, required=False, max_length=256)
@@ -63,12 +185,12 @@ class AuthorEmbedModal(ui.Modal, title='Edit Author Embed'):
         super().__init__(timeout=300)
         self.embed_name = embed_name
         self.guild_id = guild_id
-        author_data = (initial_data or {}).get('author', {})
+        self.initial_data = initial_data or {}
+        author_data = self.initial_data.get('author', {})
         self.author_name.default = author_data.get('name', '')
         self.author_icon_url.default = author_data.get('icon_url', '')
 
     async def on_submit(self, interaction: discord.Interaction):
-        current_data = await database.get_custom_embed(self.guild_id, self.embed_name) or {}
         name = self.author_name.value.strip()
         icon_url_input = self.author_icon_url.value.strip()
         
@@ -76,18 +198,7 @@ class AuthorEmbedModal(ui.Modal, title='Edit Author Embed'):
         if name: author_dict['name'] = name
         if icon_url_input: author_dict['icon_url'] = icon_url_input
 
-        if author_dict:
-            current_data['author'] = author_dict
-        elif 'author' in current_data: 
-            del current_data['author']
-            
-        await database.save_custom_embed(self.guild_id, self.embed_name, current_data)
-        updated_data = await database.get_custom_embed(self.guild_id, self.embed_name)
-        
-        processed_embed = general_utils.create_processed_embed(
-            updated_data, user=interaction.user, member=interaction.user if isinstance(interaction.user, discord.Member) else None, guild=interaction.guild, channel=interaction.channel
-        )
-        await interaction.response.edit_message(content="Author embed berhasil diperbarui!", embed=processed_embed)
+        await _apply_embed_changes(interaction, self.guild_id, self.embed_name, self.initial_data, {'author': author_dict or None}, "Author embed berhasil diperbarui!")
 
 class FooterEmbedModal(ui.Modal, title='Edit Footer Embed'):
     footer_text = ui.TextInput(label='Teks Footer', style=discord.TextStyle.short, required=False, max_length=2048)
@@ -97,28 +208,21 @@ class FooterEmbedModal(ui.Modal, title='Edit Footer Embed'):
         super().__init__(timeout=300)
         self.embed_name = embed_name
         self.guild_id = guild_id
-        footer_data = (initial_data or {}).get('footer', {})
+        self.initial_data = initial_data or {}
+        footer_data = self.initial_data.get('footer', {})
         self.footer_text.default = footer_data.get('text', '')
         self.add_timestamp.default = 'yes' if footer_data.get('timestamp') is True else 'no'
 
     async def on_submit(self, interaction: discord.Interaction):
-        current_data = await database.get_custom_embed(self.guild_id, self.embed_name) or {}
         text = self.footer_text.value.strip()
         show_ts = self.add_timestamp.value.strip().lower() == 'yes'
         
         footer_dict = {}
         if text: footer_dict['text'] = text
         footer_dict['timestamp'] = show_ts
-            
-        if footer_dict.get('text') or footer_dict.get('timestamp'):
-             current_data['footer'] = footer_dict
-        elif 'footer' in current_data:
-            del current_data['footer']
-            
-        await database.save_custom_embed(self.guild_id, self.embed_name, current_data)
-        updated_data = await database.get_custom_embed(self.guild_id, self.embed_name)
-        processed_embed = general_utils.create_processed_embed(updated_data, user=interaction.user, member=interaction.user if isinstance(interaction.user, discord.Member) else None, guild=interaction.guild, channel=interaction.channel)
-        await interaction.response.edit_message(content="Footer embed berhasil diperbarui!", embed=processed_embed)
+
+        new_footer = footer_dict if footer_dict.get('text') or footer_dict.get('timestamp') else None
+        await _apply_embed_changes(interaction, self.guild_id, self.embed_name, self.initial_data, {'footer': new_footer}, "Footer embed berhasil diperbarui!")
 
 class EmbedEditView(ui.View):
     def __init__(self, embed_name: str, guild_id: int, *, timeout=300):
@@ -156,22 +260,26 @@ class EmbedEditView(ui.View):
 class EmbedCog(commands.Cog, name="Custom Embeds"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.welcome_aggregator = WelcomeAggregator(self._render_welcome)
         _logger.info("EmbedCog dimuat.")
 
+    async def cog_unload(self):
+        self.welcome_aggregator.close()
+
+    @staticmethod
+    def _render_welcome(template: dict, member: discord.Member, channel: discord.abc.Messageable) -> discord.Embed:
+        embed = general_utils.create_processed_embed(template, member=member, guild=member.guild, channel=channel)
+        if member.display_avatar and not embed.thumbnail:
+            embed.set_thumbnail(url=member.display_avatar.url)
+        return embed
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        guild = member.guild
-        target_channel = guild.system_channel
-        if target_channel:
-            welcome_embed_data = await database.get_custom_embed(guild.id, "welcome")
-            if welcome_embed_data:
-                try:
-                    embed = general_utils.create_processed_embed(welcome_embed_data, member=member, guild=guild, channel=target_channel)
-                    if member.display_avatar and not embed.thumbnail:
-                        embed.set_thumbnail(url=member.display_avatar.url)
-                    await target_channel.send(embed=embed)
-                except discord.Forbidden: _logger.warning(f"Tidak bisa kirim welcome embed ke {target_channel.name} (Forbidden).")
-                except Exception as e: _logger.error(f"Error kirim custom welcome embed: {e}", exc_info=True)
+        if not member.guild.system_channel: return
+        welcome_embed_data = await database.get_custom_embed(member.guild.id, "welcome")
+        if welcome_embed_data:
+            # Dikirim bersama join lain dalam jendela singkat agar gelombang join tidak menabrak rate limit channel.
+            self.welcome_aggregator.add(member, welcome_embed_data)
 
     embed_group = app_commands.Group(name="embed", description="Manajemen custom embed server.")
 
@@ -184,7 +292,7 @@ class EmbedCog(commands.Cog, name="Custom Embeds"):
         if not interaction.guild_id: 
             return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
         
-        nama = nama.lower().strip().replace(" ", "-")
+        nama = normalize_embed_name(nama)
         if not nama: 
             return await interaction.followup.send("Nama embed tidak boleh kosong.")
         
@@ -206,16 +314,17 @@ class EmbedCog(commands.Cog, name="Custom Embeds"):
     @embed_group.command(name="edit", description="Mengedit template embed yang sudah ada.")
     @app_commands.describe(nama="Nama embed yang akan diedit.")
     @commands.has_permissions(manage_guild=True)
+    @app_commands.autocomplete(nama=embed_name_autocomplete)
     async def embed_edit(self, interaction: discord.Interaction, nama: str):
         await interaction.response.defer(ephemeral=True)
         
         if not interaction.guild_id: 
             return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
         
-        nama = nama.lower().strip().replace(" ", "-")
+        nama = normalize_embed_name(nama)
         existing_data = await database.get_custom_embed(interaction.guild_id, nama)
         if not existing_data: 
-            return await interaction.followup.send(f"Embed dengan nama `{nama}` tidak ditemukan.")
+            return await interaction.followup.send(await embed_not_found_message(interaction.guild_id, nama))
         
         preview_embed = general_utils.create_processed_embed(existing_data, user=interaction.user, member=interaction.user, guild=interaction.guild, channel=interaction.channel)
         view = EmbedEditView(nama, interaction.guild_id)
@@ -223,30 +332,35 @@ class EmbedCog(commands.Cog, name="Custom Embeds"):
         view.message = await interaction.original_response()
     
     @embed_group.command(name="list", description="Menampilkan semua template embed kustom di server ini.")
-    async def embed_list(self, interaction: discord.Interaction):
+    @app_commands.describe(mulai="Tampilkan nama setelah nama ini (untuk halaman berikutnya).")
+    async def embed_list(self, interaction: discord.Interaction, mulai: str | None = None):
         await interaction.response.defer(ephemeral=True)
 
         if not interaction.guild_id or not interaction.guild: 
             return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
         
-        embed_names = await database.get_all_custom_embed_names(interaction.guild_id)
+        after = normalize_embed_name(mulai) if mulai else None
+        embed_names, next_cursor = await database.get_custom_embed_names_page(interaction.guild_id, after, EMBED_LIST_PAGE_SIZE)
         if not embed_names: 
-            return await interaction.followup.send("Belum ada embed kustom di server ini.")
+            return await interaction.followup.send("Tidak ada embed lagi setelah nama itu." if after else "Belum ada embed kustom di server ini.")
         
         embed = discord.Embed(title=f"Embed Kustom di {interaction.guild.name}", color=discord.Color.blue())
-        embed.description = "\n".join(f"- `{name}`" for name in sorted(embed_names))
+        embed.description = "\n".join(f"- `{name}`" for name in embed_names)
+        if next_cursor:
+            embed.set_footer(text=f"Halaman berikutnya: /embed list mulai:{next_cursor}")
         await interaction.followup.send(embed=embed)
 
     @embed_group.command(name="hapus", description="Menghapus template embed kustom.")
     @app_commands.describe(nama="Nama embed yang akan dihapus.")
     @commands.has_permissions(manage_guild=True)
+    @app_commands.autocomplete(nama=embed_name_autocomplete)
     async def embed_remove(self, interaction: discord.Interaction, nama: str):
         await interaction.response.defer(ephemeral=True)
         
         if not interaction.guild_id: 
             return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
         
-        nama = nama.lower().strip().replace(" ", "-")
+        nama = normalize_embed_name(nama)
         if await database.delete_custom_embed(interaction.guild_id, nama):
             await interaction.followup.send(f"Embed `{nama}` berhasil dihapus.")
         else: 
@@ -254,20 +368,76 @@ class EmbedCog(commands.Cog, name="Custom Embeds"):
 
     @embed_group.command(name="tampil", description="Menampilkan pratinjau embed kustom.")
     @app_commands.describe(nama="Nama embed yang akan ditampilkan.")
+    @app_commands.autocomplete(nama=embed_name_autocomplete)
     async def embed_view(self, interaction: discord.Interaction, nama: str):
         await interaction.response.defer()
         
         if not interaction.guild_id: 
             return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.", ephemeral=True)
         
-        nama = nama.lower().strip().replace(" ", "-")
+        nama = normalize_embed_name(nama)
         embed_data = await database.get_custom_embed(interaction.guild_id, nama)
         if not embed_data: 
-            return await interaction.followup.send(f"Embed `{nama}` tidak ditemukan.", ephemeral=True)
+            return await interaction.followup.send(await embed_not_found_message(interaction.guild_id, nama), ephemeral=True)
         
         processed_embed = general_utils.create_processed_embed(embed_data, user=interaction.user, member=interaction.user, guild=interaction.guild, channel=interaction.channel)
         await interaction.followup.send(f"Pratinjau embed **`{nama}`**:", embed=processed_embed)
 
+    @embed_group.command(name="export", description="Mengekspor semua embed kustom server ini sebagai file JSON.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def embed_export(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        if not interaction.guild_id: 
+            return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
+
+        buffer = io.StringIO()
+        buffer.write(f'{{"format": "{EMBED_EXPORT_FORMAT}", "version": {EMBED_EXPORT_VERSION}, "embeds": [\n')
+        count = 0
+        async for embed_doc in database.iter_custom_embeds(interaction.guild_id):
+            embed_doc.pop('version', None)
+            if count: buffer.write(',\n')
+            buffer.write(json.dumps(embed_doc, ensure_ascii=False, default=str))
+            count += 1
+        buffer.write('\n]}\n')
+        if not count:
+            return await interaction.followup.send("Belum ada embed kustom di server ini.")
+
+        file = discord.File(io.BytesIO(buffer.getvalue().encode('utf-8')), filename=f"embeds-{interaction.guild_id}.json")
+        await interaction.followup.send(f"{count} embed diekspor. Gunakan `/embed import` untuk memuatnya di server lain.", file=file)
+
+    @embed_group.command(name="import", description="Mengimpor embed kustom dari file JSON hasil /embed export.")
+    @app_commands.describe(berkas="File JSON hasil /embed export. Embed dengan nama sama akan ditimpa.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def embed_import(self, interaction: discord.Interaction, berkas: discord.Attachment):
+        await interaction.response.defer(ephemeral=True)
+
+        if not interaction.guild_id: 
+            return await interaction.followup.send("Perintah ini hanya bisa digunakan di dalam server.")
+        if berkas.size > MAX_IMPORT_FILE_BYTES:
+            return await interaction.followup.send(f"File terlalu besar (maksimal {MAX_IMPORT_FILE_BYTES // 1024} KB).")
+
+        try:
+            valid, rejected = parse_embed_import(await berkas.read())
+        except ValueError as e:
+            return await interaction.followup.send(str(e))
+
+        counts = await database.bulk_upsert_custom_embeds(interaction.guild_id, valid)
+        if counts is None:
+            return await interaction.followup.send("Database tidak tersedia, impor dibatalkan.")
+
+        report = discord.Embed(title="Hasil Impor Embed", color=discord.Color.green() if not rejected and not counts['failed'] else discord.Color.orange())
+        report.add_field(name="Baru", value=str(counts['inserted']), inline=True)
+        report.add_field(name="Diperbarui", value=str(counts['updated']), inline=True)
+        report.add_field(name="Ditolak", value=str(len(rejected) + counts['failed']), inline=True)
+        if rejected:
+            shown = "\n".join(rejected[:10])
+            if len(rejected) > 10: shown += f"\n... dan {len(rejected) - 10} lainnya"
+            report.add_field(name="Alasan Penolakan", value=shown[:1024], inline=False)
+        if counts['failed']:
+            report.set_footer(text=f"{counts['failed']} embed gagal disimpan ke database.")
+        await interaction.followup.send(embed=report)
+
     async def cog_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         original_error = getattr(error, 'original', error)
         command_name = interaction.command.name if interaction.command else 'N/A'
@@ -1,29 +1,67 @@
 # Noelle_Bot/core/database.py
 
 import os
+import copy
+import datetime
+from typing import Callable, Iterable
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
-from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+from pymongo import ReplaceOne, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure, PyMongoError
 import logging
 
+from cachetools import LRUCache
+
+from utils.cache_utils import AsyncTTLCache
+from utils.name_index import PrefixIndex
+
 _logger = logging.getLogger("noelle_bot.database")
 
 MONGO_URI = os.getenv('MONGODB_URI')
 DATABASE_NAME = 'noelle_bot_db'
 EMBEDS_COLLECTION_NAME = 'custom_embeds'
 CONFIGS_COLLECTION_NAME = 'server_configs'
+CHAT_SESSIONS_COLLECTION_NAME = 'ai_chat_sessions'
+RESPONSE_PAGES_COLLECTION_NAME = 'response_pages'
+# Sesi chat AI yang tidak aktif selama ini dianggap selesai (dipakai juga oleh TTL index).
+CHAT_SESSION_TIMEOUT_MINUTES = 30
+# Halaman respons panjang (paginator) disimpan selama ini sejak dibuat, di memori dan di MongoDB (TTL index).
+RESPONSE_PAGES_TTL_SECONDS = int(os.getenv('PAGE_STORE_TTL_SECONDS', str(6 * 3600)))
+# Config server dibaca dari cache memori; perubahan lewat update_server_config langsung ditulis ke cache.
+SERVER_CONFIG_CACHE_TTL_SECONDS = int(os.getenv('SERVER_CONFIG_CACHE_TTL_SECONDS', '300'))
+SERVER_CONFIG_CACHE_SIZE = 10000
+# Jumlah guild_id per query $in saat memuat config secara massal.
+CONFIG_PRELOAD_BATCH_SIZE = 500
+# Cache custom embed per (guild_id, embed_name); embed yang tidak ada juga di-cache (mis. 'welcome').
+EMBED_CACHE_TTL_SECONDS = int(os.getenv('EMBED_CACHE_TTL_SECONDS', '600'))
+EMBED_CACHE_SIZE = 5000
+# Ukuran halaman saat membaca nama embed (paginasi kursor berdasarkan embed_name).
+EMBED_NAMES_PAGE_SIZE = 100
+# Jumlah guild yang indeks nama embed-nya disimpan di memori (untuk autocomplete).
+EMBED_NAME_INDEX_GUILDS = 2000
 
 _mongo_client: AsyncIOMotorClient | None = None
 _db: AsyncIOMotorDatabase | None = None
 _embeds_collection: AsyncIOMotorCollection | None = None
 _configs_collection: AsyncIOMotorCollection | None = None
+_chat_sessions_collection: AsyncIOMotorCollection | None = None
+_response_pages_collection: AsyncIOMotorCollection | None = None
 
 DEFAULT_SERVER_CONFIG = {
     'ai_channel_name': "ai-channel",
     'mod_roles': [],
 }
 
+_server_config_cache = AsyncTTLCache(maxsize=SERVER_CONFIG_CACHE_SIZE, ttl=SERVER_CONFIG_CACHE_TTL_SECONDS, name="server_config")
+_embed_cache = AsyncTTLCache(maxsize=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL_SECONDS, name="custom_embed")
+_EMBED_NOT_FOUND: dict = {} # Penanda cache untuk embed yang tidak ada (AsyncTTLCache tidak menyimpan None)
+_embed_name_indexes: LRUCache = LRUCache(maxsize=EMBED_NAME_INDEX_GUILDS)
+# Dipanggil (guild_id, config baru) setiap kali config server diperbarui lewat update_server_config.
+_server_config_listeners: list[Callable[[int, dict], None]] = []
+# Dipanggil (guild_id, nama embed) setiap kali embed disimpan, diganti, dihapus, atau di-invalidate.
+_embed_change_listeners: list[Callable[[int, Iterable[str]], None]] = []
+
 async def connect_to_mongo() -> bool:
-    global _mongo_client, _db, _embeds_collection, _configs_collection
+    global _mongo_client, _db, _embeds_collection, _configs_collection, _chat_sessions_collection, _response_pages_collection
     if not MONGO_URI:
         _logger.error("MONGODB_URI tidak diatur. Fitur database tidak akan berfungsi.")
         return False
@@ -40,11 +78,18 @@ async def connect_to_mongo() -> bool:
         _db = _mongo_client[DATABASE_NAME]
         _embeds_collection = _db[EMBEDS_COLLECTION_NAME]
         _configs_collection = _db[CONFIGS_COLLECTION_NAME]
+        _chat_sessions_collection = _db[CHAT_SESSIONS_COLLECTION_NAME]
+        _response_pages_collection = _db[RESPONSE_PAGES_COLLECTION_NAME]
 
         await _embeds_collection.create_index([("guild_id", 1), ("embed_name", 1)], unique=True, background=True) # <--- DITAMBAHKAN
         _logger.info(f"Index unik dipastikan pada koleksi '{EMBEDS_COLLECTION_NAME}'.")
         await _configs_collection.create_index([("guild_id", 1)], unique=True, background=True) # <--- DITAMBAHKAN
         _logger.info(f"Index unik dipastikan pada koleksi '{CONFIGS_COLLECTION_NAME}'.")
+        await _chat_sessions_collection.create_index([("channel_id", 1)], unique=True, background=True)
+        await _ensure_ttl_index(_chat_sessions_collection, "last_active", CHAT_SESSION_TIMEOUT_MINUTES * 60)
+        _logger.info(f"Index unik & TTL dipastikan pada koleksi '{CHAT_SESSIONS_COLLECTION_NAME}'.")
+        await _ensure_ttl_index(_response_pages_collection, "created_at", RESPONSE_PAGES_TTL_SECONDS)
+        _logger.info(f"Index TTL dipastikan pada koleksi '{RESPONSE_PAGES_COLLECTION_NAME}'.")
         
         return True
     except ConnectionFailure as e:
@@ -52,9 +97,18 @@ async def connect_to_mongo() -> bool:
     except PyMongoError as e:
         _logger.error(f"Error PyMongo/Motor saat koneksi: {e}")
     
-    _mongo_client = _db = _embeds_collection = _configs_collection = None
+    _mongo_client = _db = _embeds_collection = _configs_collection = _chat_sessions_collection = _response_pages_collection = None
     return False
 
+async def _ensure_ttl_index(collection: AsyncIOMotorCollection, field: str, ttl_seconds: int):
+    """TTL index pada `field`; jika durasinya berubah sejak index dibuat, index diperbarui lewat collMod."""
+    try:
+        await collection.create_index([(field, 1)], expireAfterSeconds=ttl_seconds, background=True)
+    except OperationFailure:
+        await _db.command('collMod', collection.name,
+                          index={'keyPattern': {field: 1}, 'expireAfterSeconds': ttl_seconds})
+        _logger.info(f"TTL index '{collection.name}' diperbarui menjadi {ttl_seconds} detik.")
+
 def get_db_status() -> bool:
     return _mongo_client is not None
 
@@ -64,43 +118,157 @@ async def close_mongo_connection():
         _mongo_client.close()
         _logger.info("Koneksi MongoDB (motor) ditutup.")
         _mongo_client = None
+        _server_config_cache.clear()
+        _embed_cache.clear()
+        _embed_name_indexes.clear()
 
 # --- Fungsi CRUD Asinkron untuk Embeds ---
 
+def add_embed_change_listener(callback: Callable[[int, Iterable[str]], None]):
+    if callback not in _embed_change_listeners:
+        _embed_change_listeners.append(callback)
+
+def remove_embed_change_listener(callback: Callable[[int, Iterable[str]], None]):
+    if callback in _embed_change_listeners:
+        _embed_change_listeners.remove(callback)
+
+def _notify_embed_change(guild_id: int, embed_names: Iterable[str]):
+    for callback in list(_embed_change_listeners):
+        try:
+            callback(guild_id, embed_names)
+        except Exception as e:
+            _logger.error(f"Listener perubahan embed gagal untuk guild {guild_id}: {e}", exc_info=True)
+
+def _cache_embed(guild_id: int, embed_name: str, embed_doc: dict | None):
+    _notify_embed_change(guild_id, (embed_name,))
+    _embed_cache.set((guild_id, embed_name), embed_doc if embed_doc is not None else _EMBED_NOT_FOUND)
+
+def _embed_from_cache(cached: dict | None) -> dict | None:
+    # Salinan dalam per pemanggil: pemanggil boleh mengubah dict tanpa merusak isi cache.
+    if cached is None or cached is _EMBED_NOT_FOUND:
+        return None
+    return copy.deepcopy(cached)
+
+def _version_filter(expected_version: int | None):
+    # Dokumen lama belum punya field version; anggap versinya 0.
+    return expected_version if expected_version else {'$in': [None, 0]}
+
+def _replace_embed_pipeline(guild_id: int, embed_name: str, embed_data: dict) -> list[dict]:
+    # Pipeline update agar penggantian dokumen dan kenaikan version terjadi dalam satu operasi atomik.
+    doc_to_save = {key: value for key, value in embed_data.items() if key not in ('_id', 'version')}
+    doc_to_save['guild_id'] = guild_id
+    doc_to_save['embed_name'] = embed_name
+    return [{'$replaceWith': {'$mergeObjects': [
+        {'$literal': doc_to_save},
+        {'_id': '$_id', 'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]}},
+    ]}}]
+
 async def save_custom_embed(guild_id: int, embed_name: str, embed_data: dict) -> bool:
+    """Mengganti seluruh isi embed (upsert); field version dinaikkan dan cache diperbarui."""
     if _embeds_collection is None:
         _logger.error("Embeds collection tidak tersedia untuk save_custom_embed.")
         return False
     try:
-        doc_to_save = embed_data.copy()
-        doc_to_save['guild_id'] = guild_id
-        doc_to_save['embed_name'] = embed_name
-        result = await _embeds_collection.replace_one({'guild_id': guild_id, 'embed_name': embed_name}, doc_to_save, upsert=True) # <--- DITAMBAHKAN
-        return result.upserted_id is not None or result.modified_count > 0
+        saved_doc = await _embeds_collection.find_one_and_update(
+            {'guild_id': guild_id, 'embed_name': embed_name}, _replace_embed_pipeline(guild_id, embed_name, embed_data),
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
     except PyMongoError as e:
         _logger.error(f"Error save_custom_embed: {e}")
+        _embed_cache.invalidate((guild_id, embed_name))
         return False
+    _cache_embed(guild_id, embed_name, saved_doc)
+    name_index = _embed_name_indexes.get(guild_id)
+    if name_index is not None and saved_doc is not None:
+        name_index.add(embed_name)
+    return saved_doc is not None
 
-async def get_custom_embed(guild_id: int, embed_name: str) -> dict | None:
+async def update_custom_embed(guild_id: int, embed_name: str, set_fields: dict, unset_fields: list[str],
+                              expected_version: int | None) -> dict | None:
+    """
+    Mengubah sebagian field embed dalam satu round trip ($set/$unset + $inc version) dan
+    mengembalikan dokumen terbaru. Update hanya berlaku jika version di database masih
+    `expected_version` (optimistic concurrency); None jika embed sudah diubah/dihapus di
+    tempat lain atau terjadi error.
+    """
     if _embeds_collection is None:
-        _logger.error("Embeds collection tidak tersedia untuk get_custom_embed.")
+        _logger.error("Embeds collection tidak tersedia untuk update_custom_embed.")
         return None
+    update: dict = {'$inc': {'version': 1}}
+    if set_fields: update['$set'] = set_fields
+    if unset_fields: update['$unset'] = {field: "" for field in unset_fields}
     try:
-        return await _embeds_collection.find_one({'guild_id': guild_id, 'embed_name': embed_name}) # <--- DITAMBAHKAN
+        updated_doc = await _embeds_collection.find_one_and_update(
+            {'guild_id': guild_id, 'embed_name': embed_name, 'version': _version_filter(expected_version)},
+            update, return_document=ReturnDocument.AFTER,
+        )
+    except PyMongoError as e:
+        _logger.error(f"Error update_custom_embed: {e}")
+        updated_doc = None
+    if updated_doc is None:
+        _embed_cache.invalidate((guild_id, embed_name)) # Muat ulang versi terbaru pada pembacaan berikutnya
+        return None
+    _cache_embed(guild_id, embed_name, updated_doc)
+    return copy.deepcopy(updated_doc)
+
+async def _load_custom_embed(guild_id: int, embed_name: str) -> dict | None:
+    try:
+        embed_doc = await _embeds_collection.find_one({'guild_id': guild_id, 'embed_name': embed_name})
     except PyMongoError as e:
         _logger.error(f"Error get_custom_embed: {e}")
+        return None # Tidak di-cache, dicoba lagi pada pembacaan berikutnya
+    return embed_doc if embed_doc is not None else _EMBED_NOT_FOUND
+
+async def get_custom_embed(guild_id: int, embed_name: str) -> dict | None:
+    """Embed dari cache read-through; hanya cache miss yang ke database."""
+    cached = _embed_cache.get((guild_id, embed_name))
+    if cached is not None:
+        return _embed_from_cache(cached)
+    if _embeds_collection is None:
+        _logger.error("Embeds collection tidak tersedia untuk get_custom_embed.")
         return None
+    cached, _ = await _embed_cache.get_or_compute((guild_id, embed_name), lambda: _load_custom_embed(guild_id, embed_name))
+    return _embed_from_cache(cached)
 
-async def get_all_custom_embed_names(guild_id: int) -> list[str]:
+async def get_custom_embed_names_page(guild_id: int, after: str | None = None,
+                                      limit: int = EMBED_NAMES_PAGE_SIZE) -> tuple[list[str], str | None]:
+    """
+    Satu halaman nama embed urut abjad, dimulai setelah `after` (kursor). Memakai index
+    (guild_id, embed_name) sehingga biaya per halaman tetap, berapa pun jauhnya halaman.
+    Mengembalikan (nama, kursor berikutnya); kursor None berarti halaman terakhir.
+    """
     if _embeds_collection is None:
-        _logger.error("Embeds collection tidak tersedia untuk get_all_custom_embed_names.")
-        return []
+        _logger.error("Embeds collection tidak tersedia untuk get_custom_embed_names_page.")
+        return [], None
+    query: dict = {'guild_id': guild_id}
+    if after is not None:
+        query['embed_name'] = {'$gt': after}
     try:
-        cursor = _embeds_collection.find({'guild_id': guild_id}, {'embed_name': 1, '_id': 0})
-        return [doc['embed_name'] for doc in await cursor.to_list(length=100) if 'embed_name' in doc] # <--- DITAMBAHKAN
+        cursor = _embeds_collection.find(query, {'embed_name': 1, '_id': 0}).sort('embed_name', 1).limit(limit)
+        names = [doc['embed_name'] for doc in await cursor.to_list(length=limit) if 'embed_name' in doc]
     except PyMongoError as e:
-        _logger.error(f"Error get_all_custom_embed_names: {e}")
-        return []
+        _logger.error(f"Error get_custom_embed_names_page: {e}")
+        return [], None
+    return names, (names[-1] if len(names) == limit else None)
+
+async def get_all_custom_embed_names(guild_id: int) -> list[str]:
+    names: list[str] = []
+    cursor: str | None = None
+    while True:
+        page, cursor = await get_custom_embed_names_page(guild_id, cursor)
+        names.extend(page)
+        if cursor is None:
+            return names
+
+async def get_embed_name_index(guild_id: int) -> PrefixIndex | None:
+    """Indeks nama embed guild di memori; dimuat sekali lalu dijaga tetap sinkron oleh save/delete/import."""
+    name_index = _embed_name_indexes.get(guild_id)
+    if name_index is not None:
+        return name_index
+    if _embeds_collection is None:
+        return None
+    name_index = PrefixIndex(await get_all_custom_embed_names(guild_id))
+    return _embed_name_indexes.setdefault(guild_id, name_index)
 
 async def delete_custom_embed(guild_id: int, embed_name: str) -> bool:
     if _embeds_collection is None:
@@ -108,39 +276,244 @@ async def delete_custom_embed(guild_id: int, embed_name: str) -> bool:
         return False
     try:
         result = await _embeds_collection.delete_one({'guild_id': guild_id, 'embed_name': embed_name}) # <--- DITAMBAHKAN
-        return result.deleted_count > 0
     except PyMongoError as e:
         _logger.error(f"Error delete_custom_embed: {e}")
+        _embed_cache.invalidate((guild_id, embed_name))
         return False
+    _cache_embed(guild_id, embed_name, None)
+    name_index = _embed_name_indexes.get(guild_id)
+    if name_index is not None:
+        name_index.discard(embed_name)
+    return result.deleted_count > 0
+
+async def iter_custom_embeds(guild_id: int):
+    """Mengalirkan semua embed guild (urut nama, tanpa _id/guild_id) tanpa memuat semuanya ke memori sekaligus."""
+    if _embeds_collection is None:
+        _logger.error("Embeds collection tidak tersedia untuk iter_custom_embeds.")
+        return
+    cursor = _embeds_collection.find({'guild_id': guild_id}, {'_id': 0, 'guild_id': 0}).sort('embed_name', 1).batch_size(EMBED_NAMES_PAGE_SIZE)
+    async for embed_doc in cursor:
+        yield embed_doc
+
+async def bulk_upsert_custom_embeds(guild_id: int, embeds: dict[str, dict]) -> dict[str, int] | None:
+    """
+    Menyimpan banyak embed sekaligus dengan satu bulk_write (ordered=False): embed yang sudah ada
+    diganti (version dinaikkan), yang belum ada dibuat. Cache embed dan indeks nama guild ikut diperbarui.
+    Mengembalikan jumlah {'inserted', 'updated', 'failed'}, atau None jika database tidak tersedia.
+    """
+    if _embeds_collection is None:
+        _logger.error("Embeds collection tidak tersedia untuk bulk_upsert_custom_embeds.")
+        return None
+    if not embeds:
+        return {'inserted': 0, 'updated': 0, 'failed': 0}
+    names = list(embeds)
+    operations = [
+        UpdateOne({'guild_id': guild_id, 'embed_name': name}, _replace_embed_pipeline(guild_id, name, data), upsert=True)
+        for name, data in embeds.items()
+    ]
+    failed_names: set[str] = set()
+    try:
+        result = await _embeds_collection.bulk_write(operations, ordered=False)
+        counts = {'inserted': result.upserted_count, 'updated': result.matched_count, 'failed': 0}
+    except BulkWriteError as e:
+        # ordered=False: operasi lain tetap dijalankan; hanya yang error yang gagal.
+        details = e.details
+        failed_names = {names[error['index']] for error in details.get('writeErrors', [])}
+        counts = {'inserted': details.get('nUpserted', 0), 'updated': details.get('nMatched', 0), 'failed': len(failed_names)}
+        _logger.warning(f"bulk_upsert_custom_embeds: {len(failed_names)} embed gagal disimpan di guild {guild_id}.")
+    except PyMongoError as e:
+        _logger.error(f"Error bulk_upsert_custom_embeds: {e}")
+        failed_names = set(names)
+        counts = {'inserted': 0, 'updated': 0, 'failed': len(names)}
+    invalidate_custom_embeds(guild_id, names)
+    name_index = _embed_name_indexes.get(guild_id)
+    if name_index is not None:
+        for name in names:
+            if name not in failed_names: name_index.add(name)
+    return counts
+
+def invalidate_custom_embeds(guild_id: int, embed_names: list[str]):
+    _notify_embed_change(guild_id, embed_names)
+    for embed_name in embed_names:
+        _embed_cache.invalidate((guild_id, embed_name))
+
+def embed_cache_stats() -> dict:
+    return _embed_cache.stats()
 
 # --- Fungsi CRUD Asinkron untuk Server Configs ---
 
+def _merge_server_config(config_doc: dict | None) -> dict:
+    merged_config = DEFAULT_SERVER_CONFIG.copy()
+    if config_doc:
+        merged_config.update(config_doc)
+    merged_config.pop('_id', None)
+    merged_config.pop('guild_id', None)
+    return merged_config
+
+def _copy_server_config(config: dict) -> dict:
+    # Salinan per pemanggil agar list (mis. mod_roles) di cache tidak ikut berubah.
+    return {key: list(value) if isinstance(value, list) else value for key, value in config.items()}
+
+def _default_config_upsert(guild_id: int) -> UpdateOne:
+    return UpdateOne({'guild_id': guild_id}, {'$setOnInsert': DEFAULT_SERVER_CONFIG}, upsert=True)
+
+def get_cached_server_config(guild_id: int) -> dict | None:
+    """Config dari cache tanpa akses database; None jika belum dimuat atau sudah kedaluwarsa."""
+    config = _server_config_cache.get(guild_id)
+    return _copy_server_config(config) if config is not None else None
+
+async def _load_server_config(guild_id: int) -> dict | None:
+    try:
+        # Satu round trip: ambil config, atau buat dokumen default jika guild belum pernah terlihat.
+        config_doc = await _configs_collection.find_one_and_update(
+            {'guild_id': guild_id}, {'$setOnInsert': DEFAULT_SERVER_CONFIG},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+        return _merge_server_config(config_doc)
+    except PyMongoError as e:
+        _logger.error(f"Error get_server_config: {e}")
+        return None
+
 async def get_server_config(guild_id: int) -> dict:
+    """
+    Config server dengan cache read-through (TTL). Aman dipanggil di setiap pesan:
+    hanya cache miss yang ke database, dan miss bersamaan untuk guild yang sama digabung.
+    """
+    cached = get_cached_server_config(guild_id)
+    if cached is not None:
+        return cached
     if _configs_collection is None:
         _logger.warning("Configs collection tidak tersedia, mengembalikan config default.")
         return DEFAULT_SERVER_CONFIG.copy()
-    try:
-        config_doc = await _configs_collection.find_one({'guild_id': guild_id}) # <--- DITAMBAHKAN
-        if config_doc:
-            merged_config = DEFAULT_SERVER_CONFIG.copy()
-            merged_config.update(config_doc)
-            if '_id' in merged_config: del merged_config['_id']
-            return merged_config
-        else:
-            default_with_id = {'guild_id': guild_id, **DEFAULT_SERVER_CONFIG}
-            await _configs_collection.insert_one(default_with_id) # <--- DITAMBAHKAN
-            return DEFAULT_SERVER_CONFIG.copy()
-    except PyMongoError as e:
-        _logger.error(f"Error get_server_config: {e}")
-    return DEFAULT_SERVER_CONFIG.copy()
+    config, _ = await _server_config_cache.get_or_compute(guild_id, lambda: _load_server_config(guild_id))
+    return _copy_server_config(config) if config is not None else DEFAULT_SERVER_CONFIG.copy()
+
+async def preload_server_configs(guild_ids: Iterable[int]) -> int:
+    """
+    Memuat config banyak guild sekaligus ke cache (mis. saat on_ready): satu query $in per batch,
+    lalu dokumen default untuk guild yang belum punya config dibuat dalam satu bulk_write.
+    Mengembalikan jumlah config yang dimuat.
+    """
+    if _configs_collection is None:
+        return 0
+    missing_ids = [guild_id for guild_id in dict.fromkeys(guild_ids) if _server_config_cache.get(guild_id) is None]
+    loaded = 0
+    for start in range(0, len(missing_ids), CONFIG_PRELOAD_BATCH_SIZE):
+        batch = missing_ids[start:start + CONFIG_PRELOAD_BATCH_SIZE]
+        try:
+            found = {doc['guild_id']: doc async for doc in _configs_collection.find({'guild_id': {'$in': batch}})}
+            new_ids = [guild_id for guild_id in batch if guild_id not in found]
+            if new_ids:
+                await _configs_collection.bulk_write([_default_config_upsert(guild_id) for guild_id in new_ids], ordered=False)
+        except PyMongoError as e:
+            _logger.error(f"Error preload_server_configs: {e}")
+            continue
+        for guild_id in batch:
+            _server_config_cache.set(guild_id, _merge_server_config(found.get(guild_id)))
+        loaded += len(batch)
+    if loaded:
+        _logger.info(f"{loaded} config server dimuat ke cache.")
+    return loaded
+
+def add_server_config_listener(callback: Callable[[int, dict], None]):
+    if callback not in _server_config_listeners:
+        _server_config_listeners.append(callback)
+
+def remove_server_config_listener(callback: Callable[[int, dict], None]):
+    if callback in _server_config_listeners:
+        _server_config_listeners.remove(callback)
+
+def invalidate_server_config(guild_id: int):
+    _server_config_cache.invalidate(guild_id)
+
+def server_config_cache_stats() -> dict:
+    return _server_config_cache.stats()
 
 async def update_server_config(guild_id: int, settings_to_update: dict) -> bool:
+    """Menulis perubahan ke database lalu langsung memperbarui cache dengan dokumen hasil update (write-through)."""
     if _configs_collection is None:
         _logger.error("Configs collection tidak tersedia untuk update_server_config.")
         return False
     try:
-        result = await _configs_collection.update_one({'guild_id': guild_id}, {'$set': settings_to_update}, upsert=True) # <--- DITAMBAHKAN
-        return result.modified_count > 0 or result.upserted_id is not None
+        config_doc = await _configs_collection.find_one_and_update(
+            {'guild_id': guild_id}, {'$set': settings_to_update},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
     except PyMongoError as e:
         _logger.error(f"Error update_server_config: {e}")
-        return False
\ No newline at end of file
+        _server_config_cache.invalidate(guild_id)
+        return False
+    merged_config = _merge_server_config(config_doc)
+    _server_config_cache.set(guild_id, merged_config)
+    for callback in list(_server_config_listeners):
+        try:
+            callback(guild_id, _copy_server_config(merged_config))
+        except Exception as e:
+            _logger.error(f"Listener config server gagal untuk guild {guild_id}: {e}", exc_info=True)
+    return config_doc is not None
+
+# --- Fungsi Asinkron untuk Sesi Chat AI ---
+
+async def get_chat_session(channel_id: int) -> dict | None:
+    """Mengambil sesi chat tersimpan yang belum melewati batas tidak aktif."""
+    if _chat_sessions_collection is None:
+        return None
+    # TTL monitor MongoDB hanya berjalan sekitar tiap 60 detik, jadi batas waktu dicek juga di sini.
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=CHAT_SESSION_TIMEOUT_MINUTES)
+    try:
+        return await _chat_sessions_collection.find_one({'channel_id': channel_id, 'last_active': {'$gt': cutoff}}, {'_id': 0})
+    except PyMongoError as e:
+        _logger.error(f"Error get_chat_session: {e}")
+        return None
+
+async def save_chat_sessions(session_docs: list[dict]) -> bool:
+    """Menyimpan banyak sesi sekaligus (satu bulk_write, upsert per channel_id)."""
+    if _chat_sessions_collection is None:
+        return False
+    if not session_docs:
+        return True
+    try:
+        operations = [ReplaceOne({'channel_id': doc['channel_id']}, doc, upsert=True) for doc in session_docs]
+        await _chat_sessions_collection.bulk_write(operations, ordered=False)
+        return True
+    except PyMongoError as e:
+        _logger.error(f"Error save_chat_sessions: {e}")
+        return False
+
+async def delete_chat_sessions(channel_ids: list[int]) -> bool:
+    if _chat_sessions_collection is None:
+        return False
+    if not channel_ids:
+        return True
+    try:
+        await _chat_sessions_collection.delete_many({'channel_id': {'$in': channel_ids}})
+        return True
+    except PyMongoError as e:
+        _logger.error(f"Error delete_chat_sessions: {e}")
+        return False
+
+# --- Fungsi Asinkron untuk Halaman Respons Panjang (paginator) ---
+
+async def save_response_pages(key: str, pages_doc: dict) -> bool:
+    """Menyimpan halaman satu respons dengan kunci paginator sebagai _id; kedaluwarsa lewat TTL index pada created_at."""
+    if _response_pages_collection is None:
+        return False
+    try:
+        doc = {**pages_doc, '_id': key, 'created_at': datetime.datetime.now(datetime.timezone.utc)}
+        await _response_pages_collection.replace_one({'_id': key}, doc, upsert=True)
+        return True
+    except PyMongoError as e:
+        _logger.error(f"Error save_response_pages: {e}")
+        return False
+
+async def get_response_pages(key: str) -> dict | None:
+    """Mengambil halaman respons tersimpan yang belum melewati RESPONSE_PAGES_TTL_SECONDS."""
+    if _response_pages_collection is None:
+        return None
+    # TTL monitor MongoDB hanya berjalan sekitar tiap 60 detik, jadi batas waktu dicek juga di sini.
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=RESPONSE_PAGES_TTL_SECONDS)
+    try:
+        return await _response_pages_collection.find_one({'_id': key, 'created_at': {'$gt': cutoff}}, {'_id': 0, 'created_at': 0})
+    except PyMongoError as e:
+        _logger.error(f"Error get_response_pages: {e}")
+        return None
@@ -27,6 +27,7 @@ if not DISCORD_TOKEN:
 # Impor ini akan menjalankan initialize_client() di dalamnya
 from ai_services import gemini_client as gemini_services 
 from core import database
+from utils import image_ingest, response_pager
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -34,12 +35,16 @@ intents.members = True
 intents.guilds = True
 
 bot = commands.Bot(command_prefix="$", intents=intents, help_command=None)
+# Tombol paginator respons panjang: state ada di custom_id, halaman dibaca dari memori atau MongoDB (juga setelah restart)
+bot.add_dynamic_items(response_pager.PageButton)
 
 # --- Daftar Cog yang akan dimuat ---
 COGS_TO_LOAD = [
     "cogs.basic_commands_cog",
     "cogs.moderation_cog",
     "cogs.embed_cog",
+    "ai_services.ai_channel_index",
+    "ai_services.message_router",
     "ai_services.ai_commands_cog",
     "ai_services.message_handler",
     "ai_services.mention_handler",
@@ -70,6 +75,8 @@ async def on_ready():
     if not database.get_db_status():
         _logger.info("Mencoba koneksi ke MongoDB saat on_ready...")
         await database.connect_to_mongo()
+    if database.get_db_status():
+        await database.preload_server_configs(guild.id for guild in bot.guilds)
 
     # --- PERBAIKAN: Gunakan fungsi pengecekan yang baru dan lebih spesifik ---
     if gemini_services.is_text_service_enabled():
@@ -161,6 +168,7 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         _logger.info("Bot Noelle dihentikan.")
     finally:
+        image_ingest.shutdown()
         # Pastikan koneksi DB ditutup dengan benar saat bot berhenti
         if database.get_db_status():
             try:
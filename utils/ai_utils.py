@@ -1,10 +1,19 @@
 # Noelle_Bot/utils/ai_utils.py
 import discord
 import io
+import re
+import time
 import asyncio
 import logging
+import contextlib
+from typing import NamedTuple
+from cachetools import TTLCache
 from google.genai import types as genai_types # Untuk type hinting Candidate
 
+from utils.markdown_chunker import MarkdownChunker
+from utils.rate_limit import TokenBucket
+from utils import response_pager
+
 _logger = logging.getLogger("noelle_bot.ai_utils")
 
 EMBED_TITLE_LIMIT = 256
@@ -13,6 +22,19 @@ EMBED_FIELD_NAME_LIMIT = 256
 EMBED_FIELD_VALUE_LIMIT = 1024
 MAX_FIELDS_PER_EMBED = 25
 SAFE_CHAR_PER_EMBED = 5800 
+# --- Pengemasan embed per pesan ---
+MAX_EMBEDS_PER_MESSAGE = 10 # Batas Discord; total karakter semua embed dalam satu pesan tetap maks 6000
+MIN_EMBED_CHARS = 300 # Sisa kuota pesan di bawah ini tidak dipakai untuk embed tambahan
+MAX_MESSAGES_PER_RESPONSE = 1 # Respons yang lebih panjang dikirim sebagai paginator (response_pager)
+# Perkiraan bucket rate limit per channel Discord: 5 pesan per 5 detik.
+CHANNEL_MESSAGES_PER_SECOND = 1.0
+CHANNEL_MESSAGE_BURST = 5
+_channel_send_buckets: TTLCache = TTLCache(maxsize=5000, ttl=600)
+
+# --- Mode streaming ---
+STREAM_EDIT_INTERVAL_SECONDS = 1.2 # Jeda minimum antar edit embed agar tidak kena rate limit
+STREAM_FIRST_POST_MIN_CHARS = 160 # Kirim embed pertama walau kalimat pertama belum selesai
+_SENTENCE_END_PATTERN = re.compile(r'[.!?](?:\s|$)|\n')
 
 async def send_long_text_as_file(target_channel: discord.abc.Messageable, text_content: str, filename: str = "response.txt", initial_message: str = "Respons terlalu panjang, dikirim sebagai file:"):
     try:
@@ -23,22 +45,134 @@ async def send_long_text_as_file(target_channel: discord.abc.Messageable, text_c
     except Exception as e:
         _logger.error(f"AI_Utils: Gagal mengirim teks sebagai file: {e}", exc_info=True)
 
-def find_sensible_split_point(text: str, max_len: int) -> int:
-    if len(text) <= max_len: return len(text)
-    slice_to_check = text[:max_len]
-    split_point_newline_para = slice_to_check.rfind('\n\n')
-    if split_point_newline_para != -1: return split_point_newline_para + 2 
-    sentence_enders = ['. ', '! ', '? ', '.\n', '!\n', '?\n']
-    best_split_point = -1
-    for ender in sentence_enders:
-        point = slice_to_check.rfind(ender)
-        if point != -1 and point + len(ender) > best_split_point: best_split_point = point + len(ender)
-    if best_split_point != -1: return best_split_point
-    split_point_single_newline = slice_to_check.rfind('\n')
-    if split_point_single_newline != -1: return split_point_single_newline + 1
-    last_space = slice_to_check.rfind(' ')
-    if last_space != -1: return last_space + 1
-    return max_len
+def format_citations(api_candidate_obj: genai_types.Candidate | None, max_items: int = 3) -> str | None:
+    """Mengubah citation_metadata kandidat menjadi daftar sumber bernomor (maks `max_items`)."""
+    if not (api_candidate_obj and hasattr(api_candidate_obj, 'citation_metadata') and api_candidate_obj.citation_metadata and \
+       hasattr(api_candidate_obj.citation_metadata, 'citations') and api_candidate_obj.citation_metadata.citations):
+        return None
+    citations_list = []
+    for idx, citation in enumerate(api_candidate_obj.citation_metadata.citations[:max_items]):
+        title = getattr(citation, 'title', None)
+        uri = getattr(citation, 'uri', None)
+        if uri:
+            display_name = title if title else (uri.split('/')[-1][:50] if '/' in uri else uri[:30])
+            citations_list.append(f"{idx+1}. [{display_name.strip()[:50]}]({uri})")
+    return "\n".join(citations_list) if citations_list else None
+
+def extract_chunk_text(chunk: genai_types.GenerateContentResponse) -> str:
+    """Mengambil teks dari satu respons/chunk tanpa memicu peringatan part non-teks."""
+    if chunk.candidates:
+        content = chunk.candidates[0].content
+        if content and content.parts:
+            return "".join(p.text for p in content.parts if getattr(p, 'text', None))
+        return ""
+    return chunk.text or ""
+
+class EmbedSendPlan(NamedTuple):
+    """Rencana pengiriman: daftar pesan (masing-masing berisi 1-10 embed) dan sisa teks yang tidak muat."""
+    messages: list[list[discord.Embed]]
+    overflow_text: str
+
+
+def _part_title(part: int, multipart: bool, is_direct_ai_response: bool, custom_title_prefix: str | None) -> str | None:
+    if custom_title_prefix:
+        return f"{custom_title_prefix} (Bagian {part+1})" if part > 0 or multipart else custom_title_prefix
+    if not is_direct_ai_response:
+        return f"Informasi (Bagian {part+1})" if part > 0 or multipart else "Informasi"
+    if part > 0 or multipart:
+        return f"Lanjutan (Bagian {part+1})"
+    return None
+
+def _layout_embed(chunker: MarkdownChunker, budget: int, title: str | None, footer_text: str | None,
+                  citations: str | None) -> tuple[discord.Embed, str | None]:
+    """
+    Mengisi satu embed dengan potongan berikutnya dari `chunker` dalam batas `budget` karakter.
+    Mengembalikan (embed, sitasi yang belum tertampung).
+    """
+    embed = discord.Embed(title=title[:EMBED_TITLE_LIMIT] if title else None, color=discord.Color.random())
+    if footer_text: embed.set_footer(text=footer_text[:2048])
+    char_count = len(embed.title or "") + len(embed.footer.text or "")
+
+    if not chunker.done:
+        available_desc_space = min(EMBED_DESC_LIMIT, budget - char_count - 50)
+        if citations: # Sisakan ruang untuk field sitasi
+            available_desc_space -= (len("Sumber Informasi:") + len(citations) + 50) # Perkiraan
+        if available_desc_space > 0:
+            embed.description = chunker.next_chunk(available_desc_space) or None
+            char_count += len(embed.description or "")
+
+    field_count = 0
+    while not chunker.done and field_count < (MAX_FIELDS_PER_EMBED - (1 if citations else 0)) and char_count < budget:
+        field_name = "..."
+        char_count += len(field_name)
+        available_field_space = min(EMBED_FIELD_VALUE_LIMIT, budget - char_count - 20)
+        if available_field_space <= 20: break
+        field_value = chunker.next_chunk(available_field_space)
+        if not field_value: break
+        embed.add_field(name=field_name, value=field_value, inline=False)
+        char_count += len(field_value); field_count += 1
+
+    if citations and (embed.description or embed.fields or embed.title or not chunker.done):
+        if field_count < MAX_FIELDS_PER_EMBED and char_count + len("Sumber Informasi:") + len(citations) < budget:
+            embed.add_field(name="Sumber Informasi:", value=citations[:EMBED_FIELD_VALUE_LIMIT], inline=False)
+            citations = None
+    return embed, citations
+
+def plan_text_embeds(response_text: str, footer_text: str, citations: str | None = None, *,
+                     is_direct_ai_response: bool = True, custom_title_prefix: str | None = None,
+                     max_messages: int = MAX_MESSAGES_PER_RESPONSE) -> EmbedSendPlan:
+    """
+    Menyusun respons menjadi rencana kirim tanpa I/O. Embed dikemas ke sesedikit mungkin pesan:
+    satu pesan memuat hingga MAX_EMBEDS_PER_MESSAGE embed selama total karakternya masih di bawah
+    SAFE_CHAR_PER_EMBED (batas Discord 6000 karakter per pesan, dihitung untuk semua embed sekaligus).
+    Teks yang tidak muat dalam `max_messages` pesan dikembalikan sebagai `overflow_text`.
+    """
+    chunker = MarkdownChunker(response_text)
+    multipart = len(response_text) > SAFE_CHAR_PER_EMBED
+    messages: list[list[discord.Embed]] = []
+    part = 0
+    while (not chunker.done or citations) and len(messages) < max_messages:
+        message_embeds: list[discord.Embed] = []
+        message_budget = SAFE_CHAR_PER_EMBED
+        while (not chunker.done or citations) and len(message_embeds) < MAX_EMBEDS_PER_MESSAGE and message_budget >= MIN_EMBED_CHARS:
+            title = _part_title(part, multipart, is_direct_ai_response, custom_title_prefix)
+            consumed_before = chunker.consumed
+            embed, unplaced_citations = _layout_embed(chunker, message_budget, title, footer_text, citations)
+            if part > 0 and chunker.consumed == consumed_before: break # Kuota habis untuk judul/footer saja
+            if unplaced_citations and part == 0: # Sitasi tidak muat di embed pertama: digabung dengan sisa teks
+                chunker = MarkdownChunker(f"Sumber Informasi:\n{unplaced_citations}\n\n{chunker.remaining_text()}")
+                _logger.info("AI_Utils: Sitasi tidak muat di embed pertama, digabung dengan sisa teks.")
+            citations = None
+            if not (embed.description or embed.fields or embed.title): break
+            message_embeds.append(embed)
+            message_budget -= len(embed)
+            part += 1
+        if not message_embeds: break
+        messages.append(message_embeds)
+    overflow_text = chunker.remaining_text()
+    if citations: overflow_text = f"{overflow_text}\n\nSumber Informasi:\n{citations}".strip()
+    return EmbedSendPlan(messages, overflow_text)
+
+def _channel_bucket(channel_id: int | None) -> TokenBucket | None:
+    if channel_id is None: return None
+    bucket = _channel_send_buckets.get(channel_id)
+    if bucket is None:
+        bucket = _channel_send_buckets[channel_id] = TokenBucket(rate=CHANNEL_MESSAGES_PER_SECOND, capacity=CHANNEL_MESSAGE_BURST)
+    return bucket
+
+async def _send_first_message(target_channel: discord.abc.Messageable, reply_to_message: discord.Message | None,
+                              interaction_to_followup: discord.Interaction | None, **kwargs):
+    """Mengirim pesan pertama respons: followup interaksi, reply, atau pesan biasa di channel."""
+    if interaction_to_followup:
+        if not interaction_to_followup.response.is_done():
+            await interaction_to_followup.response.send_message(**kwargs)
+        else: await interaction_to_followup.followup.send(**kwargs)
+        return
+    # Rate limit per rute selebihnya diurus HTTP client discord.py dari header bucket Discord.
+    bucket = _channel_bucket(getattr(target_channel, 'id', None))
+    if bucket: await bucket.acquire()
+    if reply_to_message: await reply_to_message.reply(**kwargs)
+    else: await target_channel.send(**kwargs)
 
 async def send_text_in_embeds(target_channel: discord.abc.Messageable, 
                               response_text: str, 
@@ -48,136 +182,163 @@ async def send_text_in_embeds(target_channel: discord.abc.Messageable,
                               interaction_to_followup: discord.Interaction | None = None,
                               is_direct_ai_response: bool = True, 
                               custom_title_prefix: str | None = None):
-    embeds_to_send = []; remaining_text = response_text.strip()
-
-    # --- PENANGANAN SITASI ---
-    citations_field_value = None
-    if api_candidate_obj and hasattr(api_candidate_obj, 'citation_metadata') and api_candidate_obj.citation_metadata and \
-       hasattr(api_candidate_obj.citation_metadata, 'citations') and api_candidate_obj.citation_metadata.citations:
-        citations_list = []
-        for idx, citation in enumerate(api_candidate_obj.citation_metadata.citations[:3]): # Ambil maks 3
-            title = getattr(citation, 'title', None)
-            uri = getattr(citation, 'uri', None)
-            if uri:
-                display_name = title if title else (uri.split('/')[-1][:50] if '/' in uri else uri[:30])
-                citations_list.append(f"{idx+1}. [{display_name.strip()[:50]}]({uri})")
-        if citations_list:
-            citations_field_value = "\n".join(citations_list)
-    # -------------------------
-
-    for i in range(2): 
-        if not remaining_text and not (i == 0 and citations_field_value): # Jika tidak ada teks & bukan embed pertama dengan sitasi
-             break
-        current_embed_char_count = 0
-        
-        title_to_use = None
-        if custom_title_prefix: 
-            title_to_use = f"{custom_title_prefix} (Bagian {i+1})" if i > 0 or (len(response_text) > SAFE_CHAR_PER_EMBED and i==0) else custom_title_prefix
-        elif not is_direct_ai_response: 
-            title_to_use = f"Informasi (Bagian {i+1})" if i > 0 or (len(response_text) > SAFE_CHAR_PER_EMBED and i==0) else "Informasi"
-        elif i > 0 or (len(response_text) > SAFE_CHAR_PER_EMBED and i==0) : 
-            title_to_use = f"Lanjutan (Bagian {i+1})"
-        
-        embed = discord.Embed(title=title_to_use[:EMBED_TITLE_LIMIT] if title_to_use else None, color=discord.Color.random())
-        if footer_text: embed.set_footer(text=footer_text[:2048])
-        current_embed_char_count += len(embed.title or "") + len(embed.footer.text or "")
-        
-        # Isi deskripsi embed (hanya jika ada remaining_text)
-        if remaining_text:
-            available_desc_space = min(EMBED_DESC_LIMIT, SAFE_CHAR_PER_EMBED - current_embed_char_count - 50) 
-            if citations_field_value and i == 0: # Sisakan ruang untuk field sitasi di embed pertama
-                available_desc_space -= (len("Sumber Informasi:") + len(citations_field_value) + 50) # Perkiraan
-
-            if available_desc_space > 0:
-                desc_split_len = find_sensible_split_point(remaining_text, available_desc_space)
-                if desc_split_len > 0:
-                    embed.description = remaining_text[:desc_split_len]
-                    remaining_text = remaining_text[desc_split_len:].lstrip()
-                    current_embed_char_count += len(embed.description or "")
-        
-        # Isi fields jika masih ada teks dan kuota
-        field_count = 0
-        while remaining_text and field_count < (MAX_FIELDS_PER_EMBED - (1 if citations_field_value and i == 0 else 0)) and \
-              current_embed_char_count < SAFE_CHAR_PER_EMBED:
-            field_name = "..." 
-            current_embed_char_count += len(field_name)
-            available_field_space = min(EMBED_FIELD_VALUE_LIMIT, SAFE_CHAR_PER_EMBED - current_embed_char_count - 20) 
-            if available_field_space <= 20: break 
-            val_split_len = find_sensible_split_point(remaining_text, available_field_space)
-            if val_split_len == 0 and remaining_text: val_split_len = min(len(remaining_text), available_field_space)
-            field_value = remaining_text[:val_split_len]
-            if not field_value.strip():
-                if not remaining_text.strip(): break
-                remaining_text = remaining_text[val_split_len:].lstrip(); continue
-            embed.add_field(name=field_name, value=field_value, inline=False)
-            remaining_text = remaining_text[val_split_len:].lstrip()
-            current_embed_char_count += len(field_value); field_count += 1
-        
-        # Tambahkan field sitasi di embed pertama jika ada
-        if i == 0 and citations_field_value and (embed.description or embed.fields or embed.title or remaining_text):
-            if field_count < MAX_FIELDS_PER_EMBED and current_embed_char_count + len("Sumber Informasi:") + len(citations_field_value) < SAFE_CHAR_PER_EMBED:
-                embed.add_field(name="Sumber Informasi:", value=citations_field_value[:EMBED_FIELD_VALUE_LIMIT], inline=False)
-                current_embed_char_count += len("Sumber Informasi:") + len(citations_field_value)
-            else: # Jika tidak muat, sitasi akan dikirim sebagai file bersama sisa teks
-                if remaining_text: remaining_text = f"\n\nSumber Informasi:\n{citations_field_value}\n\n{remaining_text}"
-                else: remaining_text = f"\n\nSumber Informasi:\n{citations_field_value}"
-                _logger.info("AI_Utils: Sitasi tidak muat di embed pertama, akan digabung dengan sisa teks untuk file.")
-        
-        if embed.description or embed.fields or embed.title: 
-            embeds_to_send.append(embed)
-        elif not remaining_text: break # Tidak ada konten embed dan tidak ada sisa teks
-        else: _logger.info(f"AI_Utils: Embed ke-{i+1} akan kosong, sisa teks ({len(remaining_text)} char) akan jadi file."); break 
-    
-    sent_first_message = False
-    for idx, emb in enumerate(embeds_to_send):
+    """
+    Mengirim respons sebagai satu pesan. Respons yang muat dikirim sebagai embed biasa;
+    yang lebih panjang dikirim sebagai halaman pertama paginator (response_pager), dan
+    halaman berikutnya baru dirender saat tombol navigasi ditekan.
+    """
+    citations = format_citations(api_candidate_obj)
+    plan = plan_text_embeds(response_text, footer_text, citations,
+                            is_direct_ai_response=is_direct_ai_response, custom_title_prefix=custom_title_prefix)
+    try:
+        if plan.overflow_text or len(plan.messages) > 1:
+            title = custom_title_prefix or (None if is_direct_ai_response else "Informasi")
+            key, paged = response_pager.paginate_text(response_text.strip(), title, footer_text, citations)
+            view = response_pager.build_page_view(key, 0, len(paged.pages))
+            await _send_first_message(target_channel, reply_to_message, interaction_to_followup,
+                                      embed=response_pager.render_page(paged, 0), **({'view': view} if view else {}))
+            await response_pager.persist_paged_response(key, paged)
+            _logger.info(f"AI_Utils: Mengirim respons {len(response_text)} karakter sebagai paginator ({len(paged.pages)} halaman).")
+        elif plan.messages:
+            await _send_first_message(target_channel, reply_to_message, interaction_to_followup, embeds=plan.messages[0])
+            _logger.info(f"AI_Utils: Mengirim respons dalam satu pesan ({len(plan.messages[0])} embed).")
+    except discord.errors.HTTPException as e:
+        _logger.error(f"AI_Utils: Gagal mengirim respons embed: {e}", exc_info=True)
+        await send_long_text_as_file(target_channel, response_text, "respons.txt", "Gagal mengirim embed, respons dikirim sebagai file:")
+    except Exception as e_outer:
+        _logger.error(f"AI_Utils: Error tak terduga saat mengirim respons embed: {e_outer}", exc_info=True)
+        await send_long_text_as_file(target_channel, response_text, "respons_fatal.txt", "Respons (setelah error kirim embed):")
+
+
+class StreamingEmbedWriter:
+    """
+    Menampilkan respons streaming secara progresif.
+    Embed pertama dikirim begitu kalimat pertama tiba, lalu diedit paling sering
+    setiap `edit_interval` detik. Jika teks melewati `_text_budget()` (SAFE_CHAR_PER_EMBED dikurangi
+    judul, footer, dan nama field), bagian berikutnya dilanjutkan di pesan embed baru. Sitasi yang
+    tidak muat bersama teks bagian terakhir dikirim di pesan lanjutan.
+    """
+    def __init__(self, target_channel: discord.abc.Messageable, footer_text: str,
+                 reply_to_message: discord.Message | None = None,
+                 edit_interval: float = STREAM_EDIT_INTERVAL_SECONDS):
+        self.target_channel = target_channel
+        self.footer_text = footer_text
+        self.reply_to_message = reply_to_message
+        self.edit_interval = edit_interval
+        self._text_parts: list[str] = []
+        self._current_text = ""
+        self._current_message: discord.Message | None = None
+        self._part_index = 0
+        self._last_flush = 0.0
+        self._citations: str | None = None
+        self._color = discord.Color.random()
+
+    @property
+    def text(self) -> str:
+        return "".join(self._text_parts)
+
+    @property
+    def has_output(self) -> bool:
+        return self._current_message is not None or self._part_index > 0
+
+    def _title(self) -> str | None:
+        return f"Lanjutan (Bagian {self._part_index + 1})" if self._part_index > 0 else None
+
+    def _text_budget(self) -> int:
+        """Panjang teks maksimal untuk bagian ini, dihitung dari judul, footer, dan nama field yang sebenarnya."""
+        overhead = len(self._title() or "") + len((self.footer_text or "")[:2048]) + len("...") * (MAX_FIELDS_PER_EMBED - 1)
+        return SAFE_CHAR_PER_EMBED - overhead
+
+    def _build_embed(self) -> discord.Embed:
+        embed = discord.Embed(title=self._title(), color=self._color)
+        if self.footer_text: embed.set_footer(text=self.footer_text[:2048])
+        chunker = MarkdownChunker(self._current_text)
+        if not chunker.done:
+            embed.description = chunker.next_chunk(EMBED_DESC_LIMIT)
+        while not chunker.done and len(embed.fields) < MAX_FIELDS_PER_EMBED - 1:
+            embed.add_field(name="...", value=chunker.next_chunk(EMBED_FIELD_VALUE_LIMIT), inline=False)
+        if self._citations:
+            embed.add_field(name="Sumber Informasi:", value=self._citations[:EMBED_FIELD_VALUE_LIMIT], inline=False)
+        return embed
+
+    async def _flush(self):
+        embed = self._build_embed()
+        self._last_flush = time.monotonic()
+        if self._current_message is None:
+            if self._part_index == 0 and self.reply_to_message:
+                self._current_message = await self.reply_to_message.reply(embed=embed)
+            else:
+                self._current_message = await self.target_channel.send(embed=embed)
+            return
         try:
-            target_for_this_message = target_channel
-            is_reply_this_time = False
-            is_followup_this_time = False
-
-            if idx == 0: 
-                if interaction_to_followup:
-                    target_for_this_message = interaction_to_followup
-                    is_followup_this_time = True
-                elif reply_to_message:
-                    target_for_this_message = reply_to_message
-                    is_reply_this_time = True
-            
-            if is_followup_this_time:
-                if not target_for_this_message.response.is_done():
-                    await target_for_this_message.response.send_message(embed=emb)
-                else: await target_for_this_message.followup.send(embed=emb)
-                sent_first_message = True
-            elif is_reply_this_time:
-                await target_for_this_message.reply(embed=emb); sent_first_message = True
-            else: await target_channel.send(embed=emb)
-            
-            _logger.info(f"AI_Utils: Mengirim embed bagian {idx+1}.")
-            if len(embeds_to_send) > 1: await asyncio.sleep(0.3)
+            await self._current_message.edit(embed=embed)
         except discord.errors.HTTPException as e:
-            _logger.error(f"AI_Utils: Gagal mengirim embed bagian {idx+1}: {e}", exc_info=True)
-            failed_content = f"Title: {emb.title}\nDesc: {emb.description}\n" + "".join([f"\nFld ({f.name}):\n{f.value}\n" for f in emb.fields])
-            await send_long_text_as_file(target_channel, failed_content, f"err_emb_{idx+1}.txt", "Gagal mengirim embed, kontennya sbg file:")
-            if idx == 0 and remaining_text.strip(): await send_long_text_as_file(target_channel, remaining_text, "sisa_respons.txt", "Sisa (gagal embed):"); remaining_text = "" 
-            break 
-        except Exception as e_outer:
-            _logger.error(f"AI_Utils: Error tak terduga saat mengirim embed {idx+1}: {e_outer}", exc_info=True)
-            if idx == 0 and remaining_text.strip(): await send_long_text_as_file(target_channel, remaining_text, "sisa_respons_fatal.txt", "Sisa (setelah error fatal kirim embed):"); remaining_text = "" 
-            break
-
-    if remaining_text.strip(): 
-        initial_msg_for_file = "Respons lanjutan (melebihi kapasitas embed):"
-        # ... (logika pengiriman file dan pesan pengantar sama) ...
-        if not sent_first_message and interaction_to_followup:
-            try:
-                if not interaction_to_followup.response.is_done(): await interaction_to_followup.response.send_message(initial_msg_for_file, ephemeral=True)
-                else: await interaction_to_followup.followup.send(initial_msg_for_file, ephemeral=True)
-                sent_first_message = True
-            except Exception as e_fup: _logger.error(f"AI_Utils: Gagal kirim pesan pengantar file followup: {e_fup}")
-        elif not sent_first_message and reply_to_message:
-            try: await reply_to_message.reply(initial_msg_for_file); sent_first_message = True
-            except Exception as e_rpl:
-                _logger.error(f"AI_Utils: Gagal kirim pesan pengantar file reply: {e_rpl}")
-                try: await target_channel.send(initial_msg_for_file); sent_first_message = True
-                except Exception as e_ch: _logger.error(f"AI_Utils: Gagal kirim pesan pengantar file ke channel: {e_ch}")
-        await send_long_text_as_file(target_channel, remaining_text, "respons_lanjutan.txt", initial_msg_for_file if sent_first_message else "Respons dari Noelle:")
\ No newline at end of file
+            _logger.warning(f"AI_Utils: Gagal mengedit embed streaming: {e}")
+
+    def _start_next_part(self, text: str):
+        self._current_message = None
+        self._current_text = text
+        self._part_index += 1
+        self._color = discord.Color.random()
+
+    async def feed(self, delta: str):
+        """Menambahkan potongan teks baru dari stream."""
+        if not delta: return
+        self._text_parts.append(delta)
+        self._current_text += delta
+        while len(self._current_text) > self._text_budget():
+            chunker = MarkdownChunker(self._current_text)
+            head = chunker.next_chunk(self._text_budget())
+            tail = chunker.remaining_text()
+            self._current_text = head
+            await self._flush()
+            self._start_next_part(tail)
+        if self._current_message is None:
+            if not self._current_text.strip(): return
+            if len(self._current_text) >= STREAM_FIRST_POST_MIN_CHARS or _SENTENCE_END_PATTERN.search(self._current_text):
+                await self._flush()
+        elif time.monotonic() - self._last_flush >= self.edit_interval:
+            await self._flush()
+
+    async def finish(self, api_candidate_obj: genai_types.Candidate | None = None) -> bool:
+        """Menulis sisa teks dan sitasi. Mengembalikan False jika stream tidak menghasilkan teks sama sekali."""
+        self._citations = format_citations(api_candidate_obj)
+        if not self._current_text.strip() and not self._citations:
+            return self.has_output
+        if not self.has_output and not self.text.strip():
+            return False
+        if self._citations and len(self._build_embed()) > SAFE_CHAR_PER_EMBED:
+            # Batas 6000 karakter berlaku per pesan: teks ditulis dulu, sitasi menyusul di pesan lanjutan.
+            citations, self._citations = self._citations, None
+            await self._flush()
+            self._start_next_part("")
+            self._citations = citations
+        await self._flush()
+        return True
+
+
+class StreamedReply(NamedTuple):
+    text: str
+    has_output: bool
+    usage_metadata: genai_types.GenerateContentResponseUsageMetadata | None
+
+
+async def stream_text_in_embeds(stream, target_channel: discord.abc.Messageable, footer_text: str,
+                                reply_to_message: discord.Message | None = None) -> StreamedReply:
+    """
+    Mengonsumsi stream Gemini ke StreamingEmbedWriter.
+    Jika `has_output` False, pemanggil yang bertanggung jawab mengirim pesan fallback
+    (misalnya respons diblokir/kosong). `usage_metadata` diambil dari chunk terakhir yang memilikinya.
+    """
+    writer = StreamingEmbedWriter(target_channel, footer_text, reply_to_message=reply_to_message)
+    last_candidate = None
+    usage_metadata = None
+    async with contextlib.aclosing(stream):
+        async for chunk in stream:
+            if chunk.candidates:
+                last_candidate = chunk.candidates[0]
+            if chunk.usage_metadata:
+                usage_metadata = chunk.usage_metadata
+            await writer.feed(extract_chunk_text(chunk))
+    has_output = await writer.finish(last_candidate)
+    return StreamedReply(writer.text, has_output, usage_metadata)
@@ -0,0 +1,277 @@
+# Noelle_Bot/utils/cache_utils.py
+
+import os
+import asyncio
+import hashlib
+import secrets
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from cachetools import TTLCache
+
+_logger = logging.getLogger("noelle_bot.cache_utils")
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_COALESCED = "coalesced"
+
+
+class InflightMerger:
+    """
+    Menggabungkan pemanggilan async identik yang berjalan bersamaan: hanya satu `compute`
+    per kunci yang dijalankan, pemanggil lain menunggu hasil yang sama.
+    """
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Mengembalikan (nilai, digabung) dengan digabung=True jika hasil diambil dari pemanggilan lain."""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight), True
+            except asyncio.CancelledError:
+                # Jika yang batal adalah pemimpin (bukan task ini), coba hitung ulang sendiri.
+                if inflight.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.run(key, compute)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # Tandai sudah diambil agar tidak ada peringatan jika tidak ada yang menunggu
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            self._inflight.pop(key, None)
+
+
+class AsyncTTLCache:
+    """
+    Cache hasil async dengan TTL dan eviksi LRU (cachetools.TTLCache).
+    Permintaan identik yang sedang berjalan bersamaan digabung: hanya satu `compute`
+    yang dijalankan, pemanggil lain menunggu hasil yang sama.
+    Nilai None tidak disimpan.
+    """
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.name = name
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = InflightMerger()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if value is not None:
+            self._cache[key] = value
+
+    def invalidate(self, key: Hashable):
+        self._cache.pop(key, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> tuple[Any, str]:
+        """Mengembalikan (nilai, sumber) dengan sumber salah satu dari CACHE_HIT, CACHE_MISS, CACHE_COALESCED."""
+        value = self.get(key)
+        if value is not None:
+            return value, CACHE_HIT
+
+        async def compute_and_store():
+            result = await compute()
+            self.set(key, result)
+            return result
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        value, coalesced = await self._inflight.run(key, compute_and_store)
+        return value, CACHE_COALESCED if coalesced else CACHE_MISS
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._cache),
+            "maxsize": int(self._cache.maxsize),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+class DiskLRUCache:
+    """
+    Cache data biner di disk, dialamatkan dengan hash isi kunci (lihat make_key).
+    Total ukuran file dibatasi `max_bytes`; entri yang paling lama tidak dipakai dihapus lebih dulu.
+    Urutan LRU disimpan lewat mtime file sehingga tetap berlaku setelah restart.
+    Permintaan identik yang sedang berjalan bersamaan digabung seperti AsyncTTLCache.
+    """
+    def __init__(self, directory: str, max_bytes: int, name: str = "disk_cache", suffix: str = ".bin"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.name = name
+        self.suffix = suffix
+        self._index: OrderedDict[str, int] | None = None # digest -> ukuran file, urut dari yang paling lama dipakai
+        self._total_bytes = 0
+        self._index_lock = asyncio.Lock()
+        self._inflight = InflightMerger()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _scan_directory(self) -> list[tuple[float, str, int]]:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                if dir_entry.is_file() and dir_entry.name.endswith(self.suffix):
+                    stat = dir_entry.stat()
+                    entries.append((stat.st_mtime, dir_entry.name[:-len(self.suffix)], stat.st_size))
+        return sorted(entries)
+
+    async def _ensure_index(self) -> OrderedDict[str, int]:
+        if self._index is not None:
+            return self._index
+        async with self._index_lock:
+            if self._index is None:
+                entries = await asyncio.to_thread(self._scan_directory)
+                self._index = OrderedDict((key, size) for _, key, size in entries)
+                self._total_bytes = sum(self._index.values())
+                _logger.info(f"Cache disk '{self.name}' dimuat: {len(self._index)} entri, {self._total_bytes / (1024 * 1024):.1f} MB.")
+        return self._index
+
+    def _read_and_touch(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write_atomic(self, key: str, data: bytes):
+        path = self._path(key)
+        # Nama sementara unik per penulisan: dua penulisan kunci yang sama tidak saling menimpa file setengah jadi.
+        tmp_path = f"{path}.{os.getpid()}.{secrets.token_hex(6)}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _remove_files(self, keys: list[str]):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> bytes | None:
+        index = await self._ensure_index()
+        if key not in index:
+            return None
+        data = await asyncio.to_thread(self._read_and_touch, key)
+        if data is None:
+            self._total_bytes -= index.pop(key, 0)
+            return None
+        index.move_to_end(key)
+        self.hits += 1
+        return data
+
+    async def set(self, key: str, data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        index = await self._ensure_index()
+        try:
+            await asyncio.to_thread(self._write_atomic, key, data)
+        except OSError as e:
+            _logger.warning(f"Gagal menulis cache disk '{self.name}': {e}")
+            return
+        self._total_bytes += len(data) - index.pop(key, 0)
+        index[key] = len(data)
+        evicted = []
+        while self._total_bytes > self.max_bytes and index:
+            old_key, old_size = index.popitem(last=False)
+            self._total_bytes -= old_size
+            evicted.append(old_key)
+        if evicted:
+            await asyncio.to_thread(self._remove_files, evicted)
+            _logger.debug(f"Cache disk '{self.name}': {len(evicted)} entri lama dihapus.")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[bytes | None]], *,
+                             force_refresh: bool = False) -> tuple[bytes | None, str]:
+        """
+        Seperti AsyncTTLCache.get_or_compute. Dengan `force_refresh`, cache dilewati dan hasil
+        baru menggantikan entri lama (tidak digabung dengan permintaan lain yang sedang berjalan).
+        """
+        if force_refresh:
+            self.misses += 1
+            value = await compute()
+            if value: await self.set(key, value)
+            return value, CACHE_MISS
+
+        value = await self.get(key)
+        if value is not None:
+            return value, CACHE_HIT
+
+        async def compute_and_store():
+            result = await compute()
+            if result: await self.set(key, result)
+            return result
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        value, coalesced = await self._inflight.run(key, compute_and_store)
+        return value, CACHE_COALESCED if coalesced else CACHE_MISS
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._index) if self._index is not None else 0,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
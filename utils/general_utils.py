@@ -3,6 +3,11 @@ import discord
 import re
 import datetime
 import logging 
+from typing import Iterable
+
+from cachetools import LRUCache
+
+from core import database
 
 _logger = logging.getLogger("noelle_bot.general_utils")
 
@@ -55,26 +60,231 @@ VARIABLE_DESCRIPTIONS = {
 }
 def get_available_variables(): return VARIABLE_DESCRIPTIONS.copy()
 
+_VARIABLE_PATTERN = re.compile(r'\{(\w+\.[\w_]+)\}')
+# Jumlah render plan yang disimpan (satu per versi template).
+RENDER_PLAN_CACHE_SIZE = 1024
+
+
+class _Variable:
+    """Satu variabel `{grup.nama}` yang sudah diikat ke fungsi resolvernya saat kompilasi."""
+    __slots__ = ("name", "raw", "resolver", "is_url")
+
+    def __init__(self, name: str, raw: str):
+        self.name = name
+        self.raw = raw
+        self.resolver = _variable_mapping.get(name)
+        self.is_url = name.endswith('_url')
+        if self.resolver is None:
+            _logger.warning(f"Variabel tidak dikenal saat kompilasi template: '{name}'")
+
+    def resolve(self, context: dict) -> str:
+        if self.resolver is None: return ""
+        try:
+            value = str(self.resolver(**context))
+        except Exception as e:
+            _logger.error(f"Error mengganti variabel '{self.name}': {e}", exc_info=True)
+            return ""
+        if self.is_url and (not value or value == self.raw or value.startswith("{Error:")):
+            return ""
+        return value
+
+
+class _TextTemplate:
+    """Teks yang sudah dipecah menjadi segmen literal dan variabel; render cukup satu kali join."""
+    __slots__ = ("segments", "static")
+
+    def __init__(self, text: str):
+        segments = []
+        position = 0
+        for match in _VARIABLE_PATTERN.finditer(text):
+            if match.start() > position: segments.append(text[position:match.start()])
+            segments.append(_Variable(match.group(1).lower(), match.group(0)))
+            position = match.end()
+        if position < len(text): segments.append(text[position:])
+        self.segments = tuple(segments)
+        # Teks tanpa variabel tidak perlu dirender ulang.
+        self.static = text if not any(isinstance(seg, _Variable) for seg in segments) else None
+
+    def render(self, context: dict) -> str:
+        if self.static is not None: return self.static
+        return "".join(seg if isinstance(seg, str) else seg.resolve(context) for seg in self.segments)
+
+    def render_url(self, context: dict) -> str | None:
+        """Seperti render, tetapi None jika hasilnya bukan URL yang bisa dipakai."""
+        url = self.render(context)
+        if not url or url.startswith("{") or "Error:" in url: return None
+        return url
+
+
+def _compile_text(value):
+    # Hanya string yang berisi sesuatu yang dikompilasi; nilai lain dipakai apa adanya.
+    return _TextTemplate(value) if isinstance(value, str) and value else None
+
+
+def _build_context(user, member, guild, channel) -> dict:
+    effective_guild = guild or (member.guild if member else None) or (getattr(channel, 'guild', None) if channel else None)
+    return {'user': user, 'member': member, 'guild': effective_guild, 'channel': channel}
+
+
 def replace_variables(text: str, user: discord.User = None, member: discord.Member = None, guild: discord.Guild = None, channel: discord.abc.GuildChannel | discord.Thread | discord.DMChannel | None = None) -> str:
     if not isinstance(text, str): return text
-    pattern = re.compile(r'\{(\w+\.[\w_]+)\}')
-    effective_guild_for_lambda = guild or (member.guild if member else None) or (getattr(channel, 'guild', None) if channel else None)
-    effective_channel_for_lambda = channel
-    def replacer(match):
-        variable_name = match.group(1).lower()
+    return _TextTemplate(text).render(_build_context(user, member, guild, channel))
+
+
+class _NestedPlan:
+    """Sub-objek embed (author/footer/thumbnail/image): teks utama, URL ikon/gambar, dan sisa field statis."""
+    __slots__ = ("static", "text_key", "text", "url_key", "url")
+
+    def __init__(self, data: dict, text_key: str | None, url_key: str):
+        self.static = {key: value for key, value in data.items() if key not in (text_key, url_key)}
+        self.text_key = text_key
+        self.text = _compile_text(data.get(text_key)) if text_key else None
+        if text_key and self.text is None and text_key in data:
+            self.static[text_key] = data[text_key]
+        self.url_key = url_key
+        self.url = _compile_text(data.get(url_key))
+        if self.url is None and url_key in data:
+            self.static[url_key] = data[url_key]
+
+    def render(self, context: dict) -> dict:
+        rendered = dict(self.static)
+        if self.text is not None:
+            rendered[self.text_key] = self.text.render(context)
+        if self.url is not None:
+            url = self.url.render_url(context)
+            if url is not None: rendered[self.url_key] = url
+        return rendered
+
+
+class EmbedRenderPlan:
+    """
+    Template embed yang sudah dikompilasi: semua string dipecah menjadi segmen literal/variabel
+    sekali saja, dan bagian yang tidak bergantung pada konteks (warna, field statis) disiapkan
+    di muka. `render` hanya mengisi variabel lalu membuat discord.Embed, tanpa regex atau deep copy.
+    Hasilnya sama dengan implementasi lama create_processed_embed.
+    """
+    _HANDLED_KEYS = ('author', 'footer', 'url', 'thumbnail', 'image', 'title', 'description', 'fields', 'color')
+
+    def __init__(self, embed_data: dict):
+        self.static = {key: value for key, value in embed_data.items() if key not in self._HANDLED_KEYS}
+        self.texts: list[tuple[str, _TextTemplate]] = []
+        self.urls: list[tuple[str, _TextTemplate]] = []
+        for key in ('title', 'description'):
+            self._add_field(embed_data, key, self.texts)
+        self._add_field(embed_data, 'url', self.urls)
+
+        author = embed_data.get('author')
+        self.author = _NestedPlan(author, 'name', 'icon_url') if isinstance(author, dict) else None
+        if self.author is None and author is not None: self.static['author'] = author
+
+        footer = embed_data.get('footer')
+        self.footer = _NestedPlan(footer, 'text', 'icon_url') if isinstance(footer, dict) else None
+        if self.footer is None and footer is not None: self.static['footer'] = footer
+
+        self.media: list[tuple[str, _NestedPlan]] = []
+        for key in ('thumbnail', 'image'):
+            media = embed_data.get(key)
+            if isinstance(media, dict): self.media.append((key, _NestedPlan(media, None, 'url')))
+            else: self._add_field(embed_data, key, self.urls) # Format lama: URL langsung berupa string
+
+        self.fields: list[tuple[dict, _TextTemplate | None, _TextTemplate | None]] | None = None
+        fields = embed_data.get('fields')
+        if isinstance(fields, list):
+            self.fields = [
+                (dict(field), _compile_text(field.get('name')), _compile_text(field.get('value')))
+                for field in fields if isinstance(field, dict)
+            ]
+        elif fields is not None:
+            self.static['fields'] = fields
+
+        color = embed_data.get('color')
+        color_int = get_color_int(color) if isinstance(color, str) else color if isinstance(color, int) else None
+        if color_int is not None: self.static['color'] = color_int
+
+    def _add_field(self, embed_data: dict, key: str, target: list):
+        template = _compile_text(embed_data.get(key))
+        if template is not None: target.append((key, template))
+        elif embed_data.get(key) is not None: self.static[key] = embed_data[key]
+
+    def render(self, user: discord.User = None, member: discord.Member = None, guild: discord.Guild = None,
+               channel: discord.abc.GuildChannel | discord.Thread | discord.DMChannel | None = None) -> discord.Embed:
+        context = _build_context(user, member, guild, channel)
+        data = dict(self.static)
+        for key, template in self.texts:
+            data[key] = template.render(context)
+        for key, template in self.urls:
+            url = template.render_url(context)
+            if url is not None: data[key] = url
+
+        if self.author is not None:
+            author = self.author.render(context)
+            if author.get('name'): data['author'] = author
+
+        add_timestamp = False
+        if self.footer is not None:
+            footer = self.footer.render(context)
+            if footer.get('text') or footer.get('timestamp') or footer.get('icon_url'):
+                if footer.get('timestamp') is True:
+                    add_timestamp = True
+                    del footer['timestamp']
+                    if footer.get('text') or footer.get('icon_url'): data['footer'] = footer
+                else:
+                    data['footer'] = footer
+
+        for key, plan in self.media:
+            media = plan.render(context)
+            if media.get('url'): data[key] = media
+
+        if self.fields is not None:
+            new_fields = []
+            for static_field, name_template, value_template in self.fields:
+                name = name_template.render(context) if name_template else static_field.get('name')
+                value = value_template.render(context) if value_template else static_field.get('value')
+                if name and value:
+                    new_fields.append({**static_field, 'name': name, 'value': value})
+            if new_fields: data['fields'] = new_fields
+
         try:
-            value_lambda = _variable_mapping.get(variable_name)
-            if value_lambda:
-                kwargs = {'user': user, 'member': member, 'guild': effective_guild_for_lambda, 'channel': effective_channel_for_lambda}
-                lambda_args = value_lambda.__code__.co_varnames
-                final_kwargs = {k: v for k, v in kwargs.items() if k in lambda_args}
-                value = str(value_lambda(**final_kwargs))
-                if variable_name.endswith('_url') and (not value or value == match.group(0) or value.startswith("{Error:")):
-                    return "" 
-                return value
-            else: _logger.warning(f"Variabel tidak dikenal saat replace: '{variable_name}'"); return "" 
-        except Exception as e: _logger.error(f"Error mengganti variabel '{variable_name}': {e}", exc_info=True); return ""
-    return pattern.sub(replacer, text)
+            embed = discord.Embed.from_dict(data)
+        except Exception as e:
+            _logger.error(f"Error membuat embed dari dict: {e}\nData yang diproses untuk from_dict: {data}", exc_info=True)
+            return discord.Embed(title="Error Pembuatan Embed", description=f"Tidak dapat membuat embed: {e}", color=discord.Color.red())
+        if add_timestamp:
+            embed.timestamp = get_current_timestamp_for_embed()
+        return embed
+
+
+_render_plans: LRUCache = LRUCache(maxsize=RENDER_PLAN_CACHE_SIZE)
+
+
+def get_render_plan(embed_data: dict) -> EmbedRenderPlan:
+    """
+    Render plan untuk satu template, di-cache per (guild_id, embed_name). Plan tersimpan dipakai
+    ulang selama identitas dokumennya sama, yaitu (_id, version): version naik setiap template
+    diubah, dan embed yang dihapus lalu dibuat lagi mendapat _id baru walau version-nya kembali 1.
+    Penulisan lewat core.database juga membuang plan lama (invalidate_render_plans).
+    Data tanpa identitas (mis. pratinjau yang belum disimpan) dikompilasi tanpa cache.
+    """
+    guild_id, embed_name = embed_data.get('guild_id'), embed_data.get('embed_name')
+    if guild_id is None or embed_name is None:
+        return EmbedRenderPlan(embed_data)
+    key = (guild_id, embed_name)
+    stamp = (embed_data.get('_id'), embed_data.get('version'))
+    cached = _render_plans.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    plan = EmbedRenderPlan(embed_data)
+    _render_plans[key] = (stamp, plan)
+    return plan
+
+
+def invalidate_render_plans(guild_id: int, embed_names: Iterable[str]):
+    """Membuang render plan embed yang disimpan, diganti, atau dihapus."""
+    for embed_name in embed_names:
+        _render_plans.pop((guild_id, embed_name), None)
+
+database.add_embed_change_listener(invalidate_render_plans)
+
 
 def create_processed_embed(embed_data: dict, 
                            user: discord.User = None, 
@@ -83,111 +293,4 @@ def create_processed_embed(embed_data: dict,
                            channel: discord.abc.GuildChannel | discord.Thread | discord.DMChannel | None = None) -> discord.Embed:
     if not embed_data:
         return discord.Embed(title="Embed Kosong", description="Embed ini belum memiliki konten.", color=discord.Color.light_gray())
-
-    processed_data = embed_data.copy()
-
-    def process_url_field(data_dict, key, default_val=None):
-        if key in data_dict and data_dict[key]:
-            processed_url = replace_variables(data_dict[key], user, member, guild, channel)
-            if not processed_url or processed_url.startswith("{") or "Error:" in processed_url:
-                # Jika default_val adalah None atau tidak diberikan, hapus fieldnya
-                if default_val is None and key in data_dict: 
-                    del data_dict[key]
-                else: # Jika ada default_val, set ke default_val (misal {'url': None} untuk thumbnail/image)
-                    data_dict[key] = default_val 
-            else:
-                data_dict[key] = processed_url
-        elif key in data_dict and data_dict[key] is None and default_val is not None: # Jika sudah None dan ada default
-            data_dict[key] = default_val
-
-
-    author_info = processed_data.get('author')
-    if isinstance(author_info, dict):
-        if 'name' in author_info and author_info['name']: 
-            author_info['name'] = replace_variables(author_info['name'], user, member, guild, channel)
-        process_url_field(author_info, 'icon_url') 
-        if not author_info.get('name'): processed_data['author'] = None 
-        else: processed_data['author'] = author_info
-
-    footer_info = processed_data.get('footer')
-    if isinstance(footer_info, dict):
-        if 'text' in footer_info and footer_info['text']: 
-            footer_info['text'] = replace_variables(footer_info['text'], user, member, guild, channel)
-        process_url_field(footer_info, 'icon_url') 
-        if not footer_info.get('text') and not footer_info.get('timestamp') and not footer_info.get('icon_url'): 
-            processed_data['footer'] = None
-        else: processed_data['footer'] = footer_info
-    
-    process_url_field(processed_data, 'url')
-
-    # Untuk thumbnail dan image, pastikan strukturnya dict jika ada 'url'
-    if 'thumbnail' in processed_data and isinstance(processed_data['thumbnail'], dict):
-        process_url_field(processed_data['thumbnail'], 'url')
-        if not processed_data['thumbnail'].get('url'): processed_data['thumbnail'] = None # Hapus jika URL jadi None
-    elif 'thumbnail' in processed_data: # Jika bukan dict (mungkin hanya string URL lama)
-        process_url_field(processed_data, 'thumbnail') # Akan menghapusnya jika jadi string kosong
-    
-    if 'image' in processed_data and isinstance(processed_data['image'], dict):
-        process_url_field(processed_data['image'], 'url')
-        if not processed_data['image'].get('url'): processed_data['image'] = None
-    elif 'image' in processed_data:
-        process_url_field(processed_data, 'image')
-
-
-    if 'title' in processed_data and processed_data['title']: processed_data['title'] = replace_variables(processed_data['title'], user, member, guild, channel)
-    if 'description' in processed_data and processed_data['description']: processed_data['description'] = replace_variables(processed_data['description'], user, member, guild, channel)
-    
-    if 'fields' in processed_data and isinstance(processed_data['fields'], list):
-        new_fields = []
-        for field_dict in processed_data['fields']:
-            if isinstance(field_dict, dict):
-                new_field = field_dict.copy()
-                if 'name' in new_field and new_field['name']: new_field['name'] = replace_variables(new_field['name'], user, member, guild, channel)
-                if 'value' in new_field and new_field['value']: new_field['value'] = replace_variables(new_field['value'], user, member, guild, channel)
-                if new_field.get('name') and new_field.get('value'):
-                    new_fields.append(new_field)
-        processed_data['fields'] = new_fields if new_fields else None
-
-    color_value_from_data = processed_data.get('color')
-    final_color_int = None
-    if isinstance(color_value_from_data, str):
-        final_color_int = get_color_int(color_value_from_data)
-    elif isinstance(color_value_from_data, int):
-        final_color_int = color_value_from_data
-    
-    if final_color_int is not None:
-        processed_data['color'] = final_color_int
-    elif 'color' in processed_data: # Jika tidak valid dan ada di data, hapus
-        del processed_data['color']
-
-
-    should_add_timestamp = False
-    current_footer_obj = processed_data.get('footer')
-    if isinstance(current_footer_obj, dict) and current_footer_obj.get('timestamp') is True:
-        should_add_timestamp = True
-        temp_footer = current_footer_obj.copy()
-        if 'timestamp' in temp_footer: del temp_footer['timestamp']
-        # Set footer ke None jika hanya berisi timestamp boolean dan sekarang kosong
-        if not temp_footer.get('text') and not temp_footer.get('icon_url'):
-            processed_data['footer'] = None
-        else:
-            processed_data['footer'] = temp_footer
-
-    if should_add_timestamp:
-        processed_data['timestamp'] = get_current_timestamp_for_embed().isoformat()
-    
-    # Pembersihan akhir: hapus kunci jika nilainya None
-    keys_to_clean = ['author', 'footer', 'fields', 'thumbnail', 'image', 'url', 'title', 'description']
-    for key in keys_to_clean:
-        if key in processed_data and processed_data[key] is None:
-            del processed_data[key]
-    # Khusus untuk warna, jika tidak ada, tidak perlu ada field 'color' sama sekali
-    if 'color' not in processed_data or processed_data.get('color') is None:
-        if 'color' in processed_data: del processed_data['color']
-
-    try:
-        embed = discord.Embed.from_dict(processed_data)
-        return embed
-    except Exception as e:
-        _logger.error(f"Error membuat embed dari dict: {e}\nData yang diproses untuk from_dict: {processed_data}", exc_info=True)
-        return discord.Embed(title="Error Pembuatan Embed", description=f"Tidak dapat membuat embed: {e}", color=discord.Color.red())
\ No newline at end of file
+    return get_render_plan(embed_data).render(user, member, guild, channel)
@@ -0,0 +1,125 @@
+# Noelle_Bot/utils/image_ingest.py
+
+import io
+import os
+import asyncio
+import logging
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import discord
+from PIL import Image, ImageOps
+from google.genai import types as genai_types
+
+_logger = logging.getLogger("noelle_bot.image_ingest")
+
+# Lampiran di atas batas ini ditolak sebelum diunduh (berdasarkan attachment.size dari Discord).
+MAX_ATTACHMENT_BYTES = int(float(os.getenv('AI_MAX_IMAGE_ATTACHMENT_MB', '20')) * 1024 * 1024)
+# Sisi terpanjang gambar yang dikirim ke model; resolusi lebih tinggi tidak menambah detail yang dipakai model.
+MODEL_MAX_IMAGE_DIMENSION = 1536
+JPEG_QUALITY = 85
+WEBP_QUALITY = 85
+# Batas piksel hasil decode (perlindungan decompression bomb), sekitar 64 MP.
+MAX_DECODED_PIXELS = 64_000_000
+INGEST_WORKERS = int(os.getenv('IMAGE_INGEST_WORKERS', str(max(1, min(2, os.cpu_count() or 1)))))
+
+_process_pool: concurrent.futures.ProcessPoolExecutor | None = None
+# Membatasi jumlah gambar (mentah) yang menunggu di memori untuk diproses.
+_ingest_semaphore = asyncio.Semaphore(INGEST_WORKERS * 2)
+
+
+class ImageIngestError(Exception):
+    """Gambar tidak bisa diproses; pesannya aman ditampilkan ke pengguna."""
+
+
+def is_image_attachment(attachment: discord.Attachment) -> bool:
+    return bool(attachment.content_type and attachment.content_type.startswith('image/'))
+
+
+def _normalize_image(data: bytes, max_dimension: int) -> tuple[bytes, str]:
+    """
+    Dijalankan di process pool: decode, rotasi sesuai EXIF, perkecil, lalu encode ulang.
+    Gambar tanpa transparansi menjadi JPEG; yang transparan menjadi WEBP.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_DECODED_PIXELS
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format == 'JPEG':
+            image.draft('RGB', (max_dimension, max_dimension)) # Decode JPEG langsung pada skala yang lebih kecil
+        image.seek(0) # Untuk GIF/WEBP animasi, hanya frame pertama yang dipakai
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        output = io.BytesIO()
+        if has_alpha:
+            image.convert('RGBA').save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+            return output.getvalue(), 'image/webp'
+        image.convert('RGB').save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        return output.getvalue(), 'image/jpeg'
+
+
+def _recompress_png(data: bytes) -> bytes:
+    """Dijalankan di process pool: encode ulang PNG secara lossless dengan kompresi maksimum."""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format != 'PNG':
+            return data
+        output = io.BytesIO()
+        image.save(output, format='PNG', optimize=True)
+    recompressed = output.getvalue()
+    return recompressed if len(recompressed) < len(data) else data
+
+
+def _get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+        _logger.info(f"Process pool image ingest dibuat ({INGEST_WORKERS} worker).")
+    return _process_pool
+
+
+async def run_in_image_pool(func, *args):
+    """Menjalankan fungsi CPU-bound (harus bisa di-pickle) di process pool; pool yang rusak dibuat ulang sekali."""
+    global _process_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_process_pool(), func, *args)
+    except BrokenProcessPool:
+        _logger.warning("Process pool image ingest rusak, membuat ulang.")
+        _process_pool = None
+        return await loop.run_in_executor(_get_process_pool(), func, *args)
+
+
+async def ingest_image_bytes(data: bytes, max_dimension: int = MODEL_MAX_IMAGE_DIMENSION) -> genai_types.Part:
+    try:
+        processed, mime_type = await run_in_image_pool(_normalize_image, data, max_dimension)
+    except (Image.DecompressionBombError, Image.UnidentifiedImageError, OSError) as e:
+        raise ImageIngestError("Format gambar tidak dikenali atau resolusinya terlalu besar.") from e
+    _logger.debug(f"Gambar dinormalisasi: {len(data)} -> {len(processed)} byte ({mime_type}).")
+    return genai_types.Part.from_bytes(data=processed, mime_type=mime_type)
+
+
+async def recompress_png(data: bytes) -> bytes:
+    """Memperkecil PNG hasil generasi sebelum diunggah ke Discord; data asli dikembalikan jika gagal."""
+    try:
+        return await run_in_image_pool(_recompress_png, data)
+    except Exception as e:
+        _logger.warning(f"Gagal mengompresi ulang PNG: {e}")
+        return data
+
+
+async def ingest_attachment(attachment: discord.Attachment, max_dimension: int = MODEL_MAX_IMAGE_DIMENSION) -> genai_types.Part:
+    """Mengunduh dan menormalisasi satu lampiran gambar menjadi Part siap kirim ke Gemini."""
+    if attachment.size > MAX_ATTACHMENT_BYTES:
+        raise ImageIngestError(
+            f"Gambar `{attachment.filename}` terlalu besar ({attachment.size / (1024 * 1024):.1f} MB, "
+            f"maksimal {MAX_ATTACHMENT_BYTES / (1024 * 1024):.0f} MB)."
+        )
+    async with _ingest_semaphore:
+        data = await attachment.read()
+        return await ingest_image_bytes(data, max_dimension)
+
+
+def shutdown():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,225 @@
+# Noelle_Bot/utils/markdown_chunker.py
+
+import bisect
+import re
+from typing import Iterator, NamedTuple
+
+# Baris yang relevan untuk tokenisasi: pembuka code fence (``` atau ~~~, boleh diikuti bahasa),
+# baris kosong, dan baris yang selalu memulai blok baru (item list, heading, kutipan).
+_LINE_EVENT_PATTERN = re.compile(
+    r'^(?:'
+    r' {0,3}(?P<fence>`{3,}|~{3,})[^`\n]*$'
+    r'|(?P<blank>[ \t]*\r?)$'
+    r'|(?P<start>[ \t]*(?:[-*+][ \t]|\d{1,9}[.)][ \t]|#{1,6}[ \t]|>))'
+    r')', re.MULTILINE)
+_EVENT_FIRST_CHARS = frozenset(' \t\r\n`~-*+#>0123456789')
+_fence_close_patterns: dict[str, re.Pattern] = {}
+_NON_SPACE_PATTERN = re.compile(r'\S')
+_NON_NEWLINE_PATTERN = re.compile(r'[^\r\n]')
+
+_TEXT_SEPARATORS = (('\n', '. ', '! ', '? '), (' ',))
+_CODE_SEPARATORS = (('\n',),)
+
+
+class MarkdownBlock(NamedTuple):
+    """
+    Rentang [start, end) di teks sumber. Untuk blok kode, `fence` berisi baris pembuka (mis. "```py")
+    dan [content_start, content_end) adalah isi kode di antara baris pembuka dan penutup.
+    """
+    start: int
+    end: int
+    fence: str | None = None
+    fence_marker: str | None = None
+    content_start: int = 0
+    content_end: int = 0
+
+
+def tokenize_markdown(text: str) -> list[MarkdownBlock]:
+    """
+    Memecah teks menjadi blok markdown dalam satu kali jalan: code fence utuh, paragraf,
+    item list, heading, dan kutipan. Blok bersambung tanpa celah (baris kosong ikut blok
+    sebelumnya), jadi menggabungkan semua blok menghasilkan teks asli.
+    """
+    starts: list[int] = []
+    fences: dict[int, tuple[str, str, int, int]] = {}
+    length = len(text)
+    line = 0 # Selalu berada di awal baris
+    after_break = True # Awal teks, setelah baris kosong, atau setelah fence ditutup
+    while line < length:
+        # Baris yang diawali huruf biasa tidak mungkin fence, baris kosong, atau awal blok: lewati regex.
+        if text[line] in _EVENT_FIRST_CHARS:
+            event = _LINE_EVENT_PATTERN.match(text, line)
+            kind = event.lastgroup if event is not None else None
+        else:
+            kind = None
+        if after_break and kind != 'blank':
+            starts.append(line) # Baris tidak kosong pertama setelah jeda memulai paragraf baru
+        after_break = False
+        if kind == 'fence':
+            marker = event.group('fence')
+            if starts[-1] != line:
+                starts.append(line)
+            close_pattern = _fence_close_patterns.get(marker)
+            if close_pattern is None:
+                close_pattern = _fence_close_patterns[marker] = re.compile(
+                    r'\n {0,3}' + re.escape(marker[0]) + '{' + str(len(marker)) + r',}[ \t]*\r?(?=\n|\Z)')
+            close = close_pattern.search(text, event.end())
+            content_start = min(event.end() + 1, length)
+            content_end = max(close.start(), content_start) if close is not None else length
+            fences[line] = (event.group(0).strip(), marker, content_start, content_end)
+            if close is None:
+                break # Fence tidak ditutup: sisa teks termasuk blok kode ini
+            line = close.end() + 1
+            after_break = True
+            continue
+        if kind == 'blank':
+            line = event.end() + 1
+            after_break = True
+            continue
+        if kind == 'start' and starts[-1] != line:
+            starts.append(line)
+        newline = text.find('\n', line)
+        if newline == -1:
+            break
+        line = newline + 1
+
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    blocks = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else length
+        fence = fences.get(start)
+        blocks.append(MarkdownBlock(start, end, *fence) if fence is not None else MarkdownBlock(start, end))
+    return blocks
+
+
+class MarkdownChunker:
+    """
+    Memotong teks markdown menjadi potongan berurutan dengan batas panjang per potongan
+    (batas boleh berbeda tiap panggilan, mis. deskripsi embed lalu field).
+    Teks ditokenisasi sekali dan dibaca lewat offset, jadi total kerjanya linear terhadap
+    panjang teks. Tokenisasi per baris berjalan di Python, jadi untuk respons di bawah ~100 KB
+    biayanya sedikit di atas potong-ulang string lama (<1 ms); keuntungannya muncul di respons
+    yang lebih panjang dan pada fence/list yang tidak lagi terpotong sembarangan. Blok yang muat tidak dipotong; blok yang lebih panjang dari batas dipotong
+    di akhir baris/kalimat/spasi. Code fence yang terpotong ditutup di akhir potongan dan
+    dibuka lagi (dengan bahasa yang sama) di potongan berikutnya.
+    """
+    def __init__(self, text: str):
+        self._text = text
+        self._blocks = tokenize_markdown(text) if text else []
+        self._block_ends = [block.end for block in self._blocks]
+        self._index = 0
+        self._pos = 0
+        self._reopen = "" # Pembuka fence untuk lanjutan blok kode yang terpotong
+
+    @property
+    def consumed(self) -> int:
+        """Jumlah karakter teks sumber yang sudah dikeluarkan."""
+        return self._pos
+
+    @property
+    def done(self) -> bool:
+        self._skip_whitespace()
+        return self._index >= len(self._blocks)
+
+    def _advance_block(self):
+        self._pos = self._blocks[self._index].end
+        self._index += 1
+        self._reopen = ""
+
+    def _skip_whitespace(self):
+        while self._index < len(self._blocks):
+            block = self._blocks[self._index]
+            # Di lanjutan blok kode hanya baris baru yang dilewati; indentasi kode dipertahankan.
+            pattern = _NON_NEWLINE_PATTERN if self._reopen else _NON_SPACE_PATTERN
+            match = pattern.search(self._text, self._pos, block.end)
+            if match:
+                self._pos = match.start()
+                return
+            self._advance_block()
+
+    def _split_point(self, start: int, end: int, separator_groups: tuple) -> int:
+        """Titik potong terbaik di (start, end]: utamakan separator di paruh akhir jendela."""
+        for floor in (start + (end - start) // 2, start):
+            for separators in separator_groups:
+                best = -1
+                for separator in separators:
+                    found = self._text.rfind(separator, floor, end)
+                    if found != -1 and found + len(separator) > best:
+                        best = found + len(separator)
+                if best > start:
+                    return best
+        return end
+
+    def next_chunk(self, max_len: int) -> str:
+        """Potongan berikutnya dengan panjang maksimal `max_len`; string kosong jika teks habis."""
+        self._skip_whitespace()
+        if self._index >= len(self._blocks): return ""
+        prefix = self._reopen
+        # Blok-blok berikutnya yang muat utuh diambil sekaligus (bisect pada akhir blok).
+        last_fitting = bisect.bisect_right(self._block_ends, self._pos + max_len - len(prefix), lo=self._index) - 1
+        if last_fitting >= self._index:
+            chunk = prefix + self._text[self._pos:self._block_ends[last_fitting]]
+            self._index = last_fitting
+            self._advance_block()
+            if self._index < len(self._blocks):
+                next_block = self._blocks[self._index]
+                # Blok berikutnya dipotong di sini hanya jika memang tidak akan muat utuh di potongan mana pun.
+                if next_block.end - next_block.start > max_len:
+                    chunk += self._split_block(next_block, max_len - len(chunk), force=False) or ""
+        else:
+            piece = self._split_block(self._blocks[self._index], max_len - len(prefix), force=True)
+            if piece is None: # Batas terlalu kecil untuk menjaga fence: potong apa adanya
+                piece = self._text[self._pos:self._pos + max_len]
+                self._pos += len(piece)
+                prefix = ""
+            chunk = prefix + piece
+        chunk = chunk.rstrip()
+        self._skip_whitespace()
+        return chunk
+
+    def _split_block(self, block: MarkdownBlock, room: int, force: bool) -> str | None:
+        """
+        Mengambil paling banyak `room` karakter dari blok yang tidak muat. Tanpa `force`, blok
+        hanya dipotong jika potongannya berisi sesuatu yang utuh (untuk blok kode: baris pembuka
+        dan minimal satu baris isi). Mengembalikan None jika tidak ada potongan yang layak.
+        """
+        if block.fence is None:
+            if room <= 0: return None
+            cut = self._split_point(self._pos, min(self._pos + room, block.end), _TEXT_SEPARATORS)
+            piece = self._text[self._pos:cut].rstrip()
+            self._pos = cut
+            return piece
+
+        closing = f"\n{block.fence_marker}"
+        # Potongan tidak pernah berakhir di baris pembuka atau penutup: hanya di dalam isi kode.
+        content_start = max(self._pos, block.content_start)
+        limit = min(self._pos + room - len(closing), block.content_end)
+        first_line_end = self._text.find('\n', content_start, block.content_end)
+        first_line_end = block.content_end if first_line_end == -1 else first_line_end + 1
+        if limit >= first_line_end:
+            cut = self._split_point(content_start, limit, _CODE_SEPARATORS)
+        elif force and limit > content_start:
+            cut = limit # Satu baris kode lebih panjang dari batas: terpaksa dipotong di tengah baris
+        else:
+            return None
+        if cut >= block.content_end: # Seluruh isi muat; penutup asli diganti penutup yang sama
+            piece = self._text[self._pos:block.content_end].rstrip() + closing
+            self._advance_block()
+            return piece
+        piece = self._text[self._pos:cut].rstrip() + closing
+        self._pos = cut
+        self._reopen = block.fence + "\n"
+        return piece
+
+    def remaining_text(self) -> str:
+        """Sisa teks yang belum dikeluarkan (dengan pembuka fence jika sedang di tengah blok kode)."""
+        if self.done: return ""
+        return self._reopen + self._text[self._pos:]
+
+
+def chunk_markdown(text: str, max_len: int) -> Iterator[str]:
+    """Memotong seluruh teks menjadi potongan dengan panjang maksimal `max_len`."""
+    chunker = MarkdownChunker(text)
+    while not chunker.done:
+        yield chunker.next_chunk(max_len)
@@ -0,0 +1,46 @@
+# Noelle_Bot/utils/name_index.py
+
+import bisect
+from typing import Iterable
+
+
+class PrefixIndex:
+    """
+    Indeks nama terurut untuk pencarian berdasarkan awalan (autocomplete).
+    Nama disimpan dalam list terurut; complete() memakai bisect sehingga biayanya
+    O(log n + hasil), tanpa memindai semua nama.
+    """
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: list[str] = sorted(set(names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        i = bisect.bisect_left(self._names, name)
+        return i < len(self._names) and self._names[i] == name
+
+    def add(self, name: str):
+        i = bisect.bisect_left(self._names, name)
+        if i == len(self._names) or self._names[i] != name:
+            self._names.insert(i, name)
+
+    def discard(self, name: str):
+        i = bisect.bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+
+    def replace(self, names: Iterable[str]):
+        self._names = sorted(set(names))
+
+    def complete(self, prefix: str, limit: int = 25) -> list[str]:
+        """Hingga `limit` nama yang diawali `prefix`, urut abjad. Prefix kosong = nama pertama."""
+        start = bisect.bisect_left(self._names, prefix)
+        results = []
+        for name in self._names[start:start + limit]:
+            if not name.startswith(prefix): break
+            results.append(name)
+        return results
+
+    def names(self) -> list[str]:
+        return list(self._names)
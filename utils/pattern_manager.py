@@ -1,14 +1,21 @@
 # Noelle_Bot/utils/pattern_manager.py
 
 import os
+import hashlib
 import pathlib
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from utils.name_index import PrefixIndex
 
 # Tentukan path ke direktori patterns
 PATTERNS_DIR = pathlib.Path(__file__).resolve().parent.parent / "patterns"
 
 # Cache untuk menyimpan patterns yang sudah dimuat agar tidak membaca file berulang kali
 _pattern_cache: Dict[str, Tuple[str, str]] = {}
+# Hash konten per pattern, dipakai sebagai bagian kunci cache respons
+_pattern_hashes: Dict[str, str] = {}
+# Indeks awalan nama pattern untuk saran nama
+_pattern_index = PrefixIndex()
 
 def _load_patterns():
     """Memuat atau memuat ulang semua pattern dari direktori."""
@@ -18,6 +25,7 @@ def _load_patterns():
         return
 
     _pattern_cache.clear()
+    _pattern_hashes.clear()
     for filename in os.listdir(PATTERNS_DIR):
         if filename.endswith(".md"):
             pattern_name = filename[:-3].lower()
@@ -28,8 +36,10 @@ def _load_patterns():
                     # Ambil baris pertama sebagai deskripsi, fallback jika kosong
                     description = content.splitlines()[0].strip() if content.splitlines() else "Tidak ada deskripsi."
                     _pattern_cache[pattern_name] = (content, description)
+                    _pattern_hashes[pattern_name] = hashlib.sha256(content.encode('utf-8')).hexdigest()
             except Exception as e:
                 print(f"Error memuat pattern '{filename}': {e}")
+    _pattern_index.replace(_pattern_cache)
 
 def get_pattern(name: str) -> Optional[str]:
     """Mengambil konten system prompt dari pattern yang sudah dimuat."""
@@ -40,6 +50,39 @@ def get_pattern(name: str) -> Optional[str]:
     pattern_data = _pattern_cache.get(name)
     return pattern_data[0] if pattern_data else None
 
+def get_pattern_hash(name: str) -> Optional[str]:
+    """Mengambil hash SHA-256 dari konten pattern."""
+    name = name.lower()
+    if not _pattern_cache:
+        _load_patterns()
+    return _pattern_hashes.get(name)
+
+def _normalize_input(user_input: str) -> str:
+    """
+    Merapikan spasi tanpa mengubah struktur baris: ujung teks dan ujung baris dipangkas, spasi/tab
+    beruntun di dalam baris digabung. Indentasi dan baris baru dipertahankan (kode, puisi, daftar).
+    """
+    lines = []
+    for line in user_input.strip().splitlines():
+        body = line.lstrip(" \t")
+        lines.append(line[:len(line) - len(body)] + " ".join(body.split()))
+    return "\n".join(lines)
+
+def build_response_cache_key(name: str, user_input: str) -> Optional[Tuple[str, str, str]]:
+    """Kunci cache respons: (nama pattern, hash konten pattern, input yang dinormalisasi)."""
+    pattern_hash = get_pattern_hash(name)
+    if pattern_hash is None:
+        return None
+    normalized_input = _normalize_input(user_input)
+    return (name.lower(), pattern_hash, normalized_input)
+
+def suggest_patterns(prefix: str, limit: int = 5) -> List[str]:
+    """Nama pattern yang diawali `prefix`; jika tidak ada, yang diawali dua huruf pertamanya."""
+    if not _pattern_cache:
+        _load_patterns()
+    prefix = prefix.lower()
+    return _pattern_index.complete(prefix, limit) or _pattern_index.complete(prefix[:2], limit)
+
 def get_available_patterns() -> Dict[str, str]:
     """Mengembalikan dictionary nama pattern dan deskripsinya."""
     if not _pattern_cache:
@@ -0,0 +1,56 @@
+# Noelle_Bot/utils/rate_limit.py
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Pembatas laju token-bucket async.
+    `rate` token diisi ulang per detik hingga maksimal `capacity`; acquire() menunggu
+    sampai token tersedia. Pemanggil dilayani berurutan (FIFO) lewat lock internal.
+    """
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate dan capacity harus lebih besar dari 0.")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float | None = None) -> "TokenBucket":
+        """Bucket untuk kuota per menit. Tanpa `burst`, seluruh kuota satu menit boleh dipakai sekaligus."""
+        return cls(rate=requests_per_minute / 60.0, capacity=burst if burst is not None else requests_per_minute)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def available_tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Mengambil token tanpa menunggu. Mengembalikan False jika tidak cukup."""
+        self._refill()
+        if self._tokens >= tokens and not self._lock.locked():
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Menunggu sampai `tokens` tersedia lalu mengambilnya. Mengembalikan lama menunggu (detik)."""
+        if tokens > self.capacity:
+            raise ValueError("Jumlah token yang diminta melebihi kapasitas bucket.")
+        started_at = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return time.monotonic() - started_at
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
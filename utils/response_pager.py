@@ -0,0 +1,134 @@
+# Noelle_Bot/utils/response_pager.py
+
+import os
+import secrets
+import logging
+
+import discord
+from cachetools import TTLCache
+
+from core import database
+from utils.markdown_chunker import chunk_markdown
+
+_logger = logging.getLogger("noelle_bot.response_pager")
+
+PAGE_CHAR_LIMIT = 4000 # Satu halaman = satu deskripsi embed (batas Discord 4096)
+# Halaman disimpan selama ini sejak dibuat; tombol pada pesan yang lebih tua menampilkan pesan kedaluwarsa.
+# Salinan di MongoDB (koleksi response_pages) memakai TTL yang sama dan dipakai jika store memori kosong (mis. setelah restart).
+PAGE_STORE_TTL_SECONDS = database.RESPONSE_PAGES_TTL_SECONDS
+# Batas total karakter semua respons yang disimpan; respons terlama dibuang lebih dulu jika penuh.
+PAGE_STORE_MAX_CHARS = int(os.getenv('PAGE_STORE_MAX_CHARS', '20000000'))
+CUSTOM_ID_PREFIX = "noelle:page"
+
+
+class PagedResponse:
+    """Respons panjang yang sudah dipotong per halaman. Embed baru dibangun saat halaman dibuka."""
+    __slots__ = ("pages", "title", "footer_text", "citations", "color_value", "size")
+
+    def __init__(self, pages: list[str], title: str | None, footer_text: str | None, citations: str | None, color_value: int):
+        self.pages = pages
+        self.title = title
+        self.footer_text = footer_text
+        self.citations = citations
+        self.color_value = color_value
+        self.size = sum(len(page) for page in pages) + len(citations or "")
+
+
+_page_store: TTLCache = TTLCache(maxsize=PAGE_STORE_MAX_CHARS, ttl=PAGE_STORE_TTL_SECONDS, getsizeof=lambda entry: max(entry.size, 1))
+
+
+def paginate_text(text: str, title: str | None, footer_text: str | None, citations: str | None = None) -> tuple[str | None, PagedResponse]:
+    """
+    Memotong `text` menjadi halaman (MarkdownChunker, jadi code fence tetap utuh per halaman)
+    dan menyimpannya di page store. Mengembalikan (kunci, respons); kunci None jika respons
+    terlalu besar untuk disimpan, sehingga hanya halaman pertama yang bisa ditampilkan.
+    """
+    pages = list(chunk_markdown(text, PAGE_CHAR_LIMIT)) or [""]
+    paged = PagedResponse(pages, title, footer_text, citations, discord.Color.random().value)
+    key = secrets.token_hex(6)
+    try:
+        _page_store[key] = paged
+    except ValueError: # Lebih besar dari kapasitas seluruh store
+        _logger.warning(f"Respons {paged.size} karakter terlalu besar untuk page store; hanya halaman pertama yang dikirim.")
+        return None, paged
+    return key, paged
+
+
+async def persist_paged_response(key: str | None, paged: PagedResponse) -> bool:
+    """Menyimpan salinan respons ke MongoDB agar tombolnya tetap berfungsi setelah restart. Dipanggil setelah halaman pertama terkirim."""
+    if key is None or len(paged.pages) <= 1: return False
+    return await database.save_response_pages(key, {
+        'pages': paged.pages, 'title': paged.title, 'footer_text': paged.footer_text,
+        'citations': paged.citations, 'color_value': paged.color_value,
+    })
+
+
+async def get_paged_response(key: str) -> PagedResponse | None:
+    """Respons dari store memori; jika tidak ada (kedaluwarsa dari memori atau bot baru restart), dari MongoDB."""
+    paged = _page_store.get(key)
+    if paged is not None: return paged
+    doc = await database.get_response_pages(key)
+    if doc is None: return None
+    paged = PagedResponse(doc['pages'], doc.get('title'), doc.get('footer_text'), doc.get('citations'), doc['color_value'])
+    try:
+        _page_store[key] = paged
+    except ValueError:
+        pass
+    return paged
+
+
+def render_page(paged: PagedResponse, page: int) -> discord.Embed:
+    total = len(paged.pages)
+    title = paged.title
+    if title and total > 1:
+        title = f"{title} (Halaman {page + 1}/{total})"
+    embed = discord.Embed(title=title[:256] if title else None, description=paged.pages[page] or None, color=paged.color_value)
+    if page == 0 and paged.citations:
+        embed.add_field(name="Sumber Informasi:", value=paged.citations[:1024], inline=False)
+    footer = f"Halaman {page + 1}/{total}" if total > 1 else ""
+    if paged.footer_text:
+        footer = f"{paged.footer_text} • {footer}" if footer else paged.footer_text
+    if footer: embed.set_footer(text=footer[:2048])
+    return embed
+
+
+class PageButton(discord.ui.DynamicItem[discord.ui.Button], template=CUSTOM_ID_PREFIX + r':(?P<key>[0-9a-f]+):(?P<page>\d+):(?P<direction>prev|next)'):
+    """
+    Tombol navigasi halaman. Semua state ada di custom_id (kunci store + halaman tujuan),
+    jadi tidak ada View yang disimpan per pesan. Setelah bot restart, halaman dibaca dari
+    MongoDB selama belum kedaluwarsa. Didaftarkan lewat `bot.add_dynamic_items(PageButton)`.
+    """
+    def __init__(self, key: str, page: int, direction: str, disabled: bool = False):
+        super().__init__(discord.ui.Button(
+            label="◀ Sebelumnya" if direction == "prev" else "Berikutnya ▶",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"{CUSTOM_ID_PREFIX}:{key}:{page}:{direction}",
+            disabled=disabled,
+        ))
+        self.key = key
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match['key'], int(match['page']), match['direction'])
+
+    async def callback(self, interaction: discord.Interaction):
+        paged = await get_paged_response(self.key)
+        if paged is None:
+            await interaction.response.send_message("Halaman respons ini sudah kedaluwarsa.", ephemeral=True)
+            return
+        page = min(max(self.page, 0), len(paged.pages) - 1)
+        await interaction.response.edit_message(embed=render_page(paged, page), view=build_page_view(self.key, page, len(paged.pages)))
+
+
+def build_page_view(key: str | None, page: int, total: int) -> discord.ui.View | None:
+    """View navigasi untuk halaman `page`; None jika hanya ada satu halaman atau respons tidak tersimpan."""
+    if key is None or total <= 1: return None
+    view = discord.ui.View(timeout=None)
+    view.add_item(PageButton(key, max(page - 1, 0), "prev", disabled=page == 0))
+    view.add_item(PageButton(key, min(page + 1, total - 1), "next", disabled=page >= total - 1))
+    return view
+
+
+def page_store_stats() -> dict:
+    return {"responses": len(_page_store), "chars": _page_store.currsize, "max_chars": _page_store.maxsize}
@@ -0,0 +1,194 @@
+# Noelle_Bot/utils/welcome_aggregator.py
+
+import os
+import asyncio
+import logging
+from typing import Callable
+
+import discord
+from cachetools import TTLCache
+
+from utils.rate_limit import TokenBucket
+
+_logger = logging.getLogger("noelle_bot.welcome_aggregator")
+
+# Join yang masuk dalam jendela ini dikirim bersama (dihitung sejak join pertama dalam batch).
+WELCOME_BATCH_WINDOW_SECONDS = float(os.getenv('WELCOME_BATCH_WINDOW_SECONDS', '2'))
+# Batas Discord: maksimal 10 embed per pesan, dan total karakter semua embed dalam satu pesan maks 6000.
+MAX_EMBEDS_PER_MESSAGE = 10
+SAFE_CHAR_PER_MESSAGE = 5800
+# Di atas jumlah join per batch ini, satu embed ringkasan dikirim alih-alih embed per anggota.
+WELCOME_SUMMARY_THRESHOLD = int(os.getenv('WELCOME_SUMMARY_THRESHOLD', '20'))
+# Join di luar batas ini dalam satu batch tidak disapa (hanya dihitung).
+MAX_BUFFERED_JOINS = 1000
+# Perkiraan bucket rate limit per channel Discord: 5 pesan per 5 detik.
+CHANNEL_MESSAGES_PER_SECOND = 1.0
+CHANNEL_MESSAGE_BURST = 5
+# Lock per guild dan bucket per channel hanya disimpan untuk guild/channel yang baru aktif.
+SEND_STATE_CACHE_SIZE = 5000
+SEND_STATE_TTL_SECONDS = 600
+SUMMARY_DESCRIPTION_LIMIT = 4000
+
+
+class _PendingWelcome:
+    __slots__ = ("member", "template")
+
+    def __init__(self, member: discord.Member, template: dict):
+        self.member = member
+        self.template = template
+
+
+def _fit_embed(embed: discord.Embed) -> discord.Embed:
+    """Embed yang sendirian sudah melebihi SAFE_CHAR_PER_MESSAGE dipangkas: field dari belakang, lalu deskripsi."""
+    while len(embed) > SAFE_CHAR_PER_MESSAGE and embed.fields:
+        embed.remove_field(len(embed.fields) - 1)
+    overflow = len(embed) - SAFE_CHAR_PER_MESSAGE
+    if overflow > 0 and embed.description:
+        embed.description = embed.description[:max(len(embed.description) - overflow - 1, 0)] + "…"
+    return embed
+
+
+def _pack_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """Mengemas embed ke pesan berurutan: maks MAX_EMBEDS_PER_MESSAGE embed dan SAFE_CHAR_PER_MESSAGE karakter per pesan."""
+    messages: list[list[discord.Embed]] = []
+    current: list[discord.Embed] = []
+    used = 0
+    for embed in embeds:
+        size = len(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or used + size > SAFE_CHAR_PER_MESSAGE):
+            messages.append(current)
+            current, used = [], 0
+        current.append(embed)
+        used += size
+    if current: messages.append(current)
+    return messages
+
+
+class WelcomeAggregator:
+    """
+    Menggabungkan sambutan anggota baru per guild saat terjadi gelombang join (raid).
+    Join ditampung selama WELCOME_BATCH_WINDOW_SECONDS, lalu dikirim sebagai pesan berisi
+    hingga 10 embed dengan total di bawah SAFE_CHAR_PER_MESSAGE karakter; jika batch melebihi
+    WELCOME_SUMMARY_THRESHOLD, dikirim satu embed ringkasan.
+    Setiap pesan menunggu token dari bucket per channel agar tidak menabrak rate limit Discord.
+    """
+    def __init__(self, render: Callable[[dict, discord.Member, discord.abc.Messageable], discord.Embed], *,
+                 window_seconds: float = WELCOME_BATCH_WINDOW_SECONDS,
+                 summary_threshold: int = WELCOME_SUMMARY_THRESHOLD):
+        self._render = render
+        self.window_seconds = window_seconds
+        self.summary_threshold = summary_threshold
+        self._buffers: dict[int, list[_PendingWelcome]] = {}
+        self._flush_tasks: dict[int, asyncio.Task] = {}
+        self._send_locks: TTLCache = TTLCache(maxsize=SEND_STATE_CACHE_SIZE, ttl=SEND_STATE_TTL_SECONDS)
+        self._channel_buckets: TTLCache = TTLCache(maxsize=SEND_STATE_CACHE_SIZE, ttl=SEND_STATE_TTL_SECONDS)
+        self.received_count = 0
+        self.sent_embeds = 0
+        self.sent_messages = 0
+        self.merged_count = 0 # Join yang disapa lewat embed ringkasan
+        self.dropped_count = 0 # Join yang tidak tersapa (buffer penuh, channel hilang, atau gagal kirim)
+
+    def add(self, member: discord.Member, template: dict):
+        """Menampung satu join; batch guild dikirim setelah jendela waktu berakhir."""
+        self.received_count += 1
+        guild_id = member.guild.id
+        buffer = self._buffers.setdefault(guild_id, [])
+        if len(buffer) >= MAX_BUFFERED_JOINS:
+            self.dropped_count += 1
+            return
+        buffer.append(_PendingWelcome(member, template))
+        if guild_id not in self._flush_tasks:
+            self._flush_tasks[guild_id] = asyncio.create_task(self._flush_after_window(member.guild), name=f"welcome-flush-{guild_id}")
+
+    async def _flush_after_window(self, guild: discord.Guild):
+        try:
+            await asyncio.sleep(self.window_seconds)
+        finally:
+            self._flush_tasks.pop(guild.id, None)
+        batch = self._buffers.pop(guild.id, [])
+        if not batch: return
+        # Lock per guild menjaga urutan batch jika batch sebelumnya masih dikirim.
+        lock = self._send_locks.get(guild.id)
+        if lock is None:
+            lock = self._send_locks[guild.id] = asyncio.Lock()
+        async with lock:
+            try:
+                await self._deliver(guild, batch)
+            except Exception as e:
+                _logger.error(f"Error mengirim sambutan batch di guild {guild.id}: {e}", exc_info=True)
+
+    def _bucket(self, channel_id: int) -> TokenBucket:
+        bucket = self._channel_buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._channel_buckets[channel_id] = TokenBucket(rate=CHANNEL_MESSAGES_PER_SECOND, capacity=CHANNEL_MESSAGE_BURST)
+        return bucket
+
+    async def _send(self, channel: discord.TextChannel, embeds: list[discord.Embed]) -> bool:
+        await self._bucket(channel.id).acquire()
+        try:
+            await channel.send(embeds=embeds)
+        except discord.Forbidden:
+            _logger.warning(f"Tidak bisa kirim welcome embed ke {channel.name} (Forbidden).")
+            return False
+        except discord.HTTPException as e:
+            _logger.error(f"Gagal kirim welcome embed ke {channel.name}: {e}")
+            return False
+        self.sent_messages += 1
+        self.sent_embeds += len(embeds)
+        return True
+
+    async def _deliver(self, guild: discord.Guild, batch: list[_PendingWelcome]):
+        channel = guild.system_channel
+        if channel is None:
+            self.dropped_count += len(batch)
+            return
+        if len(batch) > self.summary_threshold:
+            if await self._send(channel, [self._build_summary(guild, batch)]):
+                self.merged_count += len(batch)
+                _logger.info(f"{len(batch)} join di guild {guild.id} disapa dengan satu embed ringkasan.")
+            else:
+                self.dropped_count += len(batch)
+            return
+
+        embeds = []
+        for pending in batch:
+            try:
+                embeds.append(_fit_embed(self._render(pending.template, pending.member, channel)))
+            except Exception as e:
+                self.dropped_count += 1
+                _logger.error(f"Error render welcome embed untuk {pending.member.id}: {e}", exc_info=True)
+        for message_embeds in _pack_embeds(embeds):
+            if not await self._send(channel, message_embeds):
+                self.dropped_count += len(message_embeds)
+
+    @staticmethod
+    def _build_summary(guild: discord.Guild, batch: list[_PendingWelcome]) -> discord.Embed:
+        mentions = []
+        length = 0
+        for pending in batch:
+            mention = pending.member.mention
+            if length + len(mention) + 2 > SUMMARY_DESCRIPTION_LIMIT: break
+            mentions.append(mention)
+            length += len(mention) + 2
+        description = ", ".join(mentions)
+        if len(mentions) < len(batch):
+            description += f" dan {len(batch) - len(mentions)} lainnya"
+        embed = discord.Embed(title=f"Selamat datang, {len(batch)} anggota baru di {guild.name}!", description=description, color=discord.Color.gold())
+        embed.set_footer(text=f"Sekarang ada {guild.member_count} anggota.")
+        return embed
+
+    def close(self):
+        for task in self._flush_tasks.values():
+            task.cancel()
+        self._flush_tasks.clear()
+        self._buffers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received_count,
+            "buffered": sum(len(buffer) for buffer in self._buffers.values()),
+            "sent_messages": self.sent_messages,
+            "sent_embeds": self.sent_embeds,
+            "merged": self.merged_count,
+            "dropped": self.dropped_count,
+        }